@@ -0,0 +1,6 @@
+"""
+Offline performance benchmarks for the RAG server.
+
+Each module is runnable from the server directory, e.g.
+``python -m benchmarks.bench_xlsx --rows 100000``.
+"""
@@ -0,0 +1,284 @@
+"""
+Benchmark retrieval and chat latency without calling Groq.
+
+Drives ChatMessageView and ChatMessageStreamView in-process at a given
+concurrency, with CHAT_LLM_BACKEND=fake so the answer comes from a local
+streaming model with configurable first-token latency and token rate.
+Retrieval and reranking are the real Chroma search and cross-encoder.
+
+Vector stores of each requested size are built with real embeddings for a
+pool of --unique-texts chunks; larger stores repeat that pool with slightly
+perturbed vectors, which keeps a 1M chunk store buildable in minutes while
+search cost still grows with the index. Stores are kept in --store-dir so
+later runs (e.g. on another commit) reuse them.
+
+The report holds p50/p95/p99 of retrieval, rerank, time to first token and
+total turn time per corpus size and view.
+
+    python -m benchmarks.bench_chat_latency --sizes 1000,10000 --requests 50 --concurrency 4
+    python -m benchmarks.bench_chat_latency --sizes 1000,100000,1000000 --store-dir /tmp/chat_stores \\
+        --tokens-per-second 100 --first-token-latency 0.5 --output chat.json
+"""
+import argparse
+import functools
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import git_revision, peak_rss_mb, percentiles, setup_django, timed, write_report
+
+WORDS = (
+    "policy claim premium coverage contract annual report revenue customer region "
+    "quarter growth risk model analysis system service account payment invoice "
+    "schedule review update process team project budget forecast market product"
+).split()
+
+
+def build_pool(count, seed=3):
+    """Chunk texts with one planted fact each, and questions about those facts"""
+    rng = random.Random(seed)
+    texts, questions = [], []
+    for i in range(count):
+        filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 140)))
+        code = f"CODE{i:06d}"
+        texts.append(f"{filler.capitalize()}. The access code for project-{i} is {code}. {filler[:200]}")
+        questions.append(f"What is the access code for project-{i}?")
+    return texts, questions
+
+
+class Timings:
+    """Collects durations of instrumented methods, keyed by name"""
+
+    def __init__(self):
+        self.samples = {}
+        self._lock = threading.Lock()
+        self._patched = []
+
+    def add(self, key, seconds):
+        with self._lock:
+            self.samples.setdefault(key, []).append(seconds)
+
+    def reset(self):
+        with self._lock:
+            self.samples = {}
+
+    def wrap(self, cls, name, key):
+        original = getattr(cls, name)
+        timings = self
+
+        @functools.wraps(original)
+        def timed_method(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                timings.add(key, time.perf_counter() - start_time)
+
+        setattr(cls, name, timed_method)
+        self._patched.append((cls, name, original))
+
+    def restore(self):
+        for cls, name, original in reversed(self._patched):
+            setattr(cls, name, original)
+        self._patched = []
+
+
+def open_store(path, size, embeddings, texts, user_id, sources, batch_size=5000):
+    """
+    Chroma store at path holding size chunks of user_id, built on first use.
+    Returns the seconds spent building (0 when an existing store was reused).
+    """
+    import chromadb
+    import numpy as np
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.get_or_create_collection('langchain', embedding_function=None)
+    sample = collection.get(limit=1, include=['metadatas'])
+    if collection.count() == size and sample['metadatas'] and sample['metadatas'][0].get('user_id') == user_id:
+        print(f"♻️ Reusing store of {size} chunks at {path}")
+        return 0
+
+    client.delete_collection('langchain')
+    collection = client.create_collection('langchain', embedding_function=None)
+    start_time = time.perf_counter()
+    base = np.asarray(embeddings.embed_documents(texts[:min(len(texts), size)]), dtype=np.float32)
+    rng = np.random.default_rng(5)
+    for start in range(0, size, batch_size):
+        indices = np.arange(start, min(size, start + batch_size))
+        vectors = base[indices % len(base)]
+        # Copies beyond the pool get a little noise so the index is not degenerate
+        vectors = vectors + (indices >= len(base))[:, None] * rng.normal(0, 0.01, vectors.shape).astype(np.float32)
+        collection.add(
+            ids=[f"chunk-{i}" for i in indices],
+            embeddings=vectors.tolist(),
+            documents=[texts[i % len(base)] for i in indices],
+            metadatas=[
+                {"url": "", "chunk_index": int(i), "scrape_id": f"source-{i % sources}", "user_id": user_id}
+                for i in indices
+            ]
+        )
+    seconds = time.perf_counter() - start_time
+    print(f"🏗️ Built store of {size} chunks in {seconds:.1f}s")
+    return seconds
+
+
+def run_turn(view, user, question, scrape_ids, stream):
+    """One chat turn through the view; returns (time to first token, total) in seconds"""
+    from django.db import close_old_connections
+    from rest_framework.test import APIRequestFactory, force_authenticate
+    from chatLlm.models import Chat
+
+    close_old_connections()
+    chat = Chat.objects.create(user=user, title='benchmark')
+    data = {'message': question}
+    if scrape_ids:
+        data['scrape_ids'] = scrape_ids
+    request = APIRequestFactory().post(f'/api/chat/chats/{chat.id}/messages/', data, format='json')
+    force_authenticate(request, user=user)
+
+    start_time = time.perf_counter()
+    response = view(request, chat_id=chat.id)
+    if response.status_code != 200:
+        raise RuntimeError(f"status {response.status_code}: {getattr(response, 'data', '')}")
+    first_token = None
+    if stream:
+        for part in response.streaming_content:
+            if first_token is None and b'"token"' in part:
+                first_token = time.perf_counter() - start_time
+            if b'"error"' in part:
+                raise RuntimeError(part.decode('utf-8', 'replace').strip())
+    total = time.perf_counter() - start_time
+    return (first_token if stream else total), total
+
+
+def run_view(name, view, stream, args, user, questions, scrape_ids, timings):
+    rng = random.Random(11)
+    for _ in range(args.warmup):
+        run_turn(view, user, rng.choice(questions), scrape_ids, stream)
+    timings.reset()
+
+    turns, errors = [], []
+
+    def turn(question):
+        try:
+            turns.append(run_turn(view, user, question, scrape_ids, stream))
+        except Exception as e:
+            errors.append(str(e))
+
+    result = {}
+    with timed(result, 'seconds'):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            list(executor.map(turn, [rng.choice(questions) for _ in range(args.requests)]))
+
+    result.update({
+        'turns': len(turns),
+        'errors': len(errors),
+        'turns_per_second': round(len(turns) / result['seconds'], 2),
+        'retrieval': percentiles(timings.samples.get('retrieval', [])),
+        'rerank': percentiles(timings.samples.get('rerank', [])),
+        'service_setup': percentiles(timings.samples.get('service_setup', [])),
+        'time_to_first_token': percentiles([first for first, _ in turns if first is not None]),
+        'total': percentiles([total for _, total in turns]),
+    })
+    result['seconds'] = round(result['seconds'], 3)
+    if errors:
+        result['first_error'] = errors[0]
+    print(f"📊 {name}: {len(turns)} turns, p95 total {result['total']['p95']}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Comma separated corpus sizes in chunks')
+    parser.add_argument('--requests', type=int, default=40, help='Measured turns per view and size')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured turns per view before measuring')
+    parser.add_argument('--views', default='message,stream', help='message, stream or both')
+    parser.add_argument('--unique-texts', type=int, default=2000, help='Chunks embedded for real per store')
+    parser.add_argument('--sources', type=int, default=100, help='Distinct scrape_ids the chunks belong to')
+    parser.add_argument('--filter-sources', type=int, default=0, help='Pass this many scrape_ids with each turn')
+    parser.add_argument('--first-token-latency', type=float, default=0.3, help='Fake LLM delay before the first token (s)')
+    parser.add_argument('--tokens-per-second', type=float, default=250, help='Fake LLM token rate')
+    parser.add_argument('--response-tokens', type=int, default=200, help='Fake LLM tokens per answer')
+    parser.add_argument('--store-dir', help='Keep built stores here for reuse between runs')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    views = [view.strip() for view in args.views.split(',') if view.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix='bench_chat_')
+    store_dir = args.store_dir or os.path.join(work_dir, 'stores')
+    # An already configured database is used as is; otherwise a throw-away SQLite file
+    if 'DATABASE_ENGINE' not in os.environ:
+        os.environ['DATABASE_ENGINE'] = 'django.db.backends.sqlite3'
+        os.environ['DATABASE_NAME'] = os.path.join(work_dir, 'bench.sqlite3')
+    os.environ.update({
+        'VECTOR_DB_DIRECTORY': os.path.join(work_dir, 'vectordb'),
+        'CHAT_LLM_BACKEND': 'fake',
+        'FAKE_LLM_FIRST_TOKEN_LATENCY': str(args.first_token_latency),
+        'FAKE_LLM_TOKENS_PER_SECOND': str(args.tokens_per_second),
+        'FAKE_LLM_RESPONSE_TOKENS': str(args.response_tokens),
+    })
+    setup_django()
+    from django.core.management import call_command
+    from django.contrib.auth import get_user_model
+    from langchain_chroma import Chroma
+    from langchain_core.vectorstores import VectorStoreRetriever
+    from langchain.retrievers.document_compressors import CrossEncoderReranker
+    from chatLlm.services.retriever_service import RetrieverService
+    from chatLlm.views import ChatMessageStreamView, ChatMessageView
+    from vectordb import vector_db
+
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    user, _ = get_user_model().objects.get_or_create(email='chat-bench@example.com')
+
+    timings = Timings()
+    timings.wrap(VectorStoreRetriever, '_get_relevant_documents', 'retrieval')
+    timings.wrap(CrossEncoderReranker, 'compress_documents', 'rerank')
+    timings.wrap(RetrieverService, '__init__', 'service_setup')
+    view_classes = {'message': (ChatMessageView, False), 'stream': (ChatMessageStreamView, True)}
+
+    texts, questions = build_pool(args.unique_texts)
+    scrape_ids = [f"source-{i}" for i in range(args.filter_sources)] or None
+    report = {
+        'benchmark': 'chat_latency',
+        'revision': git_revision(),
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'fake_llm': {
+            'first_token_latency': args.first_token_latency,
+            'tokens_per_second': args.tokens_per_second,
+            'response_tokens': args.response_tokens,
+        },
+        'filter_sources': args.filter_sources,
+        'sizes': {},
+    }
+    try:
+        for size in sizes:
+            path = os.path.join(store_dir, f'chunks_{size}')
+            result = {'build_seconds': round(open_store(
+                path, size, vector_db.embeddings, texts, user.id, args.sources
+            ), 2)}
+            # Requests build their retriever from vector_db.db, so point it at this store
+            vector_db.db = Chroma(persist_directory=path, embedding_function=vector_db.embeddings)
+            asked = [question for i, question in enumerate(questions) if i < size]
+            for name in views:
+                view_class, stream = view_classes[name]
+                result[name] = run_view(
+                    f"{size} chunks / {name}", view_class.as_view(), stream, args, user, asked, scrape_ids, timings
+                )
+            result['peak_rss_mb'] = round(peak_rss_mb(), 1)
+            report['sizes'][str(size)] = result
+    finally:
+        timings.restore()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
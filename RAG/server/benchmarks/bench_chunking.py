@@ -0,0 +1,181 @@
+"""
+Benchmark chunking strategies before embedding.
+
+Compares the original RecursiveCharacterTextSplitter (1200/300 chars) with
+the structure-aware token chunker on chunk count, tokens sent to the
+embedding model, chunks the model would truncate and tables/code blocks cut
+mid-structure. With --embed it also measures embedding time and retrieval
+hit-rate@k on questions about facts planted in the generated corpus.
+
+    python -m benchmarks.bench_chunking --documents 50 --embed --output chunking.json
+    python -m benchmarks.bench_chunking --input ./media/uploads
+"""
+import argparse
+import os
+import random
+import re
+
+from benchmarks.common import setup_django, timed, write_report
+
+WORDS = (
+    "policy claim premium coverage contract annual report revenue customer region "
+    "quarter growth risk model analysis system service account payment invoice "
+    "schedule review update process team project budget forecast market product"
+).split()
+
+
+def sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def build_corpus(documents, seed=7):
+    """Generated markdown documents plus (question, answer) pairs about planted facts"""
+    rng = random.Random(seed)
+    corpus, questions = [], []
+    for doc in range(documents):
+        parts = [f"# Document {doc}\n"]
+        for section in range(rng.randint(3, 6)):
+            name = f"project-{doc}-{section}"
+            code = f"CODE{doc:03d}{section:02d}{rng.randint(1000, 9999)}"
+            parts.append(f"## Section {section} of document {doc}\n")
+            paragraphs = [" ".join(sentence(rng) for _ in range(rng.randint(3, 8))) for _ in range(rng.randint(2, 4))]
+            fact_at = rng.randrange(len(paragraphs))
+            paragraphs[fact_at] += f" The access code for {name} is {code}."
+            parts.extend(paragraph + "\n" for paragraph in paragraphs)
+            questions.append((f"What is the access code for {name}?", code))
+
+            if rng.random() < 0.5:
+                rows = "\n".join(
+                    f"| {name}-item-{i} | {rng.randint(1, 999)} | {rng.choice(WORDS)} |"
+                    for i in range(rng.randint(5, 60))
+                )
+                parts.append(f"| item | amount | category |\n|---|---|---|\n{rows}\n")
+            if rng.random() < 0.3:
+                body = "\n".join(f"    total_{i} = compute({rng.randint(1, 99)})" for i in range(rng.randint(5, 40)))
+                parts.append(f"```python\ndef report_{doc}_{section}():\n{body}\n```\n")
+        corpus.append("\n".join(parts))
+    return corpus, questions
+
+
+def load_corpus(path):
+    corpus = []
+    for root, _, files in os.walk(path):
+        for name in sorted(files):
+            if name.endswith(('.md', '.txt')):
+                with open(os.path.join(root, name), encoding='utf-8', errors='replace') as md_file:
+                    corpus.append(md_file.read())
+    return corpus
+
+
+TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-{3,}')
+
+
+def broken_structures(text):
+    """Count code fences left open and table fragments that lost their header row"""
+    lines = text.splitlines()
+    open_fences = sum(1 for line in lines if line.lstrip().startswith('```')) % 2
+    headless_tables = 0
+    i = 0
+    while i < len(lines):
+        if lines[i].lstrip().startswith('|'):
+            start = i
+            while i < len(lines) and lines[i].lstrip().startswith('|'):
+                i += 1
+            if i - start > 1 and not TABLE_SEPARATOR_RE.match(lines[start + 1]) or i - start == 1:
+                headless_tables += 1
+        else:
+            i += 1
+    return open_fences, headless_tables
+
+
+def chunk_corpus(chunker, corpus, count_tokens, model_limit):
+    result = {}
+    with timed(result, 'chunk_seconds'):
+        chunks = [chunk for document in corpus for chunk in chunker.split_text(document)]
+    token_counts = [count_tokens(chunk) for chunk in chunks]
+    broken = [broken_structures(chunk) for chunk in chunks]
+    result.update({
+        'chunks': len(chunks),
+        'total_tokens': sum(token_counts),
+        'avg_tokens': round(sum(token_counts) / max(len(chunks), 1), 1),
+        'max_tokens': max(token_counts, default=0),
+        'truncated_by_model': sum(1 for tokens in token_counts if tokens > model_limit),
+        'open_code_fences': sum(fences for fences, _ in broken),
+        'headless_table_fragments': sum(tables for _, tables in broken),
+    })
+    return chunks, result
+
+
+def evaluate_retrieval(embeddings, chunks, questions, k, result):
+    import numpy as np
+    with timed(result, 'embed_seconds'):
+        chunk_vectors = np.array(embeddings.embed_documents(chunks))
+    query_vectors = np.array(embeddings.embed_documents([question for question, _ in questions]))
+
+    chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    top_k = np.argsort(-(query_vectors @ chunk_vectors.T), axis=1)[:, :k]
+
+    hits = sum(
+        1 for (_, answer), indices in zip(questions, top_k)
+        if any(answer in chunks[i] for i in indices)
+    )
+    result['chunks_per_second'] = round(len(chunks) / result['embed_seconds'], 1)
+    result[f'hit_rate_at_{k}'] = round(hits / len(questions), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--documents', type=int, default=50, help='Generated documents (ignored with --input)')
+    parser.add_argument('--input', help='Directory of .md/.txt files to chunk instead of a generated corpus')
+    parser.add_argument('--source-type', default='default', help='Chunking profile of the structure chunker')
+    parser.add_argument('--embed', action='store_true', help='Also time embeddings and measure hit-rate')
+    parser.add_argument('--k', type=int, default=3)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    setup_django()
+    from vectordb.chunking import (
+        CHUNKING_PROFILES, EMBEDDING_MODEL_NAME, MarkdownStructureChunker, RecursiveChunker, token_counter
+    )
+
+    if args.input:
+        corpus, questions = load_corpus(args.input), []
+    else:
+        corpus, questions = build_corpus(args.documents)
+
+    count_tokens = token_counter()
+    model_limit = 256  # all-MiniLM-L6-v2 max_seq_length
+    profile = CHUNKING_PROFILES.get(args.source_type, CHUNKING_PROFILES['default'])
+    chunkers = {
+        'recursive_1200_300': RecursiveChunker(),
+        'structure': MarkdownStructureChunker(
+            max_tokens=profile.max_tokens, overlap_tokens=profile.overlap_tokens, count_tokens=count_tokens
+        ),
+    }
+
+    embeddings = None
+    if args.embed:
+        from langchain_huggingface import HuggingFaceEmbeddings
+        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, model_kwargs={'device': 'cpu'})
+
+    report = {
+        'benchmark': 'chunking',
+        'documents': len(corpus),
+        'corpus_chars': sum(len(document) for document in corpus),
+        'profile': {'source_type': args.source_type, **profile.__dict__},
+    }
+    for name, chunker in chunkers.items():
+        chunks, result = chunk_corpus(chunker, corpus, count_tokens, model_limit)
+        if embeddings is not None and questions:
+            evaluate_retrieval(embeddings, chunks, questions, args.k, result)
+        report[name] = result
+
+    legacy, structure = report['recursive_1200_300'], report['structure']
+    report['chunk_ratio'] = round(structure['chunks'] / max(legacy['chunks'], 1), 3)
+    report['token_ratio'] = round(structure['total_tokens'] / max(legacy['total_tokens'], 1), 3)
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
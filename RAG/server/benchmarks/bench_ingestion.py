@@ -0,0 +1,400 @@
+"""
+Benchmark the ingestion path: scrape/upload -> extract -> chunk -> embed -> store.
+
+Runs the real WebScraper, FileHandler and EDA CSV pipeline offline against a
+throw-away SQLite database, media directory and vector stores. HTML pages are
+served by a local HTTP server; PDF, XLSX and CSV files are generated, or taken
+from a fixture directory with --fixtures. The LLM description of CSVs is
+replaced by a template unless --with-llm is given.
+
+For every corpus the report contains docs/s, chunks/s, embedding calls and
+batch utilization, peak RSS and the size of the vector stores on disk. Peak
+RSS is process-wide, so run one corpus per invocation to isolate it.
+Reports carry the git revision; pass --baseline with an earlier report to
+get the relative change of the throughput figures.
+
+    python -m benchmarks.bench_ingestion --docs 20 --output ingestion.json
+    python -m benchmarks.bench_ingestion --corpora html,csv --baseline ingestion.json
+    python -m benchmarks.bench_ingestion --fixtures ./media/uploads --corpora fixtures
+"""
+import argparse
+import csv
+import functools
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.common import (
+    directory_size_mb, git_revision, peak_rss_mb, setup_django, timed, write_report
+)
+
+CORPORA = ('html', 'pdf', 'xlsx', 'csv')
+
+CONTENT_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.csv': 'text/csv',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.txt': 'application/octet-stream',
+    '.md': 'application/octet-stream',
+}
+
+WORDS = (
+    "policy claim premium coverage contract annual report revenue customer region "
+    "quarter growth risk model analysis system service account payment invoice "
+    "schedule review update process team project budget forecast market product"
+).split()
+
+
+def sentences(rng, count):
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+        for _ in range(count)
+    )
+
+
+def build_site(directory, pages, seed=1):
+    """Pages linked as a binary tree from index.html, so the crawl depth stays small"""
+    rng = random.Random(seed)
+    for page in range(pages):
+        children = [child for child in (2 * page + 1, 2 * page + 2) if child < pages]
+        links = "".join(f'<li><a href="page{child}.html">Page {child}</a></li>' for child in children)
+        rows = "".join(
+            f"<tr><td>item {page}-{i}</td><td>{rng.randint(1, 999)}</td></tr>" for i in range(rng.randint(5, 30))
+        )
+        sections = "".join(
+            f"<h2>Section {section}</h2><p>{sentences(rng, 6)}</p><p>{sentences(rng, 4)}</p>"
+            for section in range(rng.randint(2, 5))
+        )
+        html = (
+            f"<html><head><title>Page {page}</title></head><body>"
+            f"<h1>Page {page}</h1><ul>{links}</ul>{sections}"
+            f"<table><tr><th>item</th><th>amount</th></tr>{rows}</table>"
+            f"<footer>footer text</footer></body></html>"
+        )
+        name = 'index.html' if page == 0 else f'page{page}.html'
+        with open(os.path.join(directory, name), 'w') as html_file:
+            html_file.write(html)
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def build_pdf(path, pages, rng):
+    """Minimal text-only PDF (Helvetica, one text object per page)"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Chapter {page}"] + [
+            " ".join(rng.choice(WORDS) for _ in range(12)) for _ in range(45)
+        ]
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({_pdf_escape(line)}) Tj T*" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream".encode('latin-1'))
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>".encode('latin-1')
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode('latin-1')
+
+    with open(path, 'wb') as pdf_file:
+        pdf_file.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(pdf_file.tell())
+            pdf_file.write(f"{number} 0 obj\n".encode('latin-1') + body + b"\nendobj\n")
+        xref = pdf_file.tell()
+        pdf_file.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1'))
+        for offset in offsets:
+            pdf_file.write(f"{offset:010d} 00000 n \n".encode('latin-1'))
+        pdf_file.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+        )
+
+
+def build_xlsx(path, rows, rng):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet in range(2):
+        worksheet = workbook.create_sheet(f'sheet{sheet}')
+        worksheet.append(['id', 'customer', 'region', 'amount', 'status'])
+        for row in range(rows):
+            worksheet.append([row, f"customer_{rng.randint(1, 500)}", rng.choice(WORDS), rng.randint(1, 10000), rng.choice(WORDS)])
+    workbook.save(path)
+
+
+def build_csv(path, rows, rng):
+    with open(path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['order_id', 'customer_id', 'product', 'quantity', 'price', 'ordered_at'])
+        for row in range(rows):
+            writer.writerow([
+                row, rng.randint(1, 2000), rng.choice(WORDS), rng.randint(1, 20),
+                round(rng.uniform(1, 500), 2), f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            ])
+
+
+def build_files(directory, corpus, docs, rows, seed=1):
+    rng = random.Random(seed)
+    builders = {
+        'pdf': lambda path: build_pdf(path, pages=rng.randint(2, 6), rng=rng),
+        'xlsx': lambda path: build_xlsx(path, rows, rng),
+        'csv': lambda path: build_csv(path, rows, rng),
+    }
+    paths = []
+    for doc in range(docs):
+        path = os.path.join(directory, f"{corpus}_{doc}.{corpus}")
+        builders[corpus](path)
+        paths.append(path)
+    return paths
+
+
+def fixture_files(directory):
+    return [
+        os.path.join(root, name)
+        for root, _, files in os.walk(directory)
+        for name in sorted(files)
+        if os.path.splitext(name)[1].lower() in CONTENT_TYPES
+    ]
+
+
+class EmbeddingRecorder:
+    """
+    Records every SentenceTransformer.encode call, which is where the shared
+    embedding model ends up for documents and queries alike.
+    """
+
+    def __init__(self):
+        self.calls = []  # (texts, batch_size, seconds)
+        self._lock = threading.Lock()
+        self._original = None
+
+    def install(self):
+        from sentence_transformers import SentenceTransformer
+        original = self._original = SentenceTransformer.encode
+        recorder = self
+
+        @functools.wraps(original)
+        def encode(model, sentences, *args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return original(model, sentences, *args, **kwargs)
+            finally:
+                texts = 1 if isinstance(sentences, str) else len(sentences)
+                with recorder._lock:
+                    recorder.calls.append((texts, kwargs.get('batch_size', 32), time.perf_counter() - start_time))
+
+        SentenceTransformer.encode = encode
+
+    def uninstall(self):
+        if self._original is not None:
+            from sentence_transformers import SentenceTransformer
+            SentenceTransformer.encode = self._original
+            self._original = None
+
+    def reset(self):
+        with self._lock:
+            self.calls = []
+
+    def summary(self):
+        calls = list(self.calls)
+        texts = sum(count for count, _, _ in calls)
+        # Every encode call runs ceil(n / batch_size) model batches; a
+        # half-empty batch costs nearly as much as a full one
+        capacity = sum(math.ceil(count / batch_size) * batch_size for count, batch_size, _ in calls)
+        return {
+            'calls': len(calls),
+            'texts': texts,
+            'avg_texts_per_call': round(texts / len(calls), 1) if calls else 0,
+            'batch_utilization': round(texts / capacity, 3) if capacity else 0,
+            'seconds': round(sum(seconds for _, _, seconds in calls), 3),
+        }
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_directory(directory):
+    """Serve directory on a free localhost port; returns (server, base_url)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def ingest_site(user, directory):
+    from web_scraper.models import ScrapedContent, WebsiteScrape
+    from web_scraper.services.scraper import scrape_website
+
+    server, base_url = serve_directory(directory)
+    try:
+        scrape = WebsiteScrape.objects.create(user=user, url=base_url + 'index.html')
+        scrape_website(scrape.id)
+    finally:
+        server.shutdown()
+    return ScrapedContent.objects.filter(scrape=scrape).count()
+
+
+def ingest_files(user, paths):
+    from django.core.files import File
+    from file_uploader.services.file_handler import FileHandler
+    from file_uploader.services.upload_storage import UploadStorage
+
+    completed = 0
+    for path in paths:
+        with open(path, 'rb') as source:
+            storage_name, content_hash, size = UploadStorage.store(File(source, name=os.path.basename(path)))
+        uploaded_file = FileHandler.create_stored_upload(
+            storage_name, content_hash, size, os.path.basename(path),
+            CONTENT_TYPES[os.path.splitext(path)[1].lower()], user
+        )
+        FileHandler.process_uploaded_file(uploaded_file.id)
+        uploaded_file.refresh_from_db()
+        if uploaded_file.status == 'COMPLETED':
+            completed += 1
+        else:
+            print(f"⚠️ {uploaded_file.filename}: {uploaded_file.processing_error}")
+    return completed
+
+
+def offline_csv_description(self, csv_metadata):
+    """Stand-in for the LLM description so the benchmark needs no network"""
+    columns = ", ".join(column['name'] for column in csv_metadata['columns'])
+    csv_metadata['description'] = f"{csv_metadata['filename']} with columns {columns}"
+    return csv_metadata
+
+
+def measure(name, run, recorder, stores):
+    recorder.reset()
+    result = {}
+    with timed(result, 'seconds'):
+        docs = run()
+    embedding = recorder.summary()
+    seconds = result['seconds']
+    result.update({
+        'docs': docs,
+        'chunks': embedding['texts'],
+        'docs_per_second': round(docs / seconds, 2) if seconds else 0,
+        'chunks_per_second': round(embedding['texts'] / seconds, 1) if seconds else 0,
+        'embedding': embedding,
+        'embedding_share': round(embedding['seconds'] / seconds, 3) if seconds else 0,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'store_mb': round(sum(directory_size_mb(store) for store in stores), 2),
+    })
+    result['seconds'] = round(seconds, 3)
+    print(f"📊 {name}: {docs} docs, {embedding['texts']} chunks in {seconds:.2f}s")
+    return result
+
+
+def compare(report, baseline):
+    """Relative change of throughput against an earlier report (positive is faster)"""
+    changes = {}
+    for corpus, result in report['corpora'].items():
+        previous = baseline.get('corpora', {}).get(corpus)
+        if not previous:
+            continue
+        changes[corpus] = {
+            key: round(result[key] / previous[key] - 1, 3)
+            for key in ('docs_per_second', 'chunks_per_second')
+            if previous.get(key)
+        }
+        if previous.get('peak_rss_mb'):
+            changes[corpus]['peak_rss_mb'] = round(result['peak_rss_mb'] / previous['peak_rss_mb'] - 1, 3)
+    return {'revision': baseline.get('revision'), 'changes': changes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpora', default=','.join(CORPORA), help='Comma separated: html, pdf, xlsx, csv, fixtures')
+    parser.add_argument('--docs', type=int, default=10, help='Generated documents (pages for html) per corpus')
+    parser.add_argument('--rows', type=int, default=2000, help='Rows per generated XLSX sheet / CSV file')
+    parser.add_argument('--fixtures', help='Directory of real files for the "fixtures" corpus')
+    parser.add_argument('--with-llm', action='store_true', help='Describe CSVs with the configured LLM')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory for inspection')
+    parser.add_argument('--baseline', help='Earlier JSON report to compare against')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+    corpora = [corpus.strip() for corpus in args.corpora.split(',') if corpus.strip()]
+
+    work_dir = tempfile.mkdtemp(prefix='bench_ingestion_')
+    stores = [os.path.join(work_dir, 'vectordb'), os.path.join(work_dir, 'eda_vectordb')]
+    # Everything the app writes goes to the working directory
+    os.environ.update({
+        'DATABASE_ENGINE': 'django.db.backends.sqlite3',
+        'DATABASE_NAME': os.path.join(work_dir, 'bench.sqlite3'),
+        'VECTOR_DB_DIRECTORY': stores[0],
+        'EDA_VECTOR_DB_DIRECTORY': stores[1],
+    })
+    setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.contrib.auth import get_user_model
+    settings.MEDIA_ROOT = os.path.join(work_dir, 'media')
+    call_command('migrate', run_syncdb=True, verbosity=0)
+    user = get_user_model().objects.create_user(email='bench@example.com', password='bench')
+
+    if not args.with_llm:
+        from eda_pipeline.services.eda_groq_service import EdaGroqService
+        EdaGroqService.generate_csv_description = offline_csv_description
+
+    recorder = EmbeddingRecorder()
+    recorder.install()
+    report = {
+        'benchmark': 'ingestion',
+        'revision': git_revision(),
+        'docs': args.docs,
+        'rows': args.rows,
+        'chunker': settings.VECTOR_CHUNKER,
+    }
+    try:
+        # Load the embedding model up front so it is not billed to the first corpus
+        with timed(report, 'model_load_seconds'):
+            from vectordb import vector_db
+            vector_db.embeddings.embed_query("warm up")
+        report['model_load_seconds'] = round(report['model_load_seconds'], 3)
+
+        results = {}
+        for corpus in corpora:
+            corpus_dir = os.path.join(work_dir, 'corpus', corpus)
+            os.makedirs(corpus_dir, exist_ok=True)
+            if corpus == 'html':
+                build_site(corpus_dir, args.docs)
+                run = functools.partial(ingest_site, user, corpus_dir)
+            elif corpus == 'fixtures':
+                if not args.fixtures:
+                    parser.error('the fixtures corpus needs --fixtures DIR')
+                run = functools.partial(ingest_files, user, fixture_files(args.fixtures))
+            elif corpus in CORPORA:
+                run = functools.partial(ingest_files, user, build_files(corpus_dir, corpus, args.docs, args.rows))
+            else:
+                parser.error(f'unknown corpus {corpus!r}')
+            results[corpus] = measure(corpus, run, recorder, stores)
+        report['corpora'] = results
+    finally:
+        recorder.uninstall()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            report['work_dir'] = work_dir
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            report['baseline'] = compare(report, json.load(baseline_file))
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
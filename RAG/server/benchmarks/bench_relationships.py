@@ -0,0 +1,232 @@
+"""
+Benchmark CSV relationship detection: the previous pairwise set comparison
+against the signature based RelationshipDetector.
+
+Synthetic tables are generated column by column from fixed seeds, so a
+column can be regenerated for verification without keeping its table:
+
+- t<i>_id: primary key of table i (disjoint ranges per table)
+- t<j>_ref_id: foreign keys of table i into table j (the planted relationships)
+- metric_<c>: floats, same names in every table but no shared values
+- code_<c>: small integer codes, same names but disjoint per table
+
+Every *_id pair is a name candidate and every metric/code column a same-name
+candidate, which is the worst case for the name heuristics. CSV parsing is
+not measured; both methods receive the same in-memory columns.
+
+Each method runs in its own process so peak memory is reported separately.
+The legacy method keeps every table in memory, so it is skipped above
+--legacy-max-cells unless forced.
+
+    python -m benchmarks.bench_relationships --files 10 --columns 20 --rows 100000
+    python -m benchmarks.bench_relationships --files 50 --columns 50 --rows 1000000 --output rel.json
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import SERVER_DIR, git_revision, peak_rss_mb, write_report
+from eda_pipeline.services.relationship_detector import RelationshipDetector
+
+FOREIGN_KEYS_PER_TABLE = 2
+
+
+def table_name(index):
+    return f"table_{index:03d}.csv"
+
+
+def table_columns(index, files, columns):
+    """Column names of table index; the first FOREIGN_KEYS_PER_TABLE tables after it are referenced"""
+    names = [f"t{index}_id"]
+    targets = [(index + offset) % files for offset in range(1, FOREIGN_KEYS_PER_TABLE + 1) if files > 1]
+    names += [f"t{target}_ref_id" for target in dict.fromkeys(targets) if target != index]
+    filler = max(columns - len(names), 0)
+    names += [f"metric_{c}" if c % 2 == 0 else f"code_{c}" for c in range(filler)]
+    return names
+
+
+def make_column(index, column, rows):
+    """Deterministic values of one column of table index"""
+    rng = np.random.default_rng([index, zlib.crc32(column.encode())])
+    if column == f"t{index}_id":
+        return pd.Series(np.arange(rows, dtype=np.int64) + index * 10 * rows)
+    if column.endswith("_ref_id"):
+        target = int(column[1:column.index("_")])
+        return pd.Series(rng.integers(0, rows, rows) + target * 10 * rows)
+    if column.startswith("metric_"):
+        return pd.Series(rng.random(rows) + index)
+    return pd.Series(rng.integers(0, 50, rows) + index * 100)
+
+
+def planted_relationships(files, columns):
+    planted = set()
+    for index in range(files):
+        for column in table_columns(index, files, columns):
+            if column.endswith("_ref_id"):
+                target = int(column[1:column.index("_")])
+                planted.add(tuple(sorted((table_name(index), table_name(target)))))
+    return planted
+
+
+def legacy_detect(dataframes):
+    """The previous detect_csv_relationships comparison, on already loaded frames"""
+    potential_joins = defaultdict(list)
+    dtypes = {name: {col: str(df[col].dtype) for col in df.columns} for name, df in dataframes.items()}
+
+    def compatible(type1, type2):
+        return type1 == type2 or ('object' in type1 and 'object' in type2) or ('str' in type1 and 'str' in type2)
+
+    for file1 in dataframes:
+        for file2 in dataframes:
+            if file1 >= file2:
+                continue
+            joins = []
+            for col in set(dataframes[file1].columns).intersection(dataframes[file2].columns):
+                if compatible(dtypes[file1][col], dtypes[file2][col]):
+                    set1 = set(dataframes[file1][col].dropna().astype(str).tolist())
+                    set2 = set(dataframes[file2][col].dropna().astype(str).tolist())
+                    if len(set1.intersection(set2)) > 0:
+                        joins.append((col, col))
+            if not joins:
+                for col1 in dataframes[file1].columns:
+                    for col2 in dataframes[file2].columns:
+                        if col1 == col2:
+                            continue
+                        name_similarity = (col1.lower() in col2.lower() or col2.lower() in col1.lower() or
+                                           ("id" in col1.lower() and "id" in col2.lower()) or
+                                           ("customer" in col1.lower() and "id" in col2.lower()))
+                        if not name_similarity or not compatible(dtypes[file1][col1], dtypes[file2][col2]):
+                            continue
+                        set1 = set(dataframes[file1][col1].dropna().astype(str).tolist())
+                        set2 = set(dataframes[file2][col2].dropna().astype(str).tolist())
+                        if len(set1.intersection(set2)) > 0:
+                            joins.append((col1, col2))
+            if joins:
+                potential_joins[(file1, file2)] = joins
+    return potential_joins
+
+
+def run_legacy(files, columns, rows):
+    start_time = time.perf_counter()
+    dataframes = {
+        table_name(index): pd.DataFrame({
+            column: make_column(index, column, rows) for column in table_columns(index, files, columns)
+        })
+        for index in range(files)
+    }
+    generate_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    potential_joins = legacy_detect(dataframes)
+    return {
+        'generate_seconds': round(generate_seconds, 3),
+        'detect_seconds': round(time.perf_counter() - start_time, 3),
+    }, potential_joins
+
+
+def run_sketch(files, columns, rows):
+    detector = RelationshipDetector()
+    signatures = {}
+    generate_seconds = signature_seconds = 0.0
+    for index in range(files):
+        start_time = time.perf_counter()
+        df = pd.DataFrame({column: make_column(index, column, rows) for column in table_columns(index, files, columns)})
+        generate_seconds += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        signatures[table_name(index)] = detector.file_signature(df)
+        signature_seconds += time.perf_counter() - start_time
+        del df
+
+    loaded = []
+
+    def load_column(filename, column):
+        loaded.append((filename, column))
+        return make_column(int(filename[6:9]), column, rows)
+
+    start_time = time.perf_counter()
+    potential_joins = detector.detect(signatures, load_column)
+    return {
+        'generate_seconds': round(generate_seconds, 3),
+        'signature_seconds': round(signature_seconds, 3),
+        'detect_seconds': round(time.perf_counter() - start_time, 3),
+        'columns_loaded_for_verification': len(loaded),
+    }, potential_joins
+
+
+def run_method(method, files, columns, rows):
+    runner = run_legacy if method == 'legacy' else run_sketch
+    result, potential_joins = runner(files, columns, rows)
+    planted = planted_relationships(files, columns)
+    found = set(potential_joins)
+    result.update(
+        relationships_found=len(found),
+        planted_found=len(found & planted),
+        planted_total=len(planted),
+        extra_relationships=len(found - planted),
+        peak_rss_mb=round(peak_rss_mb(), 1),
+    )
+    return result
+
+
+def run_in_subprocess(method, args):
+    command = [
+        sys.executable, '-m', 'benchmarks.bench_relationships', '--method', method,
+        '--files', str(args.files), '--columns', str(args.columns), '--rows', str(args.rows), '--child'
+    ]
+    completed = subprocess.run(command, cwd=SERVER_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{method} run failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=10)
+    parser.add_argument('--columns', type=int, default=20)
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--method', choices=['both', 'legacy', 'sketch'], default='both')
+    parser.add_argument('--legacy-max-cells', type=int, default=50_000_000,
+                        help='Skip the legacy method above files*columns*rows cells (it holds all of them)')
+    parser.add_argument('--force-legacy', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    if args.child:
+        # Runs inside run_in_subprocess; the last stdout line is the result
+        print(json.dumps(run_method(args.method, args.files, args.columns, args.rows)))
+        return
+
+    cells = args.files * args.columns * args.rows
+    methods = ['legacy', 'sketch'] if args.method == 'both' else [args.method]
+    if 'legacy' in methods and cells > args.legacy_max_cells and not args.force_legacy:
+        print(f"Skipping legacy method for {cells:,} cells (use --force-legacy)", file=sys.stderr)
+        methods.remove('legacy')
+
+    report = {
+        'benchmark': 'relationships',
+        'revision': git_revision(),
+        'files': args.files,
+        'columns': args.columns,
+        'rows': args.rows,
+    }
+    for method in methods:
+        report[method] = run_in_subprocess(method, args)
+
+    if 'legacy' in report and 'sketch' in report:
+        sketch_seconds = report['sketch']['signature_seconds'] + report['sketch']['detect_seconds']
+        report['speedup'] = round(report['legacy']['detect_seconds'] / max(sketch_seconds, 1e-9), 2)
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
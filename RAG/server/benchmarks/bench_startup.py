@@ -0,0 +1,137 @@
+"""
+Benchmark Django startup: management commands and WSGI worker boot.
+
+Each measurement runs in a fresh Python process:
+
+- check: `manage.py check`, which every management command pays for
+- worker_boot: importing scraper_project.wsgi with VECTORDB_WARMUP off
+- worker_boot_warm: the same with the warm-up enabled (models loaded at boot)
+- first_vector_use: worker boot without warm-up plus the first embedding,
+  i.e. what the first request pays when nothing was warmed up
+
+With --compare REV the same measurements run against another revision
+checked out in a temporary git worktree, giving before/after numbers.
+
+    python -m benchmarks.bench_startup --repeat 5
+    python -m benchmarks.bench_startup --compare HEAD~1 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.common import SERVER_DIR, git_revision, write_report
+
+WORKER_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import scraper_project.wsgi
+boot = time.perf_counter() - start
+result = {'boot': boot}
+if FIRST_USE:
+    from vectordb import vector_db
+    vector_db.embeddings.embed_query('first request')
+    result['first_use'] = time.perf_counter() - start
+print(json.dumps(result))
+"""
+
+
+def worker_command(first_use):
+    return [sys.executable, '-c', WORKER_SCRIPT.replace('FIRST_USE', str(first_use))]
+
+
+def run(command, server_dir, env):
+    """Run command in server_dir; returns (wall seconds, stdout)"""
+    start_time = time.perf_counter()
+    completed = subprocess.run(command, cwd=server_dir, env=env, capture_output=True, text=True)
+    seconds = time.perf_counter() - start_time
+    if completed.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{completed.stderr[-2000:]}")
+    return seconds, completed.stdout
+
+
+def last_json_line(output):
+    for line in reversed(output.strip().splitlines()):
+        if line.startswith('{'):
+            return json.loads(line)
+    raise ValueError('no JSON result in output')
+
+
+def summarize(samples):
+    return {
+        'median': round(statistics.median(samples), 3),
+        'min': round(min(samples), 3),
+        'max': round(max(samples), 3),
+    }
+
+
+def measure(server_dir, repeat, skip_models):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='scraper_project.settings', PYTHONDONTWRITEBYTECODE='1')
+    cold_env = dict(env, VECTORDB_WARMUP='False')
+    warm_env = dict(env, VECTORDB_WARMUP='True')
+    samples = {'check': [], 'worker_boot': []}
+    if not skip_models:
+        samples.update(worker_boot_warm=[], first_vector_use=[])
+
+    for _ in range(repeat):
+        seconds, _ = run([sys.executable, 'manage.py', 'check'], server_dir, cold_env)
+        samples['check'].append(seconds)
+
+        _, output = run(worker_command(False), server_dir, cold_env)
+        samples['worker_boot'].append(last_json_line(output)['boot'])
+        if skip_models:
+            continue
+
+        _, output = run(worker_command(False), server_dir, warm_env)
+        samples['worker_boot_warm'].append(last_json_line(output)['boot'])
+
+        _, output = run(worker_command(True), server_dir, cold_env)
+        samples['first_vector_use'].append(last_json_line(output)['first_use'])
+
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--compare', help='Git revision to measure as the baseline, e.g. HEAD~1')
+    parser.add_argument('--skip-models', action='store_true', help='Only measure check and cold worker boot')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'startup',
+        'revision': git_revision(),
+        'repeat': args.repeat,
+        'current': measure(SERVER_DIR, args.repeat, args.skip_models),
+    }
+
+    if args.compare:
+        repo_root = subprocess.run(
+            ['git', 'rev-parse', '--show-toplevel'], cwd=SERVER_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        with tempfile.TemporaryDirectory(prefix='bench_startup_') as worktree:
+            subprocess.run(['git', 'worktree', 'add', '--detach', worktree, args.compare], cwd=repo_root, check=True)
+            try:
+                baseline_dir = os.path.join(worktree, os.path.relpath(SERVER_DIR, repo_root))
+                report['baseline'] = {
+                    'revision': args.compare,
+                    **measure(baseline_dir, args.repeat, args.skip_models)
+                }
+            finally:
+                subprocess.run(['git', 'worktree', 'remove', '--force', worktree], cwd=repo_root)
+        report['speedup'] = {
+            name: round(report['baseline'][name]['median'] / result['median'], 2)
+            for name, result in report['current'].items()
+            if name in report['baseline'] and result['median']
+        }
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
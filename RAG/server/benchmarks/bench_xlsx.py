@@ -0,0 +1,99 @@
+"""
+Benchmark XLSX -> markdown conversion.
+
+Compares the legacy full-load converter (load_workbook + string concatenation)
+with the streaming read-only converter on a generated workbook.
+
+    python -m benchmarks.bench_xlsx --rows 100000 --columns 12 --output xlsx.json
+"""
+import argparse
+import os
+import tempfile
+import tracemalloc
+
+from benchmarks.common import timed, write_report
+
+
+def build_workbook(path, rows, columns):
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('data')
+    worksheet.append([f"column_{i}" for i in range(columns)])
+    for row in range(rows):
+        worksheet.append([row if i == 0 else f"value_{row}_{i}" for i in range(columns)])
+    workbook.save(path)
+
+
+def legacy_extract(file_path):
+    """The converter as it was before streaming support"""
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, data_only=True)
+    markdown = ""
+    for sheet in workbook.sheetnames:
+        worksheet = workbook[sheet]
+        markdown += f"## {sheet}\n\n"
+        for row in worksheet.iter_rows(values_only=True):
+            row_md = "| " + " | ".join([str(cell) if cell is not None else "" for cell in row]) + " |\n"
+            markdown += row_md
+        markdown += "\n"
+    return markdown
+
+
+def streaming_extract(file_path):
+    from file_uploader.services.markdown_converter import extract_markdown_from_xlsx
+    return extract_markdown_from_xlsx(file_path)
+
+
+def streaming_chunks(file_path):
+    """Consume the chunk iterator without joining, as the embedding path does"""
+    from file_uploader.services.markdown_converter import iter_markdown_from_xlsx
+    total_chars = 0
+    for chunk, _ in iter_markdown_from_xlsx(file_path):
+        total_chars += len(chunk)
+    return total_chars
+
+
+def measure(func, file_path):
+    """Time an untraced run, then measure peak Python allocations in a traced run"""
+    result = {}
+    with timed(result, 'seconds'):
+        output = func(file_path)
+    result['output_chars'] = output if isinstance(output, int) else len(output or '')
+
+    tracemalloc.start()
+    func(file_path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result['peak_python_mb'] = round(peak / (1024 * 1024), 2)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--columns', type=int, default=12)
+    parser.add_argument('--skip-legacy', action='store_true', help='Only run the streaming converter')
+    parser.add_argument('--output', help='Write the JSON report to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bench.xlsx')
+        build_workbook(path, args.rows, args.columns)
+
+        report = {
+            'benchmark': 'xlsx_to_markdown',
+            'rows': args.rows,
+            'columns': args.columns,
+            'file_mb': round(os.path.getsize(path) / (1024 * 1024), 2),
+            'streaming': measure(streaming_extract, path),
+            'streaming_chunks': measure(streaming_chunks, path),
+        }
+        if not args.skip_legacy:
+            report['legacy'] = measure(legacy_extract, path)
+            report['speedup'] = round(report['legacy']['seconds'] / report['streaming']['seconds'], 2)
+
+    write_report(report, args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+
+def setup_django():
+    """Configure Django so app modules (vector store, models) can be imported"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scraper_project.settings')
+    import django
+    django.setup()
+
+
+@contextmanager
+def timed(results, key):
+    """Store the wall-clock duration of the block in results[key]"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        results[key] = time.perf_counter() - start_time
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def percentiles(samples, points=(50, 95, 99)):
+    """Nearest-rank percentiles of samples, e.g. {'p50': ..., 'p95': ..., 'p99': ...}"""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f'p{point}': None for point in points}
+    return {
+        f'p{point}': round(ordered[min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))], 4)
+        for point in points
+    }
+
+
+def directory_size_mb(path):
+    """Total size of the files below path in MB"""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def git_revision():
+    """Commit the benchmark ran against, so reports can be compared across commits"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVER_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(report, output=None):
+    """Print the report as JSON and optionally write it to a file"""
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+    if output:
+        with open(output, 'w') as report_file:
+            report_file.write(text)
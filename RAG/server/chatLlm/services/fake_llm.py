@@ -0,0 +1,68 @@
+import os
+import time
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+from langchain_core.messages import AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """
+    Local stand-in for ChatGroq, used for load tests and offline development.
+
+    Waits first_token_latency seconds, then streams response_tokens tokens at
+    tokens_per_second. The answer is built from words of the prompt, so its
+    content varies with the retrieved context. Enabled with CHAT_LLM_BACKEND=fake.
+    """
+    first_token_latency: float = 0.3
+    tokens_per_second: float = 250.0
+    response_tokens: int = 200
+    streaming: bool = True
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            first_token_latency=float(os.getenv("FAKE_LLM_FIRST_TOKEN_LATENCY", "0.3")),
+            tokens_per_second=float(os.getenv("FAKE_LLM_TOKENS_PER_SECOND", "250")),
+            response_tokens=int(os.getenv("FAKE_LLM_RESPONSE_TOKENS", "200")),
+        )
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat"
+
+    def _tokens(self, messages):
+        words = " ".join(str(message.content) for message in messages).split() or ["answer"]
+        yield "ANSWER: "
+        for i in range(max(self.response_tokens - 1, 0)):
+            yield words[i % len(words)] + " "
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_latency)
+        interval = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        start_time = time.perf_counter()
+        for i, token in enumerate(self._tokens(messages)):
+            # Pace against the start time so sleep overshoot does not add up
+            delay = start_time + i * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return generate_from_stream(self._stream(messages, stop, run_manager, **kwargs))
@@ -1,13 +1,12 @@
-from langchain.chains import ConversationalRetrievalChain
-from langchain.prompts import PromptTemplate
-from langchain_groq import ChatGroq
 import os
 from dotenv import load_dotenv
 from chatLlm.services.retriever_service import RetrieverService
 from vectordb import vector_db
-from langgraph.graph import END
 load_dotenv()
 
+# LangChain modules are imported where they are used, so loading the URLconf
+# (runserver, manage.py check, migrations) does not import them
+
 
 class StreamingCallbackHandler:
     def __init__(self, queue):
@@ -24,6 +23,7 @@ class StreamingCallbackHandler:
             self.queue.put(token)
 
     def on_llm_end(self, response, **kwargs):
+        from langgraph.graph import END
         self.queue.put(END)
 
     def on_llm_error(self, error, **kwargs):
@@ -38,19 +38,31 @@ class StreamingCallbackHandler:
         pass
 
 
+def create_chat_model():
+    """Chat model selected by CHAT_LLM_BACKEND: 'groq' (default) or 'fake' for load tests"""
+    if os.getenv("CHAT_LLM_BACKEND", "groq") == "fake":
+        from chatLlm.services.fake_llm import FakeStreamingChatModel
+        return FakeStreamingChatModel.from_env()
+    from langchain_groq import ChatGroq
+    return ChatGroq(
+        api_key=os.getenv("GROQ_API_KEY"),
+        model_name=os.getenv("GROQ_MODEL_NAME", "llama-3.3-70b-specdec"),
+        temperature=float(os.getenv("GROQ_TEMPERATURE", "0.7")),
+        streaming=True
+    )
+
+
 class GroqChatService:
     def __init__(self, user_id):
-        self.chat_model = ChatGroq(
-            api_key=os.getenv("GROQ_API_KEY"),
-            model_name=os.getenv("GROQ_MODEL_NAME", "llama-3.3-70b-specdec"),
-            temperature=float(os.getenv("GROQ_TEMPERATURE", "0.7")),
-            streaming=True
-        )
+        self.chat_model = create_chat_model()
         self.retriever_service = RetrieverService(vector_db, user_id)
         self.chain = None
         self.user_id = user_id
 
     def _create_chain(self, chat_history=None, streaming_callback=None, scrape_ids=None):
+        from langchain.chains import ConversationalRetrievalChain
+        from langchain.prompts import PromptTemplate
+
         # Get retriever with top_k from environment or default to 4
         top_k = int(os.getenv("RETRIEVAL_TOP_K", 4))
         retriever = self.retriever_service.get_reranking_retriever(
@@ -1,6 +1,3 @@
-from langchain.retrievers import ContextualCompressionRetriever
-from langchain.retrievers.document_compressors import CrossEncoderReranker
-from langchain_community.cross_encoders import HuggingFaceCrossEncoder
 import os
 from dotenv import load_dotenv
 
@@ -10,6 +7,7 @@ load_dotenv()
 
 class RetrieverService:
     def __init__(self, vector_db, user_id):
+        from langchain_community.cross_encoders import HuggingFaceCrossEncoder
         self.db = vector_db.db
         self.user_id = user_id
         self.cross_encoder = HuggingFaceCrossEncoder(
@@ -26,6 +24,9 @@ class RetrieverService:
             k: Number of documents to return after re-ranking
             scrape_ids: Optional list of scrape_ids to filter documents by
         """
+        from langchain.retrievers import ContextualCompressionRetriever
+        from langchain.retrievers.document_compressors import CrossEncoderReranker
+
         # Use environment variable if k is not provided
         if k is None:
             k = int(os.getenv("RETRIEVAL_TOP_K", 6))
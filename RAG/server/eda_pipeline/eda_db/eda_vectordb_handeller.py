@@ -1,32 +1,34 @@
 import os
 import json
+import threading
+import time
 from pathlib import Path
 from typing import List, Dict, Any, Optional
 from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 import pandas as pd
 import numpy as np
-from collections import defaultdict
+from django.conf import settings
+from vectordb.embeddings import get_embeddings
+from eda_pipeline.services.csv_catalog import CsvCatalog
 
 
 class EdaVectorDBHandler:
     """Handler for EDA vectorstore operations"""
     
-    def __init__(self, persist_directory=None):
-        """Initialize with a persistent directory for ChromaDB"""
-        # Initialize embeddings
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
-            model_kwargs={"device": "cpu"}
-        )
+    def __init__(self, persist_directory=None, embeddings=None):
+        """
+        Initialize with a persistent directory for ChromaDB. Use
+        EdaVectorDBSingleton.get_instance() rather than constructing one per call.
+        """
+        start_time = time.time()
+        # Same model as the main vector store, loaded once per process
+        self.embeddings = embeddings or get_embeddings()
         
         # Set default persist directory if none provided
         if persist_directory is None:
-            # Get the directory of the current file (eda_vectordb_handeller.py)
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            # Set the persist directory to a 'chroma_db' subfolder
-            persist_directory = os.path.join(current_dir, 'chroma_db')
+            # Defaults to the 'chroma_db' folder next to this file
+            persist_directory = settings.EDA_VECTOR_DB_DIRECTORY
         
         # Initialize ChromaDB
         self.persist_directory = persist_directory
@@ -38,6 +40,15 @@ class EdaVectorDBHandler:
             persist_directory=persist_directory,
             embedding_function=self.embeddings
         )
+        self.load_seconds = time.time() - start_time
+
+    def stats(self):
+        """Load time and size of the store, as reported after warm-up"""
+        return {
+            "persist_directory": self.persist_directory,
+            "load_seconds": round(self.load_seconds, 3),
+            "documents": self.vectorstore._collection.count(),
+        }
     
     def json_serializable(self, obj):
         """Convert complex types to JSON serializable types"""
@@ -134,74 +145,97 @@ class EdaVectorDBHandler:
         # Only add the main CSV description document, not the column document
         self.vectorstore.add_documents([csv_doc])
         self.vectorstore.persist()
+        CsvCatalog.invalidate(user_id, scrape_ids=[scrape_id] if scrape_id else None)
         
         print(f"✅ Stored {csv_metadata['filename']} in vector database")
         return csv_doc
 
+    @staticmethod
+    def _csv_description_filter(user_id=None):
+        filter_dict = {"type": {"$eq": "csv_description"}}
+        
+        # Add user_id to filter if provided
+        if user_id:
+            filter_dict = {"$and": [
+                filter_dict,
+                {"user_id": {"$eq": str(user_id)}}
+            ]}
+        return filter_dict
+
+    @staticmethod
+    def _csv_entry(metadata, page_content):
+        """Parsed CSV description document, as returned by retrieve_csv_descriptions (without the score)"""
+        # Handle case where full_metadata might be missing
+        try:
+            csv_metadata = json.loads(metadata.get("full_metadata", "{}"))
+            
+            # If metadata is empty, extract what we can from the document itself
+            if not csv_metadata:
+                filename = metadata.get("filename", "unknown_file")
+                filepath = metadata.get("filepath", "unknown_path")
+                description = page_content.split("Description:", 1)[1].split("\n", 1)[0].strip() if "Description:" in page_content else "No description available"
+                
+                csv_metadata = {
+                    "filename": filename,
+                    "filepath": filepath,
+                    "description": description
+                }
+        except Exception as e:
+            print(f"Warning: Error parsing metadata for document: {str(e)}")
+            # Create minimal metadata from document
+            filename = metadata.get("filename", "unknown_file")
+            filepath = metadata.get("filepath", "unknown_path")
+            
+            csv_metadata = {
+                "filename": filename,
+                "filepath": filepath,
+                "description": "Metadata unavailable"
+            }
+        
+        return {
+            "filename": csv_metadata.get("filename", "unknown_file"),
+            "filepath": csv_metadata.get("filepath", "unknown_path"),
+            "description": csv_metadata.get("description", "No description available"),
+            "metadata": csv_metadata,
+            "user_id": metadata.get("user_id"),
+            "scrape_id": metadata.get("scrape_id")
+        }
+
+    def search_csv_description_ids(self, query, k=3, user_id=None):
+        """Ids and distances of the k CSV descriptions closest to query; their metadata is not fetched"""
+        results = self.vectorstore._collection.query(
+            query_embeddings=[self.embeddings.embed_query(query)],
+            n_results=k,
+            where=self._csv_description_filter(user_id),
+            include=["distances"]
+        )
+        return results["ids"][0], results["distances"][0]
+
+    def get_csv_descriptions(self, ids):
+        """Parsed CSV description documents by document id"""
+        results = self.vectorstore._collection.get(ids=list(ids), include=["metadatas", "documents"])
+        return {
+            doc_id: self._csv_entry(metadata or {}, document or "")
+            for doc_id, metadata, document in zip(results["ids"], results["metadatas"], results["documents"])
+        }
+
     def retrieve_csv_descriptions(self, query, k=3, user_id=None, scrape_id=None):
         """Retrieve the k most relevant CSV descriptions based on a query"""
         try:
             # Search for relevant CSV descriptions
-            filter_dict = {"type": {"$eq": "csv_description"}}
-            
-            # Add user_id and scrape_id to filter if provided
-            if user_id:
-                filter_dict = {"$and": [
-                    filter_dict,
-                    {"user_id": {"$eq": str(user_id)}}
-                ]}
-            
-            # if scrape_id:
-            #     filter_dict = {"$and": [
-            #         filter_dict,
-            #         {"scrape_id": {"$eq": str(scrape_id)}}
-            #     ]}
-            
+            # (scrape_id is not used as a filter)
             documents = self.vectorstore.similarity_search_with_score(
                 query, 
                 k=k,
-                filter=filter_dict
+                filter=self._csv_description_filter(user_id)
             )
             
             # Format the results for visualization and use
             results = []
             for doc, score in documents:
-                # Handle case where full_metadata might be missing
-                try:
-                    csv_metadata = json.loads(doc.metadata.get("full_metadata", "{}"))
-                    
-                    # If metadata is empty, extract what we can from the document itself
-                    if not csv_metadata:
-                        filename = doc.metadata.get("filename", "unknown_file")
-                        filepath = doc.metadata.get("filepath", "unknown_path")
-                        description = doc.page_content.split("Description:", 1)[1].split("\n", 1)[0].strip() if "Description:" in doc.page_content else "No description available"
-                        
-                        csv_metadata = {
-                            "filename": filename,
-                            "filepath": filepath,
-                            "description": description
-                        }
-                except Exception as e:
-                    print(f"Warning: Error parsing metadata for document: {str(e)}")
-                    # Create minimal metadata from document
-                    filename = doc.metadata.get("filename", "unknown_file")
-                    filepath = doc.metadata.get("filepath", "unknown_path")
-                    
-                    csv_metadata = {
-                        "filename": filename,
-                        "filepath": filepath,
-                        "description": "Metadata unavailable"
-                    }
-                
-                results.append({
-                    "filename": csv_metadata.get("filename", "unknown_file"),
-                    "filepath": csv_metadata.get("filepath", "unknown_path"),
-                    "description": csv_metadata.get("description", "No description available"),
-                    "similarity_score": score,
-                    "metadata": csv_metadata,
-                    "user_id": doc.metadata.get("user_id"),
-                    "scrape_id": doc.metadata.get("scrape_id")
-                })
+                result = self._csv_entry(doc.metadata, doc.page_content)
+                result["similarity_score"] = score
+                results.append(result)
             
             # Log retrieval results
             print(f"📊 Retrieved {len(results)} relevant CSV files for query: '{query}'")
@@ -287,8 +321,40 @@ class EdaVectorDBHandler:
         
         return None
     
+    def get_csv_metadata(self, scrape_id):
+        """Return the stored full metadata of a CSV by scrape_id without a similarity search"""
+        try:
+            results = self.vectorstore._collection.get(
+                where={"$and": [
+                    {"scrape_id": {"$eq": str(scrape_id)}},
+                    {"type": {"$eq": "csv_description"}}
+                ]},
+                include=["metadatas"],
+                limit=1
+            )
+            if results['metadatas']:
+                return json.loads(results['metadatas'][0].get("full_metadata", "{}")) or None
+        except Exception as e:
+            print(f"Error reading CSV metadata for scrape_id {scrape_id}: {str(e)}")
+        return None
+
+    @staticmethod
+    def relationships_summary(potential_joins):
+        """Textual summary of join keys, as used in the relationship prompt"""
+        relationships_summary = "CSV Relationship Summary:\n"
+        for (file1, file2), join_keys in potential_joins.items():
+            relationships_summary += f"\n{file1} can be joined with {file2} on:\n"
+            for col1, col2 in join_keys:
+                relationships_summary += f"  - {file1}.{col1} = {file2}.{col2}\n"
+        return relationships_summary
+
     def store_csv_relationships(self, potential_joins, user_id=None, scrape_id=None):
-        """Store CSV relationship information in the vector database"""
+        """
+        Store a relationship summary document in the vector database.
+
+        Uploaded CSVs are linked in the RelationshipGraph instead, which is
+        what retrieve_csv_relationships reads.
+        """
         # Convert complex metadata to simple strings to avoid ChromaDB errors
         simplified_joins = {}
         for (file1, file2), joins in potential_joins.items():
@@ -298,11 +364,7 @@ class EdaVectorDBHandler:
             simplified_joins[key] = value
         
         # Create a textual summary of relationships
-        relationships_summary = "CSV Relationship Summary:\n"
-        for (file1, file2), join_keys in potential_joins.items():
-            relationships_summary += f"\n{file1} can be joined with {file2} on:\n"
-            for col1, col2 in join_keys:
-                relationships_summary += f"  - {file1}.{col1} = {file2}.{col2}\n"
+        relationships_summary = self.relationships_summary(potential_joins)
         
         # Create metadata dictionary
         metadata_dict = {
@@ -328,46 +390,15 @@ class EdaVectorDBHandler:
         return relationship_doc
     
     def retrieve_csv_relationships(self, user_id=None, scrape_id=None):
-        """Retrieve CSV relationship information from the vector database"""
+        """Join keys of the user's CSVs (those touching scrape_id if given) from the relationship graph"""
+        from eda_pipeline.services.relationship_graph import RelationshipGraph
         try:
-            # Build filter conditions
-            filter_conditions = [
-                {"type": {"$eq": "csv_relationships"}}
-            ]
-            
-            if user_id:
-                filter_conditions.append({"user_id": {"$eq": str(user_id)}})
-            
-            if scrape_id:
-                filter_conditions.append({"scrape_id": {"$eq": str(scrape_id)}})
-                
-            filter_dict = {"$and": filter_conditions} if len(filter_conditions) > 1 else filter_conditions[0]
-            
-            # Search for relationship document
-            documents = self.vectorstore.similarity_search(
-                "csv relationships joins tables", 
-                k=1, 
-                filter=filter_dict
+            potential_joins = RelationshipGraph.relationships(
+                user_id=user_id, upload_ids=[scrape_id] if scrape_id else None
             )
-            
-            if not documents:
+            if not potential_joins:
                 return None, "No relationship information found in the database."
-            
-            # Get relationship info and parse from JSON string
-            join_data_str = documents[0].metadata.get("join_data", "{}")
-            simplified_joins = json.loads(join_data_str)
-            
-            # Convert back to the original format
-            potential_joins = defaultdict(list)
-            for key, value in simplified_joins.items():
-                file1, file2 = key.split(":")
-                col_pairs = value.split(",")
-                for col_pair in col_pairs:
-                    if ":" in col_pair:  # Ensure the string has the expected format
-                        col1, col2 = col_pair.split(":")
-                        potential_joins[(file1, file2)].append((col1, col2))
-            
-            return potential_joins, documents[0].page_content
+            return potential_joins, self.relationships_summary(potential_joins)
         
         except Exception as e:
             print(f"Error retrieving relationship data: {str(e)}")
@@ -394,6 +425,7 @@ class EdaVectorDBHandler:
             if ids_to_delete and len(ids_to_delete) > 0:
                 # Delete the documents
                 collection.delete(ids=ids_to_delete)
+                CsvCatalog.invalidate(user_id)
                 deleted_count = len(ids_to_delete)
                 print(f"✅ Deleted {deleted_count} documents for user_id: {user_id}")
                 return deleted_count
@@ -424,6 +456,7 @@ class EdaVectorDBHandler:
             if results['ids'] and len(results['ids']) > 0:
                 # Delete the documents
                 self.vectorstore.delete(results['ids'])
+                CsvCatalog.invalidate(scrape_ids=[scrape_id])
                 print(f"✅ Successfully deleted {len(results['ids'])} documents with scrape_id: {scrape_id}")
                 
                 # Log what was deleted
@@ -441,42 +474,11 @@ class EdaVectorDBHandler:
             print(f"❌ Error deleting documents with scrape_id {scrape_id}: {str(e)}")
             return False
     
-    # Add this method or modify existing method:
-
-    def store_csv_metadata(self, csv_metadata):
-        """Store CSV metadata in the vector database"""
-        filename = csv_metadata['filename']
+    def _csv_metadata_documents(self, csv_metadata):
+        """Description and column documents of a CSV, as stored by store_csv_metadata"""
         user_id = csv_metadata.get('user_id')
         scrape_id = csv_metadata.get('scrape_id')
         
-
-        print(f"🔍 Storing metadata for {filename} in vector database")
-        # Check if this CSV already exists in the database
-        filter_conditions = [
-            {"filename": {"$eq": filename}},
-            {"type": {"$eq": "csv_description"}}
-        ]
-        
-        if user_id:
-            filter_conditions.append({"user_id": {"$eq": str(user_id)}})
-        
-        if scrape_id:
-            filter_conditions.append({"scrape_id": {"$eq": str(scrape_id)}})
-            
-        filter_dict = {"$and": filter_conditions}
-        
-        # Check if document exists
-        collection = self.vectorstore._collection
-        results = collection.get(
-            where=filter_dict,
-            include=["metadatas", "documents"]  # Changed from "ids" to "documents"
-        )
-        
-        # If document exists, delete it (forced reindexing)
-        if results.get('ids') and len(results['ids']) > 0:
-            self.vectorstore.delete(results['ids'])
-            print(f"🔄 Removed existing metadata for {filename} to reindex")
-        
         # Create a rich text representation for embedding
         content_for_embedding = f"""
         CSV Filename: {csv_metadata['filename']}
@@ -525,9 +527,100 @@ class EdaVectorDBHandler:
             metadata=column_metadata
         )
         
+        return csv_doc, column_doc
+
+    def store_csv_metadata_batch(self, metadata_list):
+        """
+        Store the metadata of many CSVs with one delete and one embedding pass.
+
+        Every entry must have a scrape_id; existing description and column
+        documents of those scrape_ids are replaced.
+        """
+        if not metadata_list:
+            return []
+        scrape_ids = [str(csv_metadata['scrape_id']) for csv_metadata in metadata_list]
+        self.vectorstore._collection.delete(where={"$and": [
+            {"scrape_id": {"$in": scrape_ids}},
+            {"type": {"$in": ["csv_description", "csv_columns"]}}
+        ]})
+
+        documents = []
+        for csv_metadata in metadata_list:
+            documents.extend(self._csv_metadata_documents(csv_metadata))
+        self.vectorstore.add_documents(documents)
+        self.vectorstore.persist()
+        for csv_metadata in metadata_list:
+            CsvCatalog.invalidate(csv_metadata.get('user_id'), scrape_ids=[csv_metadata['scrape_id']])
+        
+        print(f"✅ Stored metadata of {len(metadata_list)} CSVs in vector database")
+        return documents
+
+    # Add this method or modify existing method:
+
+    def store_csv_metadata(self, csv_metadata):
+        """Store CSV metadata in the vector database"""
+        filename = csv_metadata['filename']
+        user_id = csv_metadata.get('user_id')
+        scrape_id = csv_metadata.get('scrape_id')
+        
+
+        print(f"🔍 Storing metadata for {filename} in vector database")
+        # Check if this CSV already exists in the database
+        filter_conditions = [
+            {"filename": {"$eq": filename}},
+            {"type": {"$eq": "csv_description"}}
+        ]
+        
+        if user_id:
+            filter_conditions.append({"user_id": {"$eq": str(user_id)}})
+        
+        if scrape_id:
+            filter_conditions.append({"scrape_id": {"$eq": str(scrape_id)}})
+            
+        filter_dict = {"$and": filter_conditions}
+        
+        # Check if document exists
+        collection = self.vectorstore._collection
+        results = collection.get(
+            where=filter_dict,
+            include=["metadatas", "documents"]  # Changed from "ids" to "documents"
+        )
+        
+        # If document exists, delete it (forced reindexing)
+        if results.get('ids') and len(results['ids']) > 0:
+            self.vectorstore.delete(results['ids'])
+            print(f"🔄 Removed existing metadata for {filename} to reindex")
+        
+        csv_doc, column_doc = self._csv_metadata_documents(csv_metadata)
+        
         # Add to ChromaDB
         self.vectorstore.add_documents([csv_doc, column_doc])
         self.vectorstore.persist()
+        CsvCatalog.invalidate(user_id, scrape_ids=[scrape_id] if scrape_id else None)
         
         print(f"✅ Stored {csv_metadata['filename']} metadata in vector database")
-        return [csv_doc, column_doc]
\ No newline at end of file
+        return [csv_doc, column_doc]
+
+
+class EdaVectorDBSingleton:
+    """Shared EdaVectorDBHandler, so the Chroma client is opened once per process"""
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    print("Initializing EdaVectorDBHandler (singleton)...")
+                    cls._instance = EdaVectorDBHandler()
+        return cls._instance
+
+    @classmethod
+    def warm_up(cls):
+        """Open the EDA store and load the shared embedding model now"""
+        start_time = time.time()
+        handler = cls.get_instance()
+        handler.embeddings.embed_query("warm up")
+        print(f"🔥 EDA VectorDB warmed up in {time.time() - start_time:.2f}s: {handler.stats()}")
+        return handler
@@ -1,3 +1,105 @@
+import uuid
 from django.db import models
+from django.conf import settings
+from file_uploader.models import UploadedFile
 
-# Create your models here.
+
+class CsvColumnSignature(models.Model):
+    """
+    Cached signature of one column of an uploaded CSV (see RelationshipDetector).
+
+    A CSV with signatures is part of its user's relationship graph: it has
+    already been compared against every CSV that was in the graph before it.
+    """
+    upload = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='column_signatures')
+    position = models.PositiveIntegerField()
+    column = models.TextField()
+    dtype = models.CharField(max_length=50)
+    rows = models.BigIntegerField()
+    non_null = models.BigIntegerField()
+    distinct = models.BigIntegerField()
+    exact = models.BooleanField(default=False)
+    # Bottom-k value hashes as little-endian uint64
+    sketch = models.BinaryField()
+
+    class Meta:
+        ordering = ['upload', 'position']
+        unique_together = [('upload', 'position')]
+
+    def __str__(self):
+        return f"{self.upload_id}[{self.position}] {self.column}"
+
+
+class CsvRelationship(models.Model):
+    """Join keys between two uploaded CSVs of a user; removed together with either file"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    source = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='relationships_as_source')
+    target = models.ForeignKey(UploadedFile, on_delete=models.CASCADE, related_name='relationships_as_target')
+    # [[source column, target column], ...]
+    joins = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        unique_together = [('source', 'target')]
+
+    def __str__(self):
+        return f"{self.source_id} <-> {self.target_id}"
+
+
+class CsvProcessingJob(models.Model):
+    """
+    Background indexing of a set of uploaded CSVs (see CsvBatchProcessor).
+
+    files maps each upload id to its filename, current stage and error, so
+    clients can follow progress per file while the job runs.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    scrape_ids = models.JSONField(default=list)
+    # Describe every file with the LLM again instead of reusing cached descriptions
+    refresh_descriptions = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    total_files = models.PositiveIntegerField(default=0)
+    processed_files = models.PositiveIntegerField(default=0)
+    files = models.JSONField(default=dict)
+    # Same shape as the synchronous CSVFolderProcessView response used to be
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Refreshed by the owning process (worker_id) while the job is queued or runs
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker_id = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"CSV job {self.id} ({self.processed_files}/{self.total_files}, {self.status})"
+
+
+class CachedCsvDescription(models.Model):
+    """LLM description of a CSV schema, reused for CSVs of the user with the same fingerprint (see CsvDescriptionCache)"""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    fingerprint = models.CharField(max_length=64)
+    description = models.TextField()
+    # How long the LLM call took, i.e. what each hit saves
+    generation_seconds = models.FloatField(default=0)
+    hits = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = [('user', 'fingerprint')]
+
+    def __str__(self):
+        return f"{self.user_id} {self.fingerprint[:12]} ({self.hits} hits)"
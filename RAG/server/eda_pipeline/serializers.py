@@ -0,0 +1,11 @@
+from rest_framework import serializers
+from .models import CsvProcessingJob
+
+class CsvProcessingJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CsvProcessingJob
+        fields = [
+            'id', 'scrape_ids', 'refresh_descriptions', 'status', 'total_files', 'processed_files', 'files',
+            'result', 'error', 'created_at', 'updated_at', 'finished_at'
+        ]
+        read_only_fields = fields
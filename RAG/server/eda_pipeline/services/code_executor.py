@@ -0,0 +1,482 @@
+import json
+import multiprocessing
+import queue
+import resource
+import signal
+import threading
+import time
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+
+class CodeExecutionError(Exception):
+    """Raised when generated code could not be run to completion in a sandbox worker"""
+
+
+class CodeExecutionTimeout(CodeExecutionError):
+    """The code exceeded its wall-clock budget and the worker was killed"""
+
+
+class CodeExecutionCrashed(CodeExecutionError):
+    """The worker process died without returning a result"""
+
+
+class CodeExecutionCancelled(CodeExecutionError):
+    """The caller no longer needed the result and the worker was killed"""
+
+
+class _CpuTimeExceeded(Exception):
+    pass
+
+
+# Names available to generated code besides the DataFrames
+SANDBOX_NAMES = ["pd", "np", "plt", "datetime", "timedelta", "json", "os"]
+
+
+def _on_cpu_limit(signum, frame):
+    raise _CpuTimeExceeded("CPU time limit exceeded")
+
+
+def _limit_memory(memory_mb):
+    # RLIMIT_DATA leaves memory-mapped Arrow files out of the budget
+    limit = memory_mb * 1024 * 1024
+    kind = getattr(resource, 'RLIMIT_DATA', resource.RLIMIT_AS)
+    _, hard = resource.getrlimit(kind)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(kind, (limit, hard))
+
+
+def _cpu_seconds_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _load_frames(sources):
+    """DataFrames from Arrow file paths (memory-mapped) or as sent"""
+    import pyarrow as pa
+    frames = {}
+    for name, source in sources.items():
+        if isinstance(source, str):
+            with pa.memory_map(source, 'r') as arrow_file:
+                frames[name] = pa.ipc.open_file(arrow_file).read_all().to_pandas()
+        else:
+            frames[name] = source
+    return frames
+
+
+def _run_code(code, dataframes):
+    """Execute code against dataframes; returns its result variable, or the first DataFrame it created"""
+    import os
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from datetime import datetime, timedelta
+
+    namespace = {
+        "pd": pd,
+        "np": np,
+        "plt": plt,
+        "datetime": datetime,
+        "timedelta": timedelta,
+        "json": json,
+        "os": os,
+        **dataframes
+    }
+    try:
+        exec(code, namespace)
+    finally:
+        plt.close('all')
+
+    if 'result' in namespace:
+        return namespace['result']
+    for var_name, var_value in namespace.items():
+        if var_name in dataframes or var_name in SANDBOX_NAMES or var_name == '__builtins__':
+            continue
+        if isinstance(var_value, pd.DataFrame):
+            return var_value
+    return "Code executed successfully, but no result was produced"
+
+
+def _plain(value):
+    """JSON fallback: numpy scalars as Python values, anything else as text"""
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def tabulate_collection(value, max_items):
+    """
+    A DataFrame (or Series) for a list or dict result too large to return
+    as is, so it can be capped and paged like any frame; None if it fits.
+
+    Lists of records and dicts of columns (df.to_dict() in most orients)
+    become DataFrames; other long lists and dicts become a Series of their
+    items, with nested values as JSON text.
+    """
+    if isinstance(value, list):
+        if len(value) <= max_items:
+            return None
+        if all(isinstance(item, dict) for item in value):
+            return pd.DataFrame(value)
+        items = value
+    elif isinstance(value, dict):
+        if value and all(isinstance(column, (dict, list)) for column in value.values()):
+            try:
+                df = pd.DataFrame(value)
+            except (ValueError, TypeError):
+                df = None
+            if df is not None and (len(df) > max_items or df.shape[1] > max_items):
+                return df
+        if len(value) <= max_items:
+            return None
+        items = value
+    else:
+        return None
+
+    def cell(item):
+        return json.dumps(item, default=_plain) if isinstance(item, (dict, list)) else item
+    if isinstance(items, dict):
+        return pd.Series({str(key): cell(item) for key, item in items.items()}, dtype=object)
+    return pd.Series([cell(item) for item in items], dtype=object)
+
+
+def truncate_collection(value, max_items):
+    """value with every nested list and dict cut to max_items entries, marking what was dropped"""
+    if isinstance(value, list):
+        items = [truncate_collection(item, max_items) for item in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"... {len(value) - max_items} more items")
+        return items
+    if isinstance(value, dict):
+        items = {key: truncate_collection(item, max_items) for key, item in list(value.items())[:max_items]}
+        if len(value) > max_items:
+            items["..."] = f"{len(value) - max_items} more keys"
+        return items
+    return value
+
+
+def unique_column_names(columns):
+    """Column names as unique strings, numbering repeats pandas-style (a, a.1, a.2)"""
+    names = []
+    seen = set()
+    for column in columns:
+        name = base = str(column)
+        suffix = 0
+        while name in seen:
+            suffix += 1
+            name = f"{base}.{suffix}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def arrow_table(df):
+    """
+    Convert a result frame to Arrow. Duplicate or non-string column names
+    (e.g. from concat or .T) are renamed, and mixed-type columns are sent
+    as text.
+    """
+    import pyarrow as pa
+    # from_pandas raises a plain ValueError for duplicate column names
+    errors = (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, ValueError)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=True)
+    except errors:
+        df = df.set_axis(unique_column_names(df.columns), axis=1)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=True)
+    except errors:
+        return pa.Table.from_pandas(df.astype(str), preserve_index=True)
+
+
+def _arrow_bytes(df):
+    import pyarrow as pa
+    table = arrow_table(df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode_result(value, max_items=None):
+    """
+    Serialize a result as a JSON header plus, for frames, an Arrow IPC stream.
+
+    Results never travel as pickles, so a crafted object returned by
+    generated code cannot run code in the web worker when it is decoded.
+    With max_items, lists and dicts longer than that are sent as frames
+    (see tabulate_collection) and nested ones are truncated.
+    """
+    payload = b''
+    if max_items and isinstance(value, (dict, list)):
+        frame = tabulate_collection(value, max_items)
+        value = frame if frame is not None else truncate_collection(value, max_items)
+    if isinstance(value, pd.DataFrame):
+        header = {"success": True, "kind": "dataframe"}
+        payload = _arrow_bytes(value)
+    elif isinstance(value, pd.Series):
+        header = {"success": True, "kind": "series", "name": json.loads(json.dumps(value.name, default=_plain))}
+        payload = _arrow_bytes(value.to_frame(name='value'))
+    elif isinstance(value, (dict, list)):
+        header = {"success": True, "kind": "collection", "data": json.loads(json.dumps(value, default=_plain))}
+    elif value is None or isinstance(value, (bool, int, float, str, np.generic)):
+        header = {"success": True, "kind": "other", "data": _plain(value) if isinstance(value, np.generic) else value}
+    else:
+        header = {"success": True, "kind": "other", "data": str(value)}
+    header = json.dumps(header).encode()
+    return len(header).to_bytes(4, 'big') + header + payload
+
+
+def encode_error(error, retire=False):
+    header = json.dumps({"success": False, "error": error, "retire": retire}).encode()
+    return len(header).to_bytes(4, 'big') + header
+
+
+def decode_result(message):
+    """{"success": ..., "result" or "error": ...} from an encode_result/encode_error message"""
+    size = int.from_bytes(message[:4], 'big')
+    header = json.loads(message[4:4 + size])
+    if not header["success"]:
+        return {"success": False, "error": header["error"], "retire": header.get("retire", False)}
+
+    kind = header["kind"]
+    if kind in ("dataframe", "series"):
+        import pyarrow as pa
+        df = pa.ipc.open_stream(pa.py_buffer(message[4 + size:])).read_all().to_pandas()
+        if kind == "series":
+            return {"success": True, "result": df['value'].rename(header["name"])}
+        return {"success": True, "result": df}
+    return {"success": True, "result": header["data"]}
+
+
+def _worker_main(conn, memory_mb):
+    """Sandbox worker: runs (code, sources, cpu_seconds) tasks until told to stop or it must retire"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    _limit_memory(memory_mb)
+    import pyarrow  # noqa: F401  (loaded before the first task)
+    conn.send_bytes(b'ready')
+
+    cpu_limit, cpu_hard = resource.getrlimit(resource.RLIMIT_CPU)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        code, sources, cpu_seconds, max_items = task
+        retire = False
+        try:
+            resource.setrlimit(resource.RLIMIT_CPU, (int(_cpu_seconds_used() + cpu_seconds) + 1, cpu_hard))
+            message = encode_result(_run_code(code, _load_frames(sources)), max_items)
+        except _CpuTimeExceeded:
+            retire = True
+            message = encode_error(f"Execution exceeded {cpu_seconds}s of CPU time and was stopped", retire=True)
+        except MemoryError:
+            retire = True
+            message = encode_error(f"Execution exceeded {memory_mb} MB of memory and was stopped", retire=True)
+        except BaseException as e:
+            message = encode_error(str(e))
+        finally:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_hard))
+        try:
+            conn.send_bytes(message)
+        except MemoryError:
+            retire = True
+            conn.send_bytes(encode_error("The result was too large to return", retire=True))
+        if retire:
+            break
+    conn.close()
+
+
+class _Worker:
+    """One pre-forked sandbox process and its pipe"""
+    CANCEL_POLL_INTERVAL = 0.1
+
+    def __init__(self, ctx, memory_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, memory_mb), daemon=True)
+        self.process.start()
+        # Close our copy so a dying child shows up as EOF on the pipe
+        child_conn.close()
+        self.ready = False
+        self.tasks = 0
+        self.retire = False
+
+    def wait_ready(self, timeout):
+        if self.ready:
+            return
+        try:
+            if not self.conn.poll(timeout):
+                raise CodeExecutionCrashed(f"Sandbox worker did not start within {timeout}s")
+            self.conn.recv_bytes()
+        except (EOFError, OSError):
+            raise CodeExecutionCrashed(f"Sandbox worker exited with code {self.process.exitcode}")
+        self.ready = True
+
+    def run(self, code, sources, cpu_seconds, timeout, cancel_event=None, max_items=None):
+        self.tasks += 1
+        try:
+            self.conn.send((code, sources, cpu_seconds, max_items))
+            deadline = time.monotonic() + timeout
+            while not self.conn.poll(min(self.CANCEL_POLL_INTERVAL, max(deadline - time.monotonic(), 0))):
+                if cancel_event is not None and cancel_event.is_set():
+                    self.retire = True
+                    raise CodeExecutionCancelled("Execution was cancelled")
+                if time.monotonic() >= deadline:
+                    self.retire = True
+                    raise CodeExecutionTimeout(f"Execution exceeded {timeout}s and was stopped")
+            result = decode_result(self.conn.recv_bytes())
+        except (EOFError, OSError):
+            self.retire = True
+            self.process.join(1)
+            raise CodeExecutionCrashed(f"Sandbox worker exited with code {self.process.exitcode}")
+        self.retire = result.pop("retire", False)
+        return result
+
+    def stop(self):
+        try:
+            if self.process.is_alive() and not self.retire:
+                self.conn.send(None)
+                self.process.join(1)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if self.process.is_alive():
+                self.process.kill()
+            self.process.join(1)
+            self.conn.close()
+
+
+class CodeExecutionEngine:
+    """
+    Runs LLM-generated pandas code in pre-forked, resource-limited sandbox processes.
+
+    Workers are started with the engine and reused, each with a memory
+    limit (EDA_CODE_MEMORY_MB) and a CPU-time limit per execution
+    (EDA_CODE_CPU_SECONDS); a worker that exceeds the wall-clock budget
+    (EDA_CODE_TIMEOUT) is killed. Workers are replaced after
+    EDA_CODE_MAX_TASKS_PER_WORKER executions or after any limit was hit;
+    if a replacement cannot be started, the slot is refilled on a later
+    acquire. Executions wait at most EDA_CODE_QUEUE_TIMEOUT for a worker.
+
+    DataFrames with an Arrow copy in DataFrameStore are passed as paths and
+    memory-mapped by the worker, so the web worker never loads them;
+    results come back as JSON plus an Arrow IPC stream (see encode_result).
+    """
+    _instance = None
+    _lock = threading.Lock()
+    STARTUP_TIMEOUT = 60
+
+    def __init__(self, workers, timeout, cpu_seconds, memory_mb, max_tasks, queue_timeout=300, max_items=None):
+        methods = multiprocessing.get_all_start_methods()
+        self._ctx = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_tasks = max_tasks
+        self.queue_timeout = queue_timeout
+        # Longer list/dict results come back as frames (see encode_result)
+        self.max_items = max_items
+        self._idle = queue.Queue()
+        # Slots whose replacement worker could not be started; refilled by _acquire
+        self._missing = 0
+        self._missing_lock = threading.Lock()
+        for _ in range(workers):
+            self._idle.put(self._spawn())
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        workers=settings.EDA_CODE_WORKERS,
+                        timeout=settings.EDA_CODE_TIMEOUT,
+                        cpu_seconds=settings.EDA_CODE_CPU_SECONDS,
+                        memory_mb=settings.EDA_CODE_MEMORY_MB,
+                        max_tasks=settings.EDA_CODE_MAX_TASKS_PER_WORKER,
+                        queue_timeout=settings.EDA_CODE_QUEUE_TIMEOUT,
+                        max_items=settings.EDA_RESULT_PAGE_ROWS
+                    )
+        return cls._instance
+
+    def _spawn(self):
+        return _Worker(self._ctx, self.memory_mb)
+
+    def _try_spawn(self):
+        """A new worker, or None if it cannot be started (the slot is then left for _acquire to refill)"""
+        try:
+            return self._spawn()
+        except Exception as e:
+            print(f"⚠️ Could not start a sandbox worker: {str(e)}")
+            with self._missing_lock:
+                self._missing += 1
+            return None
+
+    def _refill(self):
+        """Start a worker for an empty slot, if there is one"""
+        with self._missing_lock:
+            if not self._missing:
+                return None
+            self._missing -= 1
+        return self._try_spawn()
+
+    def _acquire(self, cancel_event=None):
+        """
+        An idle worker, or None if cancel_event is set while waiting for one.
+        Raises CodeExecutionError if none becomes available within queue_timeout.
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            worker = self._refill()
+            if worker is not None:
+                return worker
+            try:
+                return self._idle.get(timeout=_Worker.CANCEL_POLL_INTERVAL)
+            except queue.Empty:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
+                if time.monotonic() >= deadline:
+                    raise CodeExecutionError("No sandbox worker became available, try again later")
+
+    def execute(self, code, sources, timeout=None, cancel_event=None):
+        """
+        Run code against sources ({name: Arrow file path or DataFrame}).
+
+        Returns {"success": True, "result": value} or {"success": False,
+        "error": message}, like EdaGroqService.execute_pandas_code. timeout
+        (wall-clock seconds) starts once a worker has been assigned; setting
+        cancel_event stops the execution, adding "cancelled": True.
+        """
+        timeout = timeout or self.timeout
+        start_time = time.time()
+        try:
+            worker = self._acquire(cancel_event)
+        except CodeExecutionError as e:
+            return {"success": False, "error": str(e)}
+        if worker is None or (cancel_event is not None and cancel_event.is_set()):
+            if worker is not None:
+                self._idle.put(worker)
+            return {"success": False, "error": "Execution was cancelled", "cancelled": True}
+        try:
+            worker.wait_ready(self.STARTUP_TIMEOUT)
+            result = worker.run(
+                code, sources, self.cpu_seconds, timeout, cancel_event=cancel_event, max_items=self.max_items
+            )
+        except CodeExecutionCancelled as e:
+            result = {"success": False, "error": str(e), "cancelled": True}
+        except CodeExecutionError as e:
+            worker.retire = True
+            result = {"success": False, "error": str(e)}
+        finally:
+            if worker.retire or worker.tasks >= self.max_tasks:
+                worker.stop()
+                worker = self._try_spawn()
+            if worker is not None:
+                self._idle.put(worker)
+
+        print(f"[DEBUG] Sandbox execution {'succeeded' if result['success'] else 'failed'} "
+              f"in {time.time() - start_time:.2f}s")
+        return result
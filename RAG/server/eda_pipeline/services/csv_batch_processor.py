@@ -0,0 +1,307 @@
+import threading
+import time
+from datetime import timedelta
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from file_uploader.models import UploadedFile
+from file_uploader.services.csv_sniffer import CsvSniffer
+from file_uploader.services.extraction_engine import ExtractionEngine
+from file_uploader.services.worker_heartbeat import WorkerHeartbeat, process_id
+from ..models import CsvProcessingJob
+from .csv_description_cache import DescriptionCacheStats
+from .csv_profiler import profile_csv_file
+from .eda_csv_service import EdaCsvService
+from .relationship_graph import RelationshipGraph
+
+
+class RateLimiter:
+    """Token bucket shared by threads: rate_per_minute calls, bursts of up to burst"""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+
+class JobProgress:
+    """Per-file stages of a CsvProcessingJob, written to its row as they change"""
+
+    def __init__(self, job):
+        self.job = job
+
+    def _save(self, **fields):
+        CsvProcessingJob.objects.filter(pk=self.job.pk).update(
+            files=self.job.files, processed_files=self.job.processed_files, updated_at=timezone.now(), **fields
+        )
+
+    def start(self, uploads):
+        self.job.files = {
+            str(upload.id): {"filename": upload.filename, "stage": "queued", "error": None}
+            for upload in uploads
+        }
+        self.job.total_files = len(uploads)
+        self._save(status='IN_PROGRESS', total_files=self.job.total_files)
+
+    def stage(self, upload_ids, stage):
+        for upload_id in upload_ids:
+            self.job.files[str(upload_id)]["stage"] = stage
+        if stage == 'done':
+            self.job.processed_files += len(upload_ids)
+        self._save()
+
+    def fail(self, upload_id, error):
+        print(f"❌ CSV job {self.job.pk}: {self.job.files[str(upload_id)]['filename']} failed: {error}")
+        self.job.files[str(upload_id)].update(stage='failed', error=str(error))
+        self.job.processed_files += 1
+        self._save()
+
+    def finish(self, result=None, error=None):
+        self.job.status = 'FAILED' if error else 'COMPLETED'
+        self._save(status=self.job.status, result=result, error=error, finished_at=timezone.now())
+
+
+class CsvBatchProcessor:
+    """
+    Pipelined indexing of many CSVs for CSVFolderProcessView.
+
+    Files are profiled in isolated worker processes (ExtractionEngine) and
+    described by the LLM concurrently, under a process-wide rate limit; a
+    file's description starts as soon as its profile is ready. Described
+    files are written to the EDA vector store in batches, then linked into
+    the relationship graph. Progress per file is kept on the job row, and
+    jobs lost with a restarted process are run again by recover().
+    """
+    _executor = None
+    _rate_limiter = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.CSV_JOB_WORKERS, thread_name_prefix='csv-job'
+                    )
+        return cls._executor
+
+    @classmethod
+    def get_rate_limiter(cls):
+        # One limiter per process, so concurrent jobs share the LLM budget
+        if cls._rate_limiter is None:
+            with cls._lock:
+                if cls._rate_limiter is None:
+                    cls._rate_limiter = RateLimiter(
+                        settings.CSV_DESCRIPTION_RATE_PER_MINUTE, burst=settings.CSV_DESCRIPTION_CONCURRENCY
+                    )
+        return cls._rate_limiter
+
+    @classmethod
+    def create_job(cls, user, scrape_ids, refresh_descriptions=False):
+        scrape_ids = list(dict.fromkeys(str(scrape_id) for scrape_id in scrape_ids))
+        return CsvProcessingJob.objects.create(
+            user=user, scrape_ids=scrape_ids, refresh_descriptions=refresh_descriptions
+        )
+
+    @classmethod
+    def submit(cls, job):
+        """Run the job in the background once the current transaction commits"""
+        transaction.on_commit(lambda: cls._enqueue(job.pk))
+
+    @classmethod
+    def _enqueue(cls, job_id):
+        # Owned by this process from now on; the heartbeat keeps it fresh
+        CsvProcessingJob.objects.filter(pk=job_id).update(worker_id=process_id(), updated_at=timezone.now())
+        WorkerHeartbeat.track(CsvProcessingJob, 'updated_at')
+        cls.get_executor().submit(cls._run_in_background, job_id)
+
+    @classmethod
+    def recover(cls):
+        """
+        Run again PENDING and IN_PROGRESS jobs whose heartbeat (updated_at,
+        see WorkerHeartbeat) has lapsed for CSV_JOB_STALE_AFTER seconds, i.e.
+        whose owning process has stopped. Storing
+        metadata and linking files are idempotent, so a job simply starts
+        over. Each job is claimed with a conditional update.
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.CSV_JOB_STALE_AFTER)
+        stale = CsvProcessingJob.objects.filter(
+            status__in=['PENDING', 'IN_PROGRESS'], updated_at__lt=stale_before
+        ).values_list('pk', 'updated_at')
+
+        requeued = 0
+        for job_id, updated_at in stale:
+            claimed = CsvProcessingJob.objects.filter(pk=job_id, updated_at=updated_at).update(
+                status='PENDING', processed_files=0, worker_id=process_id(), updated_at=timezone.now()
+            )
+            if claimed:
+                cls._enqueue(job_id)
+                requeued += 1
+        if requeued:
+            print(f"🔁 Re-queued {requeued} interrupted CSV jobs")
+        return requeued
+
+    @classmethod
+    def _run_in_background(cls, job_id):
+        close_old_connections()
+        try:
+            cls.run(CsvProcessingJob.objects.get(pk=job_id))
+        except Exception as e:
+            print(f"❌ CSV job {job_id} failed: {str(e)}")
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _profile(path, read_kwargs):
+        return ExtractionEngine.get_instance().run(profile_csv_file, path, read_kwargs, kind='csv')
+
+    @classmethod
+    def _describe(cls, groq_service, csv_metadata, cache_stats, use_cache):
+        # Only actual LLM calls count against the rate limit
+        if use_cache and groq_service.cached_csv_description(csv_metadata, cache_stats):
+            return csv_metadata
+        cls.get_rate_limiter().acquire()
+        return groq_service.generate_csv_description(csv_metadata, stats=cache_stats, use_cache=False)
+
+    @classmethod
+    def run(cls, job):
+        """Process every CSV of the job; returns the job with its result"""
+        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
+        from eda_pipeline.services.eda_groq_service import EdaGroqService
+        start_time = time.time()
+        progress = JobProgress(job)
+        results = []
+
+        try:
+            uploads_by_scrape_id = {}
+            for scrape_id in job.scrape_ids:
+                csv_files = list(UploadedFile.objects.filter(id=scrape_id, content_type='text/csv', user=job.user))
+                if not csv_files:
+                    results.append({'scrape_id': scrape_id, 'error': f'No CSV files found for ID: {scrape_id}'})
+                uploads_by_scrape_id[scrape_id] = csv_files
+            uploads = [upload for csv_files in uploads_by_scrape_id.values() for upload in csv_files]
+            progress.start(uploads)
+
+            csv_service = EdaCsvService()
+            groq_service = EdaGroqService()
+            vectordb_handler = EdaVectorDBSingleton.get_instance()
+            cache_stats = DescriptionCacheStats()
+            stored = set()
+            pending_store = []
+
+            def flush():
+                if not pending_store:
+                    return
+                batch = list(pending_store)
+                pending_store.clear()
+                progress.stage([upload.id for upload, _ in batch], 'storing')
+                try:
+                    vectordb_handler.store_csv_metadata_batch([csv_metadata for _, csv_metadata in batch])
+                except Exception as e:
+                    for upload, _ in batch:
+                        progress.fail(upload.id, e)
+                    return
+                stored.update(upload.id for upload, _ in batch)
+                progress.stage([upload.id for upload, _ in batch], 'done')
+
+            # Separate pools, so descriptions start while later files are still profiled
+            with ThreadPoolExecutor(
+                max_workers=settings.CSV_JOB_FILE_CONCURRENCY, thread_name_prefix='csv-job-profile'
+            ) as profile_pool, ThreadPoolExecutor(
+                max_workers=settings.CSV_DESCRIPTION_CONCURRENCY, thread_name_prefix='csv-job-describe'
+            ) as describe_pool:
+                profiling = {}
+                for upload in uploads:
+                    try:
+                        read_kwargs = CsvSniffer.for_uploaded_file(upload).pandas_kwargs()
+                    except Exception as e:
+                        progress.fail(upload.id, e)
+                        continue
+                    profiling[profile_pool.submit(cls._profile, upload.file.path, read_kwargs)] = upload
+                    progress.stage([upload.id], 'profiling')
+
+                describing = {}
+                while profiling or describing:
+                    done, _ = wait(list(profiling) + list(describing), return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in profiling:
+                            upload = profiling.pop(future)
+                            try:
+                                csv_metadata = csv_service.metadata_from_profile(
+                                    future.result(), upload.file.path, upload.filename,
+                                    user_id=job.user_id, scrape_id=str(upload.id)
+                                )
+                            except Exception as e:
+                                progress.fail(upload.id, e)
+                                continue
+                            describing[describe_pool.submit(
+                                cls._describe, groq_service, csv_metadata, cache_stats, not job.refresh_descriptions
+                            )] = upload
+                            progress.stage([upload.id], 'describing')
+                        else:
+                            upload = describing.pop(future)
+                            try:
+                                pending_store.append((upload, future.result()))
+                            except Exception as e:
+                                progress.fail(upload.id, e)
+                                continue
+                            if len(pending_store) >= settings.CSV_STORE_BATCH_SIZE:
+                                flush()
+            flush()
+
+            for upload in uploads:
+                if upload.id not in stored:
+                    continue
+                try:
+                    RelationshipGraph.add_file(upload)
+                except Exception as e:
+                    print(f"⚠️ Could not link '{upload.filename}': {str(e)}")
+
+            for scrape_id, csv_files in uploads_by_scrape_id.items():
+                files = [upload for upload in csv_files if upload.id in stored]
+                if files:
+                    results.append({
+                        'scrape_id': scrape_id,
+                        'success': True,
+                        'message': f'Processed {len(files)} CSV files',
+                        'files': [upload.filename for upload in files]
+                    })
+
+            potential_joins = RelationshipGraph.relationships(
+                user_id=job.user_id, upload_ids=[upload.id for upload in uploads]
+            )
+            if potential_joins:
+                results.append({'relationship_detection': {
+                    'relationships_found': len(potential_joins),
+                    'file_pairs': [f"{file1} ↔ {file2}" for file1, file2 in potential_joins.keys()]
+                }})
+
+            progress.finish(result={
+                'results': results,
+                'total_files_processed': len(stored),
+                'description_cache': cache_stats.to_dict()
+            })
+            print(f"✅ CSV job {job.pk}: {len(stored)}/{len(uploads)} files in {time.time() - start_time:.2f}s "
+                  f"({cache_stats.hits} cached descriptions, {cache_stats.seconds_saved:.1f}s of LLM time saved)")
+        except Exception as e:
+            progress.finish(result={'results': results, 'total_files_processed': 0}, error=str(e))
+            raise
+        return job
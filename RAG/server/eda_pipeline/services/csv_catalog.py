@@ -0,0 +1,116 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+from django.db.models import Count, Max
+from ..models import CsvRelationship
+from .relationship_graph import RelationshipGraph
+
+
+class _UserCatalog:
+    def __init__(self):
+        self.entries = {}  # vector store document id -> parsed CSV description
+        self.relationships = None  # (stamp, potential_joins, relationship_text)
+
+
+class CsvCatalog:
+    """
+    In-memory, per-user catalog of parsed CSV metadata and relationships for the query path.
+
+    A query runs one vector search that returns document ids only; the
+    descriptions are parsed from their full_metadata JSON the first time
+    an id is seen and reused afterwards. Reindexing a CSV stores new
+    documents (new ids), so other processes never serve stale metadata,
+    and relationships are reloaded when the user's relationship rows
+    change. Ingest and delete paths call invalidate() to drop entries of
+    this process early. At most EDA_CATALOG_MAX_USERS users are kept.
+    """
+    _users = OrderedDict()  # user_id -> _UserCatalog
+    _lock = threading.Lock()
+
+    @classmethod
+    def _user(cls, user_id):
+        key = str(user_id) if user_id else None
+        with cls._lock:
+            catalog = cls._users.get(key)
+            if catalog is None:
+                catalog = cls._users[key] = _UserCatalog()
+                while len(cls._users) > settings.EDA_CATALOG_MAX_USERS:
+                    cls._users.popitem(last=False)
+            else:
+                cls._users.move_to_end(key)
+        return catalog
+
+    @classmethod
+    def search(cls, query, k=3, user_id=None):
+        """The k CSVs most relevant to query, shaped like EdaVectorDBHandler.retrieve_csv_descriptions results"""
+        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
+        vectordb_handler = EdaVectorDBSingleton.get_instance()
+        try:
+            ids, distances = vectordb_handler.search_csv_description_ids(query, k=k, user_id=user_id)
+        except Exception as e:
+            print(f"Error retrieving from vector database: {str(e)}")
+            return []
+
+        catalog = cls._user(user_id)
+        missing = [doc_id for doc_id in ids if doc_id not in catalog.entries]
+        if missing:
+            catalog.entries.update(vectordb_handler.get_csv_descriptions(missing))
+
+        results = [
+            dict(catalog.entries[doc_id], similarity_score=distance)
+            for doc_id, distance in zip(ids, distances)
+            if doc_id in catalog.entries
+        ]
+        print(f"📊 Retrieved {len(results)} relevant CSV files for query: '{query}' "
+              f"({len(missing)} not yet in the catalog)")
+        for i, result in enumerate(results):
+            print(f"  {i+1}. {result['filename']} (Score: {result['similarity_score']:.4f})")
+        return results
+
+    @classmethod
+    def relationships(cls, user_id=None):
+        """(join keys, summary text) like EdaVectorDBHandler.retrieve_csv_relationships, reloaded only when they change"""
+        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
+        try:
+            queryset = CsvRelationship.objects.all()
+            if user_id:
+                queryset = queryset.filter(user_id=user_id)
+            # Relationships are only ever created or deleted, never updated
+            stamp = tuple(queryset.aggregate(count=Count('id'), last=Max('id')).values())
+
+            catalog = cls._user(user_id)
+            cached = catalog.relationships
+            if cached and cached[0] == stamp:
+                return cached[1], cached[2]
+
+            potential_joins = RelationshipGraph.relationships(user_id=user_id)
+            if potential_joins:
+                result = (potential_joins, EdaVectorDBHandler.relationships_summary(potential_joins))
+            else:
+                result = (None, "No relationship information found in the database.")
+            catalog.relationships = (stamp, *result)
+            return result
+        except Exception as e:
+            print(f"Error retrieving relationship data: {str(e)}")
+            return None, str(e)
+
+    @classmethod
+    def invalidate(cls, user_id=None, scrape_ids=None):
+        """Drop cached entries of user_id (of every user if None), only those of scrape_ids if given"""
+        with cls._lock:
+            if scrape_ids is None:
+                if user_id is None:
+                    cls._users.clear()
+                else:
+                    cls._users.pop(str(user_id), None)
+                return
+            scrape_ids = {str(scrape_id) for scrape_id in scrape_ids}
+            catalogs = list(cls._users.values()) if user_id is None else [cls._users.get(str(user_id))]
+            for catalog in catalogs:
+                if catalog is None:
+                    continue
+                catalog.entries = {
+                    doc_id: entry for doc_id, entry in catalog.entries.items()
+                    if str(entry.get('scrape_id')) not in scrape_ids
+                }
+                catalog.relationships = None
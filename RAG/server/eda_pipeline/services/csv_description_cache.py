@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from ..models import CachedCsvDescription
+
+
+class DescriptionCacheStats:
+    """LLM calls made and saved by the description cache during one indexing run"""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+        self.llm_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record_hit(self, seconds_saved):
+        with self._lock:
+            self.hits += 1
+            self.seconds_saved += seconds_saved
+
+    def record_miss(self, llm_seconds):
+        with self._lock:
+            self.misses += 1
+            self.llm_seconds += llm_seconds
+
+    def to_dict(self):
+        return {
+            'llm_calls': self.misses,
+            'llm_calls_saved': self.hits,
+            'llm_seconds': round(self.llm_seconds, 2),
+            'seconds_saved': round(self.seconds_saved, 2),
+        }
+
+
+class CsvDescriptionCache:
+    """
+    Per-user cache of LLM-generated CSV descriptions, keyed by a schema fingerprint.
+
+    The fingerprint covers the filename with digit runs masked and the
+    column names and dtypes. Re-uploads, re-indexing and periodic exports of
+    the same report (sales_2024_01.csv, sales_2024_02.csv) share a
+    fingerprint and therefore a description. Sample values are not part of
+    it, not even their shapes: they come from a random sample of rows and
+    change from export to export.
+    """
+
+    @staticmethod
+    def _filename_pattern(filename):
+        return re.sub(r'\d+', '#', os.path.basename(filename or '').lower())
+
+    @classmethod
+    def fingerprint(cls, csv_metadata):
+        columns = [[str(col['name']), col['dtype']] for col in csv_metadata['columns']]
+        key = json.dumps({'filename': cls._filename_pattern(csv_metadata.get('filename')), 'columns': columns})
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @staticmethod
+    def _ttl():
+        return timedelta(hours=settings.CSV_DESCRIPTION_CACHE_TTL_HOURS)
+
+    @staticmethod
+    def enabled(user_id):
+        return bool(user_id) and settings.CSV_DESCRIPTION_CACHE_TTL_HOURS > 0
+
+    @classmethod
+    def get(cls, user_id, fingerprint):
+        """The cached entry for fingerprint, or None; expired entries are removed"""
+        entry = CachedCsvDescription.objects.filter(user_id=user_id, fingerprint=fingerprint).first()
+        if entry is None:
+            return None
+        if entry.created_at < timezone.now() - cls._ttl():
+            entry.delete()
+            return None
+        CachedCsvDescription.objects.filter(pk=entry.pk).update(hits=F('hits') + 1, last_used_at=timezone.now())
+        return entry
+
+    @staticmethod
+    def put(user_id, fingerprint, description, generation_seconds):
+        CachedCsvDescription.objects.update_or_create(
+            user_id=user_id, fingerprint=fingerprint,
+            defaults={
+                'description': description,
+                'generation_seconds': generation_seconds,
+                'hits': 0,
+                'created_at': timezone.now(),
+                'last_used_at': None,
+            }
+        )
+
+    @staticmethod
+    def invalidate(user_id, fingerprint=None):
+        """Drop the user's cached descriptions (only fingerprint's, if given); returns how many"""
+        queryset = CachedCsvDescription.objects.filter(user_id=user_id)
+        if fingerprint:
+            queryset = queryset.filter(fingerprint=fingerprint)
+        deleted_count, _ = queryset.delete()
+        return deleted_count
@@ -0,0 +1,198 @@
+import os
+from typing import Any, Dict
+import numpy as np
+import pandas as pd
+from .relationship_detector import column_hashes
+
+# Rows parsed per chunk while profiling
+PROFILE_CHUNK_ROWS = int(os.getenv("EDA_PROFILE_CHUNK_ROWS", 100_000))
+# Rows read up front to find columns that can be declared as text for every chunk
+PROFILE_DTYPE_SAMPLE_ROWS = int(os.getenv("EDA_PROFILE_DTYPE_SAMPLE_ROWS", 1_000))
+# Parsed chunks are also concatenated into a DataFrame for callers while they fit in this
+PROFILE_KEEP_FRAME_MB = int(os.getenv("EDA_PROFILE_KEEP_FRAME_MB", 256))
+SAMPLE_VALUES = 5
+
+
+def _bit_length(values):
+    """Bit length of each value; exact because callers pass values below 2^53"""
+    return np.frexp(values.astype(np.float64))[1]
+
+
+class HyperLogLog:
+    """
+    Approximate distinct count over 64-bit hashes.
+
+    Counts are exact until more than exact_limit distinct hashes have been
+    seen, so low-cardinality columns report their true number of values.
+    """
+
+    def __init__(self, precision=14, exact_limit=1024):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+        self.exact_limit = exact_limit
+        self.exact = np.empty(0, dtype=np.uint64)
+
+    def add(self, hashes):
+        if not len(hashes):
+            return
+        if self.exact is not None:
+            self.exact = np.union1d(self.exact, hashes)
+            if len(self.exact) > self.exact_limit:
+                self.exact = None
+
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.intp)
+        remaining_bits = 64 - self.precision
+        rest = hashes & np.uint64((1 << remaining_bits) - 1)
+        # Position of the first set bit in the remaining bits, 1-based
+        # (precision >= 11 keeps them exact in a float64 for _bit_length)
+        rank = (remaining_bits - _bit_length(rest) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def count(self):
+        if self.exact is not None:
+            return len(self.exact)
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class Reservoir:
+    """Uniform sample of up to size values from a stream (algorithm R)"""
+
+    def __init__(self, size=SAMPLE_VALUES, seed=0):
+        self.size = size
+        self.values = []
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, values: pd.Series):
+        fill = min(self.size - len(self.values), len(values))
+        self.values.extend(values.iloc[:fill].tolist())
+        self.seen += fill
+        rest = len(values) - fill
+        if not rest:
+            return
+
+        # Item number t replaces a random slot with probability size / t;
+        # only accepted values are converted to Python objects
+        positions = self.seen + np.arange(1, rest + 1)
+        accepted = np.flatnonzero(self.rng.random(rest) < self.size / positions)
+        for value in values.iloc[fill + accepted].tolist():
+            self.values[self.rng.integers(self.size)] = value
+        self.seen += rest
+
+
+def _merge_dtype(current, new):
+    """dtype pandas would give a column whose chunks had the two dtypes"""
+    if current is None or current == new:
+        return new
+    if current.kind in 'iuf' and new.kind in 'iuf':
+        return np.result_type(current, new)
+    return np.dtype(object)
+
+
+class ColumnProfile:
+    """Running statistics of one column"""
+
+    def __init__(self, name, seed):
+        self.name = name
+        self.dtype = None
+        self.nulls = 0
+        self.min = None
+        self.max = None
+        self.distinct = HyperLogLog()
+        self.samples = Reservoir(seed=seed)
+
+    def add(self, series):
+        self.dtype = _merge_dtype(self.dtype, series.dtype)
+        values = series.dropna()
+        self.nulls += len(series) - len(values)
+        if not len(values):
+            return
+        self.distinct.add(column_hashes(values))
+        self.samples.add(values)
+        if pd.api.types.is_numeric_dtype(values):
+            try:
+                low, high = values.min(), values.max()
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+            except TypeError:
+                pass
+
+
+class StreamingCsvProfiler:
+    """
+    Profiles a CSV in one chunked pass with bounded memory.
+
+    Each chunk updates per-column row/null counts, min/max, a HyperLogLog
+    distinct count and a reservoir sample, then is dropped. Columns that
+    are text in a leading sample are declared as object for every chunk so
+    pandas does not re-infer them. Small files are also returned as a
+    DataFrame so callers that need the frame do not parse the file again.
+    """
+
+    def __init__(self, chunk_rows=PROFILE_CHUNK_ROWS, keep_frame_mb=PROFILE_KEEP_FRAME_MB):
+        self.chunk_rows = chunk_rows
+        self.keep_frame_bytes = keep_frame_mb * 1024 * 1024
+
+    def profile(self, csv_path, read_kwargs=None):
+        """Returns (profile dict, DataFrame or None when the file was too large to keep)"""
+        read_kwargs = dict(read_kwargs or {})
+        leading = pd.read_csv(csv_path, nrows=PROFILE_DTYPE_SAMPLE_ROWS, **read_kwargs)
+        text_columns = {column: object for column in leading.columns if leading[column].dtype == object}
+        columns = [ColumnProfile(column, seed=position) for position, column in enumerate(leading.columns)]
+
+        num_rows = 0
+        sample_data = leading.head(2).to_string()
+        kept, kept_bytes = [], 0
+        reader = pd.read_csv(csv_path, chunksize=self.chunk_rows, dtype=text_columns or None, **read_kwargs)
+        with reader:
+            for chunk in reader:
+                num_rows += len(chunk)
+                for position, column in enumerate(columns):
+                    column.add(chunk.iloc[:, position])
+                if kept is not None:
+                    kept_bytes += int(chunk.memory_usage(deep=True).sum())
+                    if kept_bytes <= self.keep_frame_bytes:
+                        kept.append(chunk)
+                    else:
+                        kept = None
+
+        profile = {
+            "num_rows": num_rows,
+            "num_columns": len(columns),
+            "columns": [self._column_info(column) for column in columns],
+            "sample_data": sample_data,
+        }
+        df = None
+        if kept is not None:
+            df = pd.concat(kept, ignore_index=True) if kept else leading.iloc[0:0]
+        return profile, df
+
+    @staticmethod
+    def _plain(value):
+        """Python scalar for numpy values, so the profile is JSON serializable"""
+        return value.item() if isinstance(value, np.generic) else value
+
+    def _column_info(self, column: ColumnProfile) -> Dict[str, Any]:
+        dtype = column.dtype if column.dtype is not None else np.dtype(object)
+        col_info = {
+            "name": column.name,
+            "dtype": str(dtype),
+            "sample_values": [self._plain(value) for value in column.samples.values],
+            "unique_values": column.distinct.count(),
+            "null_count": column.nulls,
+        }
+        if dtype.kind in 'iuf' and column.min is not None:
+            col_info.update({"min": self._plain(column.min), "max": self._plain(column.max)})
+        return col_info
+
+
+def profile_csv_file(csv_path, read_kwargs=None):
+    """Profile only, for running in a worker process (the frame is not sent back)"""
+    return StreamingCsvProfiler(keep_frame_mb=0).profile(csv_path, read_kwargs)[0]
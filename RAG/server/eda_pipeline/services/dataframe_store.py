@@ -0,0 +1,161 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import pandas as pd
+from django.conf import settings
+from file_uploader.services.csv_sniffer import CsvSniffer
+
+
+class DataFrameStore:
+    """
+    Columnar cache of uploaded CSVs for the EDA query path.
+
+    Each CSV is parsed once (with its sniffed encoding/dialect) and written
+    as an uncompressed Arrow IPC file to media/processed/<upload_id>/, which
+    is memory-mapped when the frame is needed. Recently used frames are also
+    kept in memory, bounded by EDA_DATAFRAME_CACHE_MB. Frames Arrow cannot
+    represent (mixed-type or unnamed columns) are only cached in memory.
+
+    Callers get a copy, so code executed against a frame cannot change the
+    cached one.
+    """
+    FILENAME = 'frame.arrow'
+    _frames = OrderedDict()  # (upload_id, mtime) -> (DataFrame, bytes)
+    _cached_bytes = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def path(upload_id):
+        return os.path.join(settings.MEDIA_ROOT, 'processed', str(upload_id), DataFrameStore.FILENAME)
+
+    @staticmethod
+    def frame_name(filename):
+        """Variable name a CSV is exposed under in generated pandas code"""
+        return os.path.splitext(os.path.basename(filename))[0].lower().replace(' ', '_')
+
+    @staticmethod
+    def _read_csv(uploaded_file):
+        csv_profile = CsvSniffer.for_uploaded_file(uploaded_file)
+        return pd.read_csv(uploaded_file.file.path, **csv_profile.pandas_kwargs())
+
+    @staticmethod
+    def _write_arrow(df, path):
+        """Write df as an Arrow IPC file; returns False if Arrow cannot hold it as is"""
+        import pyarrow as pa
+        if not all(isinstance(column, str) for column in df.columns):
+            return False
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            print(f"⚠️ Keeping {os.path.dirname(path)} as CSV only: {str(e)}")
+            return False
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Unique per writer: ingest and a query may convert the same CSV at once
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return True
+
+    @staticmethod
+    def _read_arrow(path):
+        import pyarrow as pa
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all().to_pandas()
+
+    @classmethod
+    def materialize(cls, uploaded_file, df=None):
+        """Convert an uploaded CSV to Arrow once, at ingest; df skips re-parsing if already loaded"""
+        start_time = time.time()
+        if df is None:
+            df = cls._read_csv(uploaded_file)
+        if cls._write_arrow(df, cls.path(uploaded_file.id)):
+            print(f"✅ Stored '{uploaded_file.filename}' as Arrow ({len(df)} rows) in {time.time() - start_time:.2f}s")
+        return df
+
+    @classmethod
+    def _load(cls, uploaded_file):
+        path = cls.path(uploaded_file.id)
+        if os.path.exists(path):
+            return cls._read_arrow(path)
+        # Uploads from before the store existed are converted on first use
+        return cls.materialize(uploaded_file)
+
+    @classmethod
+    def _remember(cls, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+        limit = settings.EDA_DATAFRAME_CACHE_MB * 1024 * 1024
+        if size > limit:
+            return
+        with cls._lock:
+            if key in cls._frames:
+                return
+            cls._frames[key] = (df, size)
+            cls._cached_bytes += size
+            while cls._cached_bytes > limit:
+                _, (_, evicted_size) = cls._frames.popitem(last=False)
+                cls._cached_bytes -= evicted_size
+
+    @classmethod
+    def get(cls, uploaded_file):
+        """A private copy of the DataFrame of an uploaded CSV"""
+        return cls._cached(uploaded_file).copy()
+
+    @classmethod
+    def _cached(cls, uploaded_file):
+        """The shared cached DataFrame of an uploaded CSV, loading it if needed; never modify it"""
+        path = cls.path(uploaded_file.id)
+        key = (uploaded_file.id, os.path.getmtime(path) if os.path.exists(path) else None)
+        with cls._lock:
+            cached = cls._frames.get(key)
+            if cached:
+                cls._frames.move_to_end(key)
+        if cached:
+            return cached[0]
+
+        df = cls._load(uploaded_file)
+        # A frame converted just now is cached under its new file's key
+        if key[1] is None and os.path.exists(path):
+            key = (uploaded_file.id, os.path.getmtime(path))
+        cls._remember(key, df)
+        return df
+
+    @classmethod
+    def get_column(cls, uploaded_file, position):
+        """One column by position, without loading the rest of the frame"""
+        path = cls.path(uploaded_file.id)
+        if os.path.exists(path):
+            import pyarrow as pa
+            with pa.memory_map(path, 'r') as source:
+                return pa.ipc.open_file(source).read_all().column(position).to_pandas()
+        csv_profile = CsvSniffer.for_uploaded_file(uploaded_file)
+        df = pd.read_csv(uploaded_file.file.path, usecols=[position], **csv_profile.pandas_kwargs())
+        return df.iloc[:, 0]
+
+    @classmethod
+    def frame_sources(cls, uploaded_files):
+        """
+        Arrow file path (or, if it has none, the DataFrame) of each CSV keyed
+        by frame name, for CodeExecutionEngine; files that fail to load are skipped.
+        Frames Arrow cannot hold come from the in-memory cache, so they are
+        not re-parsed on every query; the engine sends its worker a pickled
+        copy, so the cached frame itself is never exposed.
+        """
+        sources = {}
+        for uploaded_file in uploaded_files:
+            name = cls.frame_name(uploaded_file.filename)
+            path = cls.path(uploaded_file.id)
+            try:
+                if not os.path.exists(path):
+                    df = cls._cached(uploaded_file)
+                    if not os.path.exists(path):
+                        sources[name] = df
+                        continue
+                sources[name] = path
+            except Exception as e:
+                print(f"Error loading CSV {uploaded_file.filename}: {str(e)}")
+        return sources
@@ -2,9 +2,9 @@ import os
 import pandas as pd
 import numpy as np
 import networkx as nx
-from collections import defaultdict
 from typing import List, Dict, Any, Optional, Tuple
 from django.conf import settings
+from eda_pipeline.services.csv_profiler import StreamingCsvProfiler
 
 
 class EdaCsvService:
@@ -29,61 +29,34 @@ class EdaCsvService:
         else:
             return obj
     
-    def generate_csv_metadata(self, csv_path, metadata_id=None, user_id=None, scrape_id=None):
-        """Extract metadata from a CSV file"""
-        filename = os.path.basename(csv_path)
-        
-        # Read the CSV file with error handling
+    def generate_csv_metadata(self, csv_path, metadata_id=None, user_id=None, scrape_id=None, csv_profile=None, filename=None):
+        """
+        Extract metadata from a CSV file, reading it with csv_profile's encoding/dialect if given.
+        filename defaults to the basename of csv_path (uploads may be stored under another name).
+        """
+        filename = filename or os.path.basename(csv_path)
+        read_kwargs = csv_profile.pandas_kwargs() if csv_profile else {}
+        
+        # Profile the CSV in chunks so large files never need to fit in memory;
+        # df is only returned when the file is small enough to keep
         try:
-            df = pd.read_csv(csv_path)
+            profile, df = StreamingCsvProfiler().profile(csv_path, read_kwargs)
         except Exception as e:
             print(f"Error reading CSV {csv_path}: {str(e)}")
             return None, None
         
-        # Get basic metadata
-        num_rows, num_columns = df.shape
-        
-        # Get column descriptions
-        columns = []
-        for col_name in df.columns:
-            col_type = str(df[col_name].dtype)
-            try:
-                sample_values = df[col_name].dropna().head(5).tolist()
-                sample_values = [self.json_serializable(val) for val in sample_values]
-            except:
-                sample_values = ["[Error getting samples]"]
-                
-            # Add additional column metadata
-            col_info = {
-                "name": col_name,
-                "dtype": col_type,
-                "sample_values": sample_values,
-                "unique_values": len(df[col_name].unique()) if len(df[col_name].dropna()) > 0 else 0
-            }
-            
-            # Add numeric stats if appropriate
-            if pd.api.types.is_numeric_dtype(df[col_name]):
-                try:
-                    col_info.update({
-                        "min": self.json_serializable(df[col_name].min()),
-                        "max": self.json_serializable(df[col_name].max()),
-                    })
-                except:
-                    pass  # Skip if stats calculation fails
-                    
-            columns.append(col_info)
-        
-        # Get sample data for visualization
-        sample_data = df.head(2).to_string()
-        
+        csv_metadata = self.metadata_from_profile(
+            profile, csv_path, filename, metadata_id=metadata_id, user_id=user_id, scrape_id=scrape_id
+        )
+        return csv_metadata, df
+
+    def metadata_from_profile(self, profile, csv_path, filename, metadata_id=None, user_id=None, scrape_id=None):
+        """Metadata dict of a CSV from a StreamingCsvProfiler profile (possibly computed in another process)"""
         # Create the initial metadata dictionary
         csv_metadata = {
             "filename": filename,
             "filepath": csv_path,  # Store the actual file path
-            "num_rows": num_rows,
-            "num_columns": num_columns,
-            "columns": columns,
-            "sample_data": sample_data,
+            **profile,
         }
         
         # Add metadata_id and user_id if provided
@@ -95,15 +68,15 @@ class EdaCsvService:
             csv_metadata["scrape_id"] = scrape_id
 
         print(f"✅ Extracted metadata for {filename} (user_id: {user_id}, scrape_id: {scrape_id})")
-        return csv_metadata, df
+        return csv_metadata
         
     def process_csv_file(self, csv_path, user_id=None, scrape_id=None):
         """Process a single CSV file and store its metadata"""
-        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
+        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
         from eda_pipeline.services.eda_groq_service import EdaGroqService
         
         # Initialize handlers
-        vectordb_handler = EdaVectorDBHandler()
+        vectordb_handler = EdaVectorDBSingleton.get_instance()
         groq_service = EdaGroqService()
         
         # Generate metadata
@@ -124,114 +97,40 @@ class EdaCsvService:
     
     
     def detect_csv_relationships(self, csv_paths):
-        """Detect potential relationships between CSV files"""
-        # Store dataframes and their column information
-        dataframes = {}
-        column_info = {}
-        
-        # Load all CSVs
+        """
+        Detect potential relationships between CSV files.
+
+        Each CSV is read once and reduced to per-column signatures; the frames
+        are not kept. Returns the relationship graph, the join keys per file
+        pair and the column signatures per file.
+        """
+        from eda_pipeline.services.relationship_detector import RelationshipDetector
+        detector = RelationshipDetector()
+        signatures = {}
+        paths = {}
+
         for path in csv_paths:
             try:
                 filename = os.path.basename(path)
                 df = pd.read_csv(path)
-                dataframes[filename] = df
-                
-                # Store column information
-                column_info[filename] = {
-                    'cols': df.columns.tolist(),
-                    'dtypes': {col: str(df[col].dtype) for col in df.columns}
-                }
-                
+                signatures[filename] = detector.file_signature(df)
+                paths[filename] = path
             except Exception as e:
                 print(f"Error reading CSV {path}: {str(e)}")
                 continue
-        
+
+        def load_column(filename, column):
+            # Candidates are verified one column at a time instead of holding every frame
+            return pd.read_csv(paths[filename], usecols=[column])[column]
+
+        potential_joins = detector.detect(signatures, load_column)
+
         # Create a graph to represent relationships
         relationship_graph = nx.Graph()
-        
-        # Add all CSV files as nodes
-        for filename in dataframes.keys():
-            relationship_graph.add_node(filename)
-        
-        # Dictionary to store potential join keys
-        potential_joins = defaultdict(list)
-        
-        # Detect potential relationships
-        for file1 in dataframes.keys():
-            for file2 in dataframes.keys():
-                if file1 >= file2:  # Skip self-comparisons and duplicates
-                    continue
-                    
-                # First look for columns with the same name
-                common_cols = set(column_info[file1]['cols']).intersection(set(column_info[file2]['cols']))
-                
-                joins = []
-                # Check for columns with same name and compatible types
-                for col in common_cols:
-                    type1 = column_info[file1]['dtypes'][col]
-                    type2 = column_info[file2]['dtypes'][col]
-                    
-                    # Check if types are compatible (exact match or string-like types)
-                    if (type1 == type2 or 
-                        ('object' in type1 and 'object' in type2) or
-                        ('str' in type1 and 'str' in type2)):
-                        
-                        # Check for value overlap
-                        set1 = set(dataframes[file1][col].dropna().astype(str).tolist())
-                        set2 = set(dataframes[file2][col].dropna().astype(str).tolist())
-                        
-                        if len(set1.intersection(set2)) > 0:
-                            joins.append((col, col))
-                
-                # Now look for columns with different names but similar content
-                # This is the key addition to detect relationships between differently named columns
-                if not joins:  # Only if we didn't find matching column names
-                    df1_cols = dataframes[file1].columns
-                    df2_cols = dataframes[file2].columns
-                    
-                    # Check each column in the first file against each in the second
-                    for col1 in df1_cols:
-                        for col2 in df2_cols:
-                            # Skip if column names are the same (already checked above)
-                            if col1 == col2:
-                                continue
-                            
-                            # Check if either column name contains the other
-                            # Or check for common substrings like "id", "customer", etc.
-                            name_similarity = (col1.lower() in col2.lower() or 
-                                            col2.lower() in col1.lower() or
-                                            ("id" in col1.lower() and "id" in col2.lower()) or
-                                            ("customer" in col1.lower() and "id" in col2.lower()))
-                            
-                            if not name_similarity:
-                                continue
-                                
-                            # Check data types for compatibility
-                            type1 = column_info[file1]['dtypes'][col1]
-                            type2 = column_info[file2]['dtypes'][col2]
-                            
-                            type_compatibility = (type1 == type2 or 
-                                                ('object' in type1 and 'object' in type2) or
-                                                ('str' in type1 and 'str' in type2))
-                            
-                            if not type_compatibility:
-                                continue
-                            
-                            # Check for value overlap
-                            set1 = set(dataframes[file1][col1].dropna().astype(str).tolist())
-                            set2 = set(dataframes[file2][col2].dropna().astype(str).tolist())
-                            
-                            intersection = set1.intersection(set2)
-                            if len(intersection) > 0:
-                                print(f"Found relationship between {file1}.{col1} and {file2}.{col2} with {len(intersection)} matching values")
-                                joins.append((col1, col2))
-                
-                # Add edge if we found potential join keys
-                if joins:
-                    relationship_graph.add_edge(file1, file2)
-                    potential_joins[(file1, file2)] = joins
-        
-        return relationship_graph, potential_joins, dataframes
+        relationship_graph.add_nodes_from(signatures.keys())
+        relationship_graph.add_edges_from(potential_joins.keys())
+
+        return relationship_graph, potential_joins, signatures
     
     def process_csv_files(self, csv_paths, user_id=None, scrape_id=None):
         """Process multiple CSV files and detect relationships"""
@@ -248,8 +147,8 @@ class EdaCsvService:
             
             if relationship_graph.edges:
                 # Store relationship information
-                from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
-                vectordb_handler = EdaVectorDBHandler()
+                from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
+                vectordb_handler = EdaVectorDBSingleton.get_instance()
                 vectordb_handler.store_csv_relationships(
                     potential_joins, user_id=user_id, scrape_id=scrape_id
                 )
@@ -1,11 +1,14 @@
 import os
 import re
+import threading
+import time
 import pandas as pd
 import numpy as np
 import json
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel, Field
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # Langchain imports
 from langchain_groq import ChatGroq
@@ -15,7 +18,11 @@ from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.output_parsers import PydanticOutputParser
 
 # Import custom modules
-from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
+from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
+from eda_pipeline.services.code_executor import CodeExecutionEngine, CodeExecutionError
+from eda_pipeline.services.csv_catalog import CsvCatalog
+from eda_pipeline.services.csv_description_cache import CsvDescriptionCache
+from eda_pipeline.services.result_serializer import ResultSerializer
 from eda_pipeline.templates.llm_templates import (
     REGULAR_QUERY_TEMPLATE, 
     RELATIONSHIP_QUERY_TEMPLATE,
@@ -43,40 +50,15 @@ class SimplePandasExecutor:
         print(f"[DEBUG] Added dataframe '{name}' with shape {df.shape}")
     
     def execute_query(self, code):
-        """Execute pandas code and return the result"""
+        """Execute pandas code in a sandbox worker and return the result"""
         print(f"[DEBUG] SimplePandasExecutor.execute_query() - Starting execution")
         print(f"[DEBUG] Available dataframes: {list(self.dataframes.keys())}")
         
-        # Create execution environment with dataframes and common libraries
-        import pandas as pd
-        import numpy as np
-        import matplotlib.pyplot as plt
-        from datetime import datetime, timedelta
-        
-        local_vars = {
-            "pd": pd, 
-            "np": np, 
-            "plt": plt,
-            "datetime": datetime,
-            "timedelta": timedelta,
-            **self.dataframes
-        }
-        
-        try:
-            print(f"[DEBUG] Executing pandas code...")
-            # Execute the code
-            exec(code, globals(), local_vars)
-            
-            # Return the result if available
-            if 'result' in local_vars:
-                return local_vars['result']
-            else:
-                print(f"[DEBUG] No 'result' variable found in executed code")
-                return None
-                
-        except Exception as e:
-            print(f"[DEBUG] Error executing code: {str(e)}")
-            raise
+        exec_result = CodeExecutionEngine.get_instance().execute(code, self.dataframes)
+        if not exec_result["success"]:
+            print(f"[DEBUG] Error executing code: {exec_result['error']}")
+            raise CodeExecutionError(exec_result["error"])
+        return exec_result["result"]
 
 class EdaGroqService:
     """Service for handling Groq LLM interactions"""
@@ -95,7 +77,7 @@ class EdaGroqService:
         )
         
         # Initialize the vector database handler
-        self.vectordb_handler = EdaVectorDBHandler()
+        self.vectordb_handler = EdaVectorDBSingleton.get_instance()
         
         # Initialize the pandas query generator parser
         self.pandas_query_parser = PydanticOutputParser(pydantic_object=PandasQueryGenerator)
@@ -127,8 +109,32 @@ class EdaGroqService:
         return []
 
     
-    def generate_csv_description(self, csv_metadata):
-        """Generate a descriptive summary of a CSV file from its metadata"""
+    def cached_csv_description(self, csv_metadata, stats=None):
+        """Fill in the description from CsvDescriptionCache if the schema was described before; returns whether it was"""
+        user_id = csv_metadata.get('user_id')
+        if not CsvDescriptionCache.enabled(user_id):
+            return False
+        cached = CsvDescriptionCache.get(user_id, CsvDescriptionCache.fingerprint(csv_metadata))
+        if not cached:
+            return False
+        csv_metadata['description'] = cached.description
+        if stats:
+            stats.record_hit(cached.generation_seconds)
+        print(f"♻️ Reused cached description for {csv_metadata['filename']} (saved {cached.generation_seconds:.2f}s)")
+        return True
+
+    def generate_csv_description(self, csv_metadata, stats=None, use_cache=True):
+        """
+        Generate a descriptive summary of a CSV file from its metadata.
+
+        With use_cache, a description cached for the same schema fingerprint
+        is reused instead of calling the LLM; new descriptions are always
+        cached. stats (a DescriptionCacheStats) counts LLM calls made and saved.
+        """
+        if use_cache and self.cached_csv_description(csv_metadata, stats):
+            return csv_metadata
+
+        start_time = time.time()
         # Create a prompt for the LLM to generate a description
         prompt = ChatPromptTemplate.from_template(CSV_DESCRIPTION_TEMPLATE)
         
@@ -157,6 +163,14 @@ class EdaGroqService:
         
         # Update the metadata with the description
         csv_metadata['description'] = description.strip()
+        generation_seconds = time.time() - start_time
+        if stats:
+            stats.record_miss(generation_seconds)
+        user_id = csv_metadata.get('user_id')
+        if CsvDescriptionCache.enabled(user_id):
+            CsvDescriptionCache.put(
+                user_id, CsvDescriptionCache.fingerprint(csv_metadata), csv_metadata['description'], generation_seconds
+            )
         
         print(f"✅ Generated description for {csv_metadata['filename']}")
         # Return the updated metadata
@@ -171,15 +185,8 @@ class EdaGroqService:
         if self._is_conversational_query(query):
             return self._handle_conversational_query(query)
             
-        # First, retrieve relevant CSV descriptions from the vector database
-        relevant_csvs = self.vectordb_handler.retrieve_csv_descriptions(
-            query=query, k=3, user_id=user_id, scrape_id=scrape_id
-        )
-
-        # First, retrieve relevant CSV descriptions from the vector database
-        relevant_csvs = self.vectordb_handler.retrieve_csv_descriptions(
-            query=query, k=3, user_id=user_id, scrape_id=scrape_id
-        )
+        # Retrieve relevant CSV descriptions (one vector search; metadata comes from the catalog)
+        relevant_csvs = CsvCatalog.search(query, k=3, user_id=user_id)
 
         print(f"[DEBUG] Found {len(relevant_csvs)} relevant CSVs: {[csv['filename'] for csv in relevant_csvs]}")
 
@@ -195,17 +202,17 @@ class EdaGroqService:
         # Format the retrieved CSV information for the LLM
         csv_info = self._format_csv_info_for_llm(relevant_csvs)
         
-        # Check if we have relationship data AND if the query might be about relationships
-        # First get relationship information
-        relationships, relationship_text = self.vectordb_handler.retrieve_csv_relationships(user_id=user_id)
-        
         # Check if relationships exist AND (query suggests relationships OR we have multiple CSVs)
         is_relationship_query = re.search(r'relation|connect|join|link|between', query.lower())
         has_multiple_csvs = len(set([csv.get('filename', '') for csv in relevant_csvs])) > 1
         
-        if relationships and (is_relationship_query or has_multiple_csvs):
-            print(f"[DEBUG] Routing to relationship handler: is_relationship_query={is_relationship_query}, has_multiple_csvs={has_multiple_csvs}")
-            return self._handle_relationship_query(query, relevant_csvs, user_id, scrape_id)
+        if is_relationship_query or has_multiple_csvs:
+            relationships, relationship_text = CsvCatalog.relationships(user_id=user_id)
+            if relationships:
+                print(f"[DEBUG] Routing to relationship handler: is_relationship_query={is_relationship_query}, has_multiple_csvs={has_multiple_csvs}")
+                return self._handle_relationship_query(
+                    query, relevant_csvs, user_id, scrape_id, relationships=relationships, relationship_text=relationship_text
+                )
         
         # Generate answer for regular query
         return self._handle_regular_query(query, relevant_csvs, csv_info)
@@ -301,13 +308,12 @@ class EdaGroqService:
         return csv_info
         
 
-    def _handle_relationship_query(self, query, relevant_csvs, user_id, scrape_id):
+    def _handle_relationship_query(self, query, relevant_csvs, user_id, scrape_id, relationships=None, relationship_text=None):
         """Handle queries about relationships between CSVs"""
         print(f"[DEBUG] Handling relationship query: {query}")
-        # Get relationship information from vector database
-        relationships, relationship_text = self.vectordb_handler.retrieve_csv_relationships(
-            user_id=user_id
-        )
+        # Get relationship information unless the caller already has it
+        if relationships is None:
+            relationships, relationship_text = CsvCatalog.relationships(user_id=user_id)
         
         if not relationships:
             return {
@@ -466,53 +472,24 @@ class EdaGroqService:
             }
 
  
-    def format_output_for_display(self, result):
-        """Format the output for display in a web interface"""
-        if isinstance(result, pd.DataFrame):
-            # Convert DataFrame to HTML for display
-            return {
-                "type": "dataframe",
-                "html": result.to_html(classes="table table-striped", index=True),
-                "records": result.to_dict(orient="records"),
-                "columns": result.columns.tolist(),
-                "shape": result.shape
-            }
-        
-        elif isinstance(result, pd.Series):
-            # Convert Series to dictionary
-            return {
-                "type": "series",
-                "data": result.to_dict(),
-                "name": result.name
-            }
-        
-        elif isinstance(result, (dict, list)):
-            # Return dictionaries and lists directly
-            return {
-                "type": "collection",
-                "data": result
-            }
-        
-        else:
-            # For other types, convert to string
-            return {
-                "type": "other",
-                "data": str(result)
-            }
+    def format_output_for_display(self, result, user_id=None, result_format='records'):
+        """
+        Format the output for display in a web interface.
+
+        Large DataFrames are cut to one page; with user_id the full result
+        is kept for the cursor endpoint (see ResultSerializer).
+        """
+        return ResultSerializer.serialize(result, user_id=user_id, result_format=result_format)
     
-    def execute_pandas_code(self, code, dataframes):
-        """Execute pandas code and return the result"""
-        print(f"[DEBUG] SimplePandasExecutor.execute_query() - Starting execution")
-        print(f"[DEBUG] Available dataframes: {list(dataframes.keys())}")
-        
-        # Create execution environment with dataframes and common libraries
-        import pandas as pd
-        import numpy as np
-        import matplotlib.pyplot as plt
-        import os
-        import re
-        import json
-        from datetime import datetime, timedelta
+    def execute_pandas_code(self, code, dataframes, timeout=None, cancel_event=None):
+        """
+        Execute pandas code in a sandbox worker and return the result.
+
+        dataframes maps frame names to DataFrames or to the Arrow files of
+        DataFrameStore.frame_sources, which the worker memory-maps itself.
+        timeout and cancel_event are passed to CodeExecutionEngine.execute.
+        """
+        print(f"[DEBUG] Sandboxed execution with dataframes: {list(dataframes.keys())}")
         
         # First, check if code is trying to directly load CSVs with specific paths
         path_pattern = r"pd\.read_csv\s*\(\s*['\"]([^'\"]+)['\"]\s*\)"
@@ -535,71 +512,67 @@ class EdaGroqService:
             except Exception as e:
                 print(f"[DEBUG] Error while trying to replace file paths: {str(e)}")
         
-        local_vars = {
-            "pd": pd, 
-            "np": np, 
-            "plt": plt,
-            "datetime": datetime,
-            "timedelta": timedelta,
-            "json": json,
-            "os": os,
-            **dataframes
-        }
+        # Add safeguards for executing code
+        # - Don't allow imports
+        # - Don't allow file operations except in read mode
+        if re.search(r"^\s*import\s+", code, re.MULTILINE):
+            return {"success": False, "error": "Direct imports are not allowed for security reasons"}
         
-        try:
-            # Add safeguards for executing code
-            # - Don't allow imports
-            # - Don't allow file operations except in read mode
-            if re.search(r"^\s*import\s+", code, re.MULTILINE):
-                return {"success": False, "error": "Direct imports are not allowed for security reasons"}
-            
-            if re.search(r"open\s*\(.+[^'r][\'\"]", code):
-                return {"success": False, "error": "File writing operations are not allowed for security reasons"}
-            
-            # Execute the code
-            exec_result = {}
-            print("[DEBUG] Executing code:")
-            print(code)
-            
-            exec(code, globals(), local_vars)
-            
-            # Try to find the result variable
-            if 'result' in local_vars:
-                exec_result = {"success": True, "result": local_vars['result']}
-            else:
-                # If no explicit result variable, try to find the most relevant DataFrame
-                for var_name, var_value in local_vars.items():
-                    # Skip original dataframes and built-in modules
-                    if var_name in list(dataframes.keys()) + ["pd", "np", "plt", "datetime", "timedelta", "json", "os"]:
-                        continue
-                    
-                    if isinstance(var_value, pd.DataFrame):
-                        exec_result = {"success": True, "result": var_value}
-                        break
-                
-                # If still no result found
-                if not exec_result:
-                    exec_result = {"success": True, "result": "Code executed successfully, but no result was produced"}
-            
-            return exec_result
-                
-        except Exception as e:
-            print(f"[DEBUG] Error executing code: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return {"success": False, "error": str(e)}
-
-    def execute_multiple_code_blocks(self, code_blocks, dataframes):
-        """Execute multiple code blocks and return results for each"""
-        results = []
+        if re.search(r"open\s*\(.+[^'r][\'\"]", code):
+            return {"success": False, "error": "File writing operations are not allowed for security reasons"}
         
-        for i, code in enumerate(code_blocks):
+        print("[DEBUG] Executing code:")
+        print(code)
+        
+        # CPU, memory and wall-clock limits are enforced by the worker pool
+        exec_result = CodeExecutionEngine.get_instance().execute(
+            code, dataframes, timeout=timeout, cancel_event=cancel_event
+        )
+        if not exec_result["success"]:
+            print(f"[DEBUG] Error executing code: {exec_result['error']}")
+        return exec_result
+
+    def execute_multiple_code_blocks(self, code_blocks, dataframes, timeout=None, first_success=False,
+                                     user_id=None, result_format='records'):
+        """
+        Execute multiple code blocks and return results for each, in block order.
+
+        Blocks run concurrently, each in its own sandbox worker; the workers
+        memory-map the same Arrow files, so the DataFrames are shared
+        read-only. timeout applies to each block separately. With
+        first_success, the remaining blocks are cancelled as soon as one
+        succeeds and are reported with type "cancelled". user_id and
+        result_format are passed to format_output_for_display.
+        """
+        if not code_blocks:
+            return []
+        start_time = time.time()
+        cancel_event = threading.Event() if first_success else None
+        
+        def run_block(i, code):
             print(f"[DEBUG] Executing code block {i+1} of {len(code_blocks)}")
-            result = self.execute_pandas_code(code, dataframes)
+            result = self.execute_pandas_code(code, dataframes, timeout=timeout, cancel_event=cancel_event)
+            if cancel_event is not None and result.get("success"):
+                cancel_event.set()
+            return result
+        
+        with ThreadPoolExecutor(max_workers=len(code_blocks), thread_name_prefix='code-block') as executor:
+            futures = [executor.submit(run_block, i, code) for i, code in enumerate(code_blocks)]
+        
+        results = []
+        for code, future in zip(code_blocks, futures):
+            result = future.result()
             
             # Format the result
             if result.get("success"):
-                formatted_result = self.format_output_for_display(result.get("result"))
+                formatted_result = self.format_output_for_display(
+                    result.get("result"), user_id=user_id, result_format=result_format
+                )
+            elif result.get("cancelled"):
+                formatted_result = {
+                    "type": "cancelled",
+                    "message": "Not needed: another code block succeeded first"
+                }
             else:
                 formatted_result = {
                     "type": "error",
@@ -612,4 +585,5 @@ class EdaGroqService:
                 "result": formatted_result
             })
         
-        return results
\ No newline at end of file
+        print(f"[DEBUG] Executed {len(code_blocks)} code blocks in {time.time() - start_time:.2f}s")
+        return results
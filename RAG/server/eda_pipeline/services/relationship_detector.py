@@ -0,0 +1,220 @@
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+# Hashes kept per column (bottom-k / KMV sketch); columns with at most this
+# many distinct values are represented exactly
+RELATIONSHIP_SKETCH_SIZE = int(os.getenv("EDA_RELATIONSHIP_SKETCH_SIZE", 512))
+# Share of the smaller column's distinct values that must occur in the other
+RELATIONSHIP_MIN_CONTAINMENT = float(os.getenv("EDA_RELATIONSHIP_MIN_CONTAINMENT", 0.5))
+# Candidate column pairs per file pair that are verified against the full data
+RELATIONSHIP_VERIFY_TOP = int(os.getenv("EDA_RELATIONSHIP_VERIFY_TOP", 3))
+
+_HASH_SPACE = float(2 ** 64)
+
+
+def column_hashes(series):
+    """64-bit hashes of the non-null values of a column, as their string form for text columns"""
+    values = series.dropna()
+    if values.dtype == object:
+        values = values.astype(str)
+    return pd.util.hash_array(values.to_numpy(), categorize=True)
+
+
+def types_compatible(type1, type2):
+    return type1 == type2 or ('object' in type1 and 'object' in type2) or ('str' in type1 and 'str' in type2)
+
+
+def names_related(col1, col2):
+    """Name heuristic for differently named join keys (e.g. customer / customer_id)"""
+    col1, col2 = str(col1).lower(), str(col2).lower()
+    return (
+        col1 in col2 or col2 in col1 or
+        ("id" in col1 and "id" in col2) or
+        ("customer" in col1 and "id" in col2)
+    )
+
+
+@dataclass
+class ColumnSignature:
+    """
+    Compact summary of one column, computed once per file.
+
+    sketch holds the smallest distinct value hashes (a KMV sketch); when the
+    column has no more distinct values than the sketch size it holds all of
+    them and exact is True.
+    """
+    column: str
+    dtype: str
+    rows: int
+    non_null: int
+    distinct: int
+    exact: bool
+    sketch: np.ndarray
+
+    @classmethod
+    def from_series(cls, column, series, sketch_size=RELATIONSHIP_SKETCH_SIZE):
+        hashes = column_hashes(series)
+        sketch, distinct, exact = cls._bottom_k(hashes, sketch_size)
+        return cls(
+            column=column,
+            dtype=str(series.dtype),
+            rows=len(series),
+            non_null=len(hashes),
+            distinct=distinct,
+            exact=exact,
+            sketch=sketch
+        )
+
+    @staticmethod
+    def _bottom_k(hashes, k):
+        """(k smallest distinct hashes, distinct count or estimate, whether that count is exact)"""
+        if len(hashes) > 4 * k:
+            # Only the smallest few hashes are needed; partitioning avoids sorting them all
+            smallest = np.unique(np.partition(hashes, 4 * k)[:4 * k + 1])
+            if len(smallest) >= k:
+                sketch = smallest[:k]
+                # KMV estimate: k distinct values fill sketch[-1] / 2^64 of the hash space
+                return sketch, int((k - 1) * _HASH_SPACE / (float(sketch[-1]) + 1)), False
+        distinct = np.unique(hashes)
+        return distinct[:k], len(distinct), len(distinct) <= k
+
+    def to_dict(self):
+        return {
+            "column": self.column,
+            "dtype": self.dtype,
+            "rows": self.rows,
+            "non_null": self.non_null,
+            "distinct": self.distinct,
+            "exact": self.exact,
+            "sketch": [int(value) for value in self.sketch],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{**data, "sketch": np.asarray(data["sketch"], dtype=np.uint64)})
+
+
+def estimate_overlap(sig1, sig2):
+    """Estimated number of distinct values the two columns share"""
+    if sig1.exact and sig2.exact:
+        return len(np.intersect1d(sig1.sketch, sig2.sketch, assume_unique=True))
+    # The k smallest hashes of the union are judged correctly by both sketches
+    # as long as k does not exceed any truncated sketch
+    k = min(len(signature.sketch) for signature in (sig1, sig2) if not signature.exact)
+    union = np.union1d(sig1.sketch, sig2.sketch)[:k]
+    if not len(union):
+        return 0
+    shared = np.isin(union, sig1.sketch, assume_unique=True) & np.isin(union, sig2.sketch, assume_unique=True)
+    jaccard = shared.sum() / len(union)
+    return jaccard * (sig1.distinct + sig2.distinct) / (1 + jaccard)
+
+
+class RelationshipDetector:
+    """
+    Finds join keys between CSV files from per-column signatures.
+
+    Signatures are computed once per file (dtype, cardinality and a KMV
+    sketch of value hashes). Column pairs that pass the existing name and
+    type rules are scored by estimated containment from their sketches;
+    only the best few per file pair are verified against the full columns,
+    so no file pair ever needs both DataFrames in memory.
+    """
+
+    def __init__(self, sketch_size=RELATIONSHIP_SKETCH_SIZE, min_containment=RELATIONSHIP_MIN_CONTAINMENT,
+                 verify_top=RELATIONSHIP_VERIFY_TOP):
+        self.sketch_size = sketch_size
+        self.min_containment = min_containment
+        self.verify_top = verify_top
+
+    def file_signature(self, df) -> Dict[str, ColumnSignature]:
+        """Signatures keyed by column name (as a string), in column order"""
+        return {
+            str(column): ColumnSignature.from_series(str(column), df.iloc[:, position], self.sketch_size)
+            for position, column in enumerate(df.columns)
+        }
+
+    def _candidates(self, columns1, columns2):
+        """Name/type compatible column pairs: same-named ones, else name-related ones"""
+        same = [
+            (col, col) for col in columns1
+            if col in columns2 and types_compatible(columns1[col].dtype, columns2[col].dtype)
+        ]
+        related = [
+            (col1, col2) for col1 in columns1 for col2 in columns2
+            if col1 != col2 and names_related(col1, col2)
+            and types_compatible(columns1[col1].dtype, columns2[col2].dtype)
+        ]
+        return same, related
+
+    def _score(self, sig1, sig2):
+        """Estimated containment of the column with fewer distinct values in the other"""
+        smaller = min(sig1.distinct, sig2.distinct)
+        if smaller < 2:
+            # Empty or constant columns do not make meaningful keys
+            return 0.0
+        return min(1.0, estimate_overlap(sig1, sig2) / smaller)
+
+    def _verify(self, pairs, file1, file2, signatures, exact_hashes, labels):
+        """Exact containment check of the top scored pairs; returns the confirmed ones"""
+        joins = []
+        scored = sorted(
+            ((self._score(signatures[file1][col1], signatures[file2][col2]), col1, col2) for col1, col2 in pairs),
+            key=lambda item: item[0], reverse=True
+        )
+        # Sketch estimates are noisy, so anything reasonably close is verified
+        for score, col1, col2 in scored[:self.verify_top]:
+            if score < self.min_containment / 2:
+                break
+            try:
+                hashes1, hashes2 = exact_hashes(file1, col1), exact_hashes(file2, col2)
+            except Exception as e:
+                print(f"Error verifying {labels.get(file1, file1)}.{col1} against {labels.get(file2, file2)}.{col2}: {str(e)}")
+                continue
+            shared = len(np.intersect1d(hashes1, hashes2, assume_unique=True))
+            containment = shared / max(min(len(hashes1), len(hashes2)), 1)
+            if containment >= self.min_containment:
+                print(f"Found relationship between {labels.get(file1, file1)}.{col1} and {labels.get(file2, file2)}.{col2} "
+                      f"with {shared} matching values ({containment:.0%} containment)")
+                joins.append((col1, col2))
+        return joins
+
+    def detect(self, signatures: Dict[str, Dict[str, ColumnSignature]],
+               load_column: Callable[[str, str], pd.Series],
+               pairs: Optional[Iterable[Tuple[str, str]]] = None,
+               labels: Optional[Dict[str, str]] = None) -> Dict[Tuple[str, str], List[Tuple[str, str]]]:
+        """
+        Join keys between pairs of files, by default every pair.
+
+        signatures maps file names to their file_signature(); load_column(file,
+        column) returns a full column and is only called for pairs being
+        verified. labels gives display names for the log. Returns
+        {(file1, file2): [(col1, col2), ...]} with file1 < file2.
+        """
+        labels = labels or {}
+        cache = {}
+
+        def exact_hashes(filename, column):
+            signature = signatures[filename][column]
+            if signature.exact:
+                return signature.sketch
+            if (filename, column) not in cache:
+                cache[(filename, column)] = np.unique(column_hashes(load_column(filename, column)))
+            return cache[(filename, column)]
+
+        if pairs is None:
+            files = sorted(signatures)
+            pairs = [(file1, file2) for i, file1 in enumerate(files) for file2 in files[i + 1:]]
+
+        potential_joins = {}
+        for file1, file2 in sorted({tuple(sorted(pair)) for pair in pairs}):
+            same, related = self._candidates(signatures[file1], signatures[file2])
+            joins = self._verify(same, file1, file2, signatures, exact_hashes, labels)
+            # Differently named columns are only considered without a same-name key
+            if not joins:
+                joins = self._verify(related, file1, file2, signatures, exact_hashes, labels)
+            if joins:
+                potential_joins[(file1, file2)] = joins
+        return potential_joins
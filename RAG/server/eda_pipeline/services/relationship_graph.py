@@ -0,0 +1,156 @@
+import time
+from collections import defaultdict
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from file_uploader.models import UploadedFile
+from ..models import CsvColumnSignature, CsvRelationship
+from .dataframe_store import DataFrameStore
+from .relationship_detector import ColumnSignature, RelationshipDetector
+
+
+class RelationshipGraph:
+    """
+    Per-user graph of join keys between uploaded CSVs, kept in the database.
+
+    Column signatures are computed once per CSV and stored. Adding a CSV
+    compares it only against the user's CSVs already in the graph, and
+    edges are deleted together with either of their files (FK cascade), so
+    changing the set of files never recomputes the pairs that did not change.
+    """
+
+    @staticmethod
+    def _lock_user(user_id):
+        """
+        Link files of one user one at a time, across threads and worker
+        processes, so none misses another: lock the user row until the
+        surrounding transaction commits.
+        """
+        list(get_user_model().objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+
+    @staticmethod
+    def _from_row(row):
+        return ColumnSignature(
+            column=row.column,
+            dtype=row.dtype,
+            rows=row.rows,
+            non_null=row.non_null,
+            distinct=row.distinct,
+            exact=row.exact,
+            sketch=np.frombuffer(bytes(row.sketch), dtype='<u8').astype(np.uint64)
+        )
+
+    @staticmethod
+    def _to_row(uploaded_file, position, signature):
+        return CsvColumnSignature(
+            upload=uploaded_file,
+            position=position,
+            column=signature.column,
+            dtype=signature.dtype,
+            rows=signature.rows,
+            non_null=signature.non_null,
+            distinct=signature.distinct,
+            exact=signature.exact,
+            sketch=signature.sketch.astype('<u8').tobytes()
+        )
+
+    @classmethod
+    def signatures(cls, upload_ids):
+        """{upload_id: {column: ColumnSignature}} of the given uploads, in column order"""
+        signatures = defaultdict(dict)
+        for row in CsvColumnSignature.objects.filter(upload_id__in=upload_ids).order_by('upload_id', 'position'):
+            signatures[str(row.upload_id)][row.column] = cls._from_row(row)
+        return signatures
+
+    @staticmethod
+    def contains(uploaded_file):
+        return CsvColumnSignature.objects.filter(upload_id=uploaded_file.id).exists()
+
+    @classmethod
+    def add_file(cls, uploaded_file, df=None, source=None):
+        """
+        Put a CSV into its user's graph and return the relationships created.
+
+        df avoids loading the frame again when the caller already parsed it;
+        source is an identical upload whose stored signatures can be reused.
+        Files already in the graph are left as they are.
+        """
+        if cls.contains(uploaded_file):
+            return []
+        start_time = time.time()
+        detector = RelationshipDetector()
+        new_id = str(uploaded_file.id)
+
+        signatures = cls.signatures([source.id]).get(str(source.id)) if source else None
+        if not signatures:
+            if df is None:
+                df = DataFrameStore.get(uploaded_file)
+            signatures = detector.file_signature(df)
+
+        with transaction.atomic():
+            cls._lock_user(uploaded_file.user_id)
+            if cls.contains(uploaded_file):
+                return []
+            others = {
+                str(upload.id): upload
+                for upload in UploadedFile.objects
+                .filter(user_id=uploaded_file.user_id, column_signatures__isnull=False)
+                .exclude(id=uploaded_file.id)
+                .defer('markdown_content')
+                .distinct()
+            }
+            all_signatures = cls.signatures(list(others))
+            all_signatures[new_id] = signatures
+            uploads = {**others, new_id: uploaded_file}
+            positions = {
+                upload_id: {column: position for position, column in enumerate(columns)}
+                for upload_id, columns in all_signatures.items()
+            }
+
+            def load_column(upload_id, column):
+                position = positions[upload_id][column]
+                if upload_id == new_id and df is not None:
+                    return df.iloc[:, position]
+                return DataFrameStore.get_column(uploads[upload_id], position)
+
+            potential_joins = detector.detect(
+                all_signatures, load_column, pairs=[(new_id, other_id) for other_id in others],
+                labels={upload_id: upload.filename for upload_id, upload in uploads.items()}
+            )
+
+            CsvColumnSignature.objects.bulk_create([
+                cls._to_row(uploaded_file, position, signature)
+                for position, signature in enumerate(signatures.values())
+            ])
+            relationships = CsvRelationship.objects.bulk_create([
+                CsvRelationship(
+                    user_id=uploaded_file.user_id,
+                    source=uploads[file1],
+                    target=uploads[file2],
+                    joins=[list(join) for join in joins]
+                )
+                for (file1, file2), joins in potential_joins.items()
+            ])
+
+        print(f"🔗 Linked '{uploaded_file.filename}' against {len(others)} CSVs: "
+              f"{len(relationships)} relationships in {time.time() - start_time:.2f}s")
+        return relationships
+
+    @staticmethod
+    def relationships(user_id=None, upload_ids=None):
+        """Join keys as {(source filename, target filename): [(col1, col2), ...]}, optionally only those touching upload_ids"""
+        queryset = CsvRelationship.objects.all()
+        if user_id:
+            queryset = queryset.filter(user_id=user_id)
+        if upload_ids:
+            queryset = queryset.filter(Q(source_id__in=upload_ids) | Q(target_id__in=upload_ids))
+
+        potential_joins = defaultdict(list)
+        for relationship in queryset.select_related('source', 'target').only(
+            'joins', 'source__filename', 'target__filename'
+        ):
+            potential_joins[(relationship.source.filename, relationship.target.filename)].extend(
+                tuple(join) for join in relationship.joins
+            )
+        return potential_joins
@@ -0,0 +1,176 @@
+import os
+import time
+import uuid
+import pandas as pd
+from django.conf import settings
+from .code_executor import arrow_table, tabulate_collection, truncate_collection, unique_column_names
+
+RESULT_FORMATS = ('records', 'columnar')
+
+
+class ResultStore:
+    """
+    Server-side cache of query results, so large results can be paged.
+
+    Each result is written as an Arrow IPC file under
+    media/results/<user_id>/<execution_id>.arrow (visible to every web
+    worker) and pages are sliced from the memory-mapped file. Files older
+    than EDA_RESULT_TTL seconds are removed when the user stores a new
+    result, and are no longer served.
+    """
+
+    @staticmethod
+    def _directory(user_id):
+        return os.path.join(settings.MEDIA_ROOT, 'results', str(user_id))
+
+    @classmethod
+    def path(cls, user_id, execution_id):
+        return os.path.join(cls._directory(user_id), f"{uuid.UUID(str(execution_id))}.arrow")
+
+    @classmethod
+    def _purge_expired(cls, user_id):
+        directory = cls._directory(user_id)
+        if not os.path.isdir(directory):
+            return
+        expires_before = time.time() - settings.EDA_RESULT_TTL
+        for entry in os.scandir(directory):
+            try:
+                if entry.stat().st_mtime < expires_before:
+                    os.remove(entry.path)
+            except OSError:
+                pass
+
+    @classmethod
+    def put(cls, user_id, df):
+        """Store a DataFrame (with its index) and return its execution id"""
+        import pyarrow as pa
+        cls._purge_expired(user_id)
+        table = arrow_table(df)
+
+        execution_id = str(uuid.uuid4())
+        path = cls.path(user_id, execution_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        return execution_id
+
+    @classmethod
+    def get_page(cls, user_id, execution_id, offset=0, limit=None, columns=None):
+        """(page DataFrame, total rows, all column names) of a stored result; None if missing or expired"""
+        import pyarrow as pa
+        path = cls.path(user_id, execution_id)
+        if not os.path.exists(path) or os.path.getmtime(path) < time.time() - settings.EDA_RESULT_TTL:
+            return None
+        with pa.memory_map(path, 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+            page = table.slice(offset, limit).to_pandas()
+        all_columns = page.columns.tolist()
+        if columns:
+            page = page[[column for column in all_columns if str(column) in columns]]
+        return page, table.num_rows, all_columns
+
+
+class ResultSerializer:
+    """
+    Bounded serialization of query results for the API.
+
+    DataFrames (and Series) are cut to EDA_RESULT_PAGE_ROWS rows and
+    EDA_RESULT_MAX_COLUMNS columns. When anything was cut and a user is
+    given, the full result goes to the ResultStore and the response carries
+    its execution_id and a cursor for the next page. Lists and dicts longer
+    than a page are turned into frames first (tabulate_collection) and
+    nested ones are truncated. 'records' keeps the
+    original html + records shape; 'columnar' returns the values once, per
+    column, without HTML.
+    """
+
+    @staticmethod
+    def _frame_payload(df, result_format):
+        if result_format == 'columnar':
+            return {
+                "format": "columnar",
+                "index": df.index.tolist(),
+                "data": {
+                    name: df.iloc[:, i].tolist()
+                    for i, name in enumerate(unique_column_names(df.columns))
+                }
+            }
+        return {
+            "html": df.to_html(classes="table table-striped", index=True),
+            "records": df.to_dict(orient="records"),
+        }
+
+    @staticmethod
+    def page_info(offset, page_rows, total_rows):
+        next_offset = offset + page_rows
+        return {
+            "offset": offset,
+            "page_rows": page_rows,
+            "total_rows": total_rows,
+            "next_cursor": str(next_offset) if next_offset < total_rows else None,
+        }
+
+    @classmethod
+    def serialize_page(cls, page, offset, total_rows, all_columns, result_format='records'):
+        """Response for one page of a stored result, as returned by the cursor endpoint"""
+        return {
+            "type": "dataframe",
+            "columns": page.columns.tolist(),
+            "all_columns": all_columns,
+            **cls._frame_payload(page, result_format),
+            **cls.page_info(offset, len(page), total_rows),
+        }
+
+    @classmethod
+    def serialize(cls, result, user_id=None, result_format='records'):
+        """Format a result for display in a web interface"""
+        if result_format not in RESULT_FORMATS:
+            result_format = 'records'
+        max_rows = settings.EDA_RESULT_PAGE_ROWS
+        max_columns = settings.EDA_RESULT_MAX_COLUMNS
+        if isinstance(result, (dict, list)):
+            # Large collections are capped and paged as frames
+            frame = tabulate_collection(result, max_rows)
+            result = frame if frame is not None else truncate_collection(result, max_rows)
+
+        if isinstance(result, pd.DataFrame):
+            page = result.iloc[:max_rows, :max_columns]
+            output = {
+                "type": "dataframe",
+                **cls._frame_payload(page, result_format),
+                "columns": page.columns.tolist(),
+                "shape": result.shape,
+                "truncated_columns": max(result.shape[1] - max_columns, 0),
+            }
+        elif isinstance(result, pd.Series):
+            page = result.iloc[:max_rows]
+            output = {
+                "type": "series",
+                "data": page.to_dict(),
+                "name": result.name
+            }
+        elif isinstance(result, (dict, list)):
+            # Small dictionaries and lists are returned directly
+            return {
+                "type": "collection",
+                "data": result
+            }
+        else:
+            # For other types, convert to string
+            return {
+                "type": "other",
+                "data": str(result)
+            }
+
+        output.update(cls.page_info(0, len(page), len(result)))
+        if output["next_cursor"] is None and not output.get("truncated_columns"):
+            return output
+        if user_id:
+            frame = result if isinstance(result, pd.DataFrame) else result.to_frame()
+            output["execution_id"] = ResultStore.put(user_id, frame)
+        else:
+            output["next_cursor"] = None
+        return output
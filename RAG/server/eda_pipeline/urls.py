@@ -1,9 +1,12 @@
 from django.urls import path
-from .views import CSVFolderProcessView, CSVQueryView, VectorDBContentsView, ResetUserDataView
+from .views import CSVFolderProcessView, CSVProcessingJobView, CSVDescriptionCacheView, CSVQueryView, CSVQueryResultView, VectorDBContentsView, ResetUserDataView
 
 urlpatterns = [
     path('process-csv/', CSVFolderProcessView.as_view(), name='process-csv'),
+    path('process-csv/jobs/<uuid:job_id>/', CSVProcessingJobView.as_view(), name='process-csv-job'),
+    path('process-csv/description-cache/', CSVDescriptionCacheView.as_view(), name='csv-description-cache'),
     path('query/', CSVQueryView.as_view(), name='csv-query'),
+    path('query/results/<uuid:execution_id>/', CSVQueryResultView.as_view(), name='csv-query-result'),
     path('vectordb-contents/', VectorDBContentsView.as_view(), name='vectordb-contents'),
     path('reset-user-data/', ResetUserDataView.as_view(), name='reset-user-data'),
 ]
\ No newline at end of file
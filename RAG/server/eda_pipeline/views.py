@@ -3,163 +3,105 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from django.conf import settings
-import os
-import pandas as pd
 from file_uploader.models import UploadedFile
 from django.db.models import Q
 import numpy as np
 import json
+import re
+import uuid
 
-from .services.eda_csv_service import EdaCsvService
 from .services.eda_groq_service import EdaGroqService
-from .eda_db.eda_vectordb_handeller import EdaVectorDBHandler
+from .services.dataframe_store import DataFrameStore
+from .services.csv_batch_processor import CsvBatchProcessor
+from .services.csv_description_cache import CsvDescriptionCache
+from .services.result_serializer import RESULT_FORMATS, ResultSerializer, ResultStore
+from .models import CsvProcessingJob
+from .serializers import CsvProcessingJobSerializer
+from .eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
 
 
 class CSVFolderProcessView(APIView):
     """
     API endpoint to process CSV files from UploadedFile records and extract metadata and relationships.
+
+    Files are processed by a background CsvProcessingJob; the response holds
+    the job, whose per-file progress can be polled from CSVProcessingJobView.
+    With "wait": true the job runs within the request and the finished job
+    is returned; "refresh_descriptions": true bypasses the description cache.
     """
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
+        scrape_ids = request.data.get('scrape_ids', [])
+        if not scrape_ids:
+            return Response({
+                'error': 'No scrape_ids provided'
+            }, status=status.HTTP_400_BAD_REQUEST)
         try:
-            # Get user and scrape info
-            user_id = request.user.id
-            scrape_ids = request.data.get('scrape_ids', [])
-            force_reindex = request.data.get('force_reindex', False)
-            
-            if not scrape_ids:
+            scrape_ids = [uuid.UUID(str(scrape_id)) for scrape_id in scrape_ids]
+        except ValueError:
+            return Response({'error': 'Invalid scrape_id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        print("\n🔍 Starting CSV processing for vector database")
+        print(f"👤 User ID: {request.user.id}")
+        print(f"📁 Scrape IDs: {scrape_ids}")
+        job = CsvBatchProcessor.create_job(
+            request.user, scrape_ids, refresh_descriptions=bool(request.data.get('refresh_descriptions', False))
+        )
+
+        if request.data.get('wait', False):
+            try:
+                CsvBatchProcessor.run(job)
+            except Exception as e:
+                print(f"❌ Error processing CSV files: {str(e)}")
                 return Response({
-                    'error': 'No scrape_ids provided'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Initialize services
-            csv_service = EdaCsvService()
-            vectordb_handler = EdaVectorDBHandler()
-            groq_service = EdaGroqService()
-            
-            results = []
-            all_csv_paths = []
-            all_csv_metadata = []
-            
-            print("\n🔍 Starting CSV processing for vector database")
-            print(f"👤 User ID: {user_id}")
-            print(f"📁 Scrape IDs: {scrape_ids}")
-            print(f"🔄 Force reindex: {force_reindex}\n")
-            
-            # First, process each scrape_id individually to generate metadata
-            for scrape_id in scrape_ids:
-                print(f"\n==== Processing Scrape ID: {scrape_id} ====")
-                # Find all CSV files for this scrape_id
-                csv_files = UploadedFile.objects.filter(
-                    id=scrape_id,
-                    content_type='text/csv',
-                    user=request.user
-                )
-                
-                if not csv_files.exists():
-                    print(f"❌ No CSV files found for scrape ID: {scrape_id}")
-                    results.append({
-                        'scrape_id': scrape_id,
-                        'error': f'No CSV files found for ID: {scrape_id}'
-                    })
-                    continue
-                
-                # Get actual file paths
-                csv_paths = [file.file.path for file in csv_files]
-                all_csv_paths.extend(csv_paths)
-                print(f"📊 Found {len(csv_paths)} CSV files for scrape ID {scrape_id}")
-                
-                # Process each CSV file
-                processed_files = []
-                for path in csv_paths:
-                    filename = os.path.basename(path)
-                    print(f"\n📄 Processing file: {filename}")
-                    
-                    # Generate metadata
-                    csv_metadata, _ = csv_service.generate_csv_metadata(
-                        path, user_id=user_id, scrape_id=scrape_id
-                    )
-                    
-                    if csv_metadata:
-                        # Generate description using LLM
-                        print(f"🤖 Generating description for {filename}")
-                        csv_metadata = groq_service.generate_csv_description(csv_metadata)
-                        print(f"📝 Description: {csv_metadata.get('description', '')[:100]}...")
-                        
-                        # Store in vector database
-                        print(f"💾 Storing in vector database: {filename}")
-                        docs = vectordb_handler.store_csv_metadata(csv_metadata)
-                        
-                        # Print vector DB storage details
-                        if docs:
-                            print(f"✅ Successfully stored in vector DB:")
-                            print(f"   - CSV Description Document (length: {len(docs[0].page_content)} chars)")
-                            print(f"   - Column Details Document (length: {len(docs[1].page_content)} chars)")
-                            
-                            # Print some metadata details
-                            print(f"   - Metadata fields: {list(csv_metadata.keys())}")
-                            print(f"   - Number of columns: {csv_metadata.get('num_columns', 'unknown')}")
-                            print(f"   - Number of rows: {csv_metadata.get('num_rows', 'unknown')}")
-                        else:
-                            print(f"⚠️ No documents returned from vector DB storage")
-                        
-                        processed_files.append(csv_metadata)
-                        all_csv_metadata.append(csv_metadata)
-                
-                # Add results for this scrape_id
-                results.append({
-                    'scrape_id': scrape_id,
-                    'success': True,
-                    'message': f'Processed {len(processed_files)} CSV files',
-                    'files': [result.get('filename') for result in processed_files if 'filename' in result]
-                })
-            
-            # If we have multiple CSV files, detect relationships
-            if len(all_csv_paths) > 1:
-                print("\n🔗 Detecting relationships between CSV files...")
-                # Detect relationships
-                relationship_graph, potential_joins, _ = csv_service.detect_csv_relationships(all_csv_paths)
-                
-                # Store relationships if found
-                if relationship_graph.edges:
-                    print(f"🔍 Found {len(relationship_graph.edges)} relationships between files")
-                    print(f"📊 Relationship details:")
-                    for (file1, file2), joins in potential_joins.items():
-                        print(f"   - {file1} ↔ {file2}: {len(joins)} join keys")
-                        for col1, col2 in joins:
-                            print(f"     • {col1} = {col2}")
-                    
-                    # Store in vector DB
-                    print("💾 Storing relationships in vector database...")
-                    vectordb_handler.store_csv_relationships(
-                        potential_joins, user_id=user_id, scrape_id=scrape_ids[0]
-                    )
-                    print("✅ Relationships stored successfully")
-                    
-                    # Add relationship information to the response
-                    relationship_info = {
-                        'relationships_found': len(relationship_graph.edges),
-                        'file_pairs': [f"{file1} ↔ {file2}" for file1, file2 in potential_joins.keys()]
-                    }
-                    
-                    results.append({
-                        'relationship_detection': relationship_info
-                    })
-                else:
-                    print("⚠️ No relationships detected between CSV files")
-            
-            print(f"\n✅ Processing complete! Total files processed: {len(all_csv_metadata)}")
-            return Response({
-                'results': results,
-                'total_files_processed': len(all_csv_metadata)
-            })
-            
-        except Exception as e:
-            print(f"❌ Error processing CSV files: {str(e)}")
-            return Response({
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                    'error': str(e)
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            job.refresh_from_db()
+            return Response(CsvProcessingJobSerializer(job).data)
+
+        CsvBatchProcessor.submit(job)
+        return Response(CsvProcessingJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class CSVProcessingJobView(APIView):
+    """Progress and result of a CsvProcessingJob"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, job_id):
+        job = CsvProcessingJob.objects.filter(id=job_id, user=request.user).first()
+        if job is None:
+            return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(CsvProcessingJobSerializer(job).data)
+
+
+class CSVDescriptionCacheView(APIView):
+    """Invalidate the user's cached CSV descriptions, all of them or one fingerprint"""
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request):
+        fingerprint = request.data.get('fingerprint') or request.query_params.get('fingerprint')
+        deleted_count = CsvDescriptionCache.invalidate(request.user.id, fingerprint=fingerprint)
+        print(f"🧹 Invalidated {deleted_count} cached CSV descriptions for user {request.user.id}")
+        return Response({'success': True, 'deleted_count': deleted_count})
+
+def relevant_csv_files(user, result):
+    """Uploaded CSVs of user referenced by a query result, one per frame name"""
+    code = "\n".join(result.get('code_blocks') or [])
+    if isinstance(result.get('code'), str):
+        code += "\n" + result['code']
+    wanted = {DataFrameStore.frame_name(source) for source in result.get('sources') or []}
+
+    by_name = {}
+    csv_files = UploadedFile.objects.filter(user=user, content_type='text/csv').only(
+        'id', 'filename', 'file', 'csv_profile'
+    )
+    for csv_file in csv_files:
+        name = DataFrameStore.frame_name(csv_file.filename)
+        if name in wanted or re.search(rf"\b{re.escape(name)}\b", code):
+            by_name[name] = csv_file
+    return list(by_name.values())
+
 
 class CSVQueryView(APIView):
     """
@@ -169,8 +111,6 @@ class CSVQueryView(APIView):
     
     def post(self, request):
         try:
-            import os
-            import pandas as pd
             import traceback
             from django.conf import settings
             
@@ -182,6 +122,24 @@ class CSVQueryView(APIView):
                     'error': 'No query provided'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
+            # Optional per-block time budget, capped by EDA_CODE_TIMEOUT
+            block_timeout = request.data.get('block_timeout')
+            try:
+                block_timeout = min(float(block_timeout), settings.EDA_CODE_TIMEOUT) if block_timeout else None
+                if block_timeout is not None and block_timeout <= 0:
+                    raise ValueError(block_timeout)
+            except (TypeError, ValueError):
+                return Response({
+                    'error': 'block_timeout must be a number of seconds'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # 'records' (html + records) or 'columnar'; large results are paged
+            result_format = request.data.get('result_format', 'records')
+            if result_format not in RESULT_FORMATS:
+                return Response({
+                    'error': f"result_format must be one of {', '.join(RESULT_FORMATS)}"
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
             # The GroqService creates its own vectordb_handler
             groq_service = EdaGroqService()
             
@@ -191,38 +149,31 @@ class CSVQueryView(APIView):
                 user_id=user_id,
             )
             
-            # Get available dataframes from uploaded files
-            dataframes = {}
-            
-            # Get CSV files for the user
-            csv_files = UploadedFile.objects.filter(
-                user=request.user,
-                content_type='text/csv'
-            )
-            
-            # Load each CSV file
-            for file in csv_files:
-                try:
-                    # Use the filename without extension as DataFrame name
-                    filename = os.path.basename(file.filename)
-                    df_name = os.path.splitext(filename)[0].lower().replace(' ', '_')
-                    
-                    # Read the CSV file
-                    dataframes[df_name] = pd.read_csv(file.file.path)
-                    print(f"Loaded DataFrame '{df_name}' from {file.file.path}")
-                except Exception as e:
-                    print(f"Error loading CSV {file.filename}: {str(e)}")
+            # Only the CSVs the answer uses: the retrieved sources plus any
+            # other upload whose frame name appears in the generated code.
+            # Their Arrow files are loaded by the sandbox workers, not here
+            dataframes = DataFrameStore.frame_sources(relevant_csv_files(request.user, result))
             
             # Check if we have code blocks to execute
             if 'code_blocks' in result and result['code_blocks']:
-                # Execute all code blocks
-                execution_results = groq_service.execute_multiple_code_blocks(result['code_blocks'], dataframes)
+                # Execute all code blocks concurrently; with first_success the
+                # others are stopped once one of them succeeds
+                execution_results = groq_service.execute_multiple_code_blocks(
+                    result['code_blocks'], dataframes, timeout=block_timeout,
+                    first_success=bool(request.data.get('first_success', False)),
+                    user_id=user_id, result_format=result_format
+                )
                 result['executions'] = execution_results
                 
-                # For backward compatibility
+                # For backward compatibility: the first block that produced a result
                 if execution_results:
-                    result['code'] = execution_results[0]['code']
-                    result['result'] = execution_results[0]['result']
+                    primary = next(
+                        (execution for execution in execution_results
+                         if execution['result'].get('type') not in ('error', 'cancelled')),
+                        execution_results[0]
+                    )
+                    result['code'] = primary['code']
+                    result['result'] = primary['result']
             
             # If old format response with single 'code' field
             elif result.get('code') and isinstance(result.get('code'), str) and not isinstance(result.get('result'), dict):
@@ -231,7 +182,9 @@ class CSVQueryView(APIView):
                 
                 # Update the result with the execution output
                 if execution_result.get('success'):
-                    formatted_result = groq_service.format_output_for_display(execution_result['result'])
+                    formatted_result = groq_service.format_output_for_display(
+                        execution_result['result'], user_id=user_id, result_format=result_format
+                    )
                     result['result'] = formatted_result
                     
                     # Add to executions array for new format
@@ -260,6 +213,43 @@ class CSVQueryView(APIView):
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+class CSVQueryResultView(APIView):
+    """
+    Pages of a large query result kept by the ResultStore.
+
+    ?cursor= is the next_cursor of the previous page (0 for the first),
+    ?limit= the page size (at most EDA_RESULT_MAX_PAGE_ROWS), ?columns= an
+    optional comma-separated list of columns and ?format= 'records' or
+    'columnar'.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, execution_id):
+        result_format = request.query_params.get('format', 'records')
+        try:
+            offset = int(request.query_params.get('cursor', 0))
+            limit = int(request.query_params.get('limit', settings.EDA_RESULT_PAGE_ROWS))
+            if offset < 0 or limit <= 0 or result_format not in RESULT_FORMATS:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'Invalid cursor, limit or format'}, status=status.HTTP_400_BAD_REQUEST)
+        columns = request.query_params.get('columns')
+
+        page = ResultStore.get_page(
+            request.user.id, execution_id, offset=offset,
+            limit=min(limit, settings.EDA_RESULT_MAX_PAGE_ROWS),
+            columns=set(columns.split(',')) if columns else None
+        )
+        if page is None:
+            return Response({'error': 'Result not found or expired'}, status=status.HTTP_404_NOT_FOUND)
+        page, total_rows, all_columns = page
+        if not columns:
+            page = page.iloc[:, :settings.EDA_RESULT_MAX_COLUMNS]
+        return Response({
+            'execution_id': str(execution_id),
+            **ResultSerializer.serialize_page(page, offset, total_rows, all_columns, result_format)
+        })
+
 class VectorDBContentsView(APIView):
     """
     API endpoint to retrieve user's contents from the vector database.
@@ -277,7 +267,7 @@ class VectorDBContentsView(APIView):
             filename = request.query_params.get('filename')
             
             # Initialize the vector database handler
-            vectordb_handler = EdaVectorDBHandler()
+            vectordb_handler = EdaVectorDBSingleton.get_instance()
             
             # Build filter conditions
             filter_conditions = []
@@ -353,7 +343,7 @@ class ResetUserDataView(APIView):
             scrape_id = request.data.get('scrape_id', None)
             
             # Initialize the vector database handler
-            vectordb_handler = EdaVectorDBHandler()
+            vectordb_handler = EdaVectorDBSingleton.get_instance()
             
             if scrape_id:
                 # If scrape_id is provided, only delete data for that scrape
@@ -366,6 +356,7 @@ class ResetUserDataView(APIView):
             else:
                 # Delete all user data
                 deleted_count = vectordb_handler.delete_user_data(user_id)
+                CsvDescriptionCache.invalidate(user_id)
                 message = f"Successfully deleted {deleted_count} documents for user ID: {user_id}"
             
             return Response({
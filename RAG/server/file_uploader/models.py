@@ -1,41 +1,56 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 import uuid
 import os
 
 def determine_upload_path(instance, filename):
     """
-    Determine the upload path based on file type.
-    
-    For CSV files: uploads/csv/{instance.id}/{filename}
-    For other files: uploads/{filename}
+    Fallback upload path for files assigned to UploadedFile directly.
+    Uploads normally go through UploadStorage, which stores them
+    content-addressed under uploads/<hash[:2]>/<hash>/{filename}.
     """
-    # For new instances, instance.id might not be set yet
-    # Use a temporary UUID that will be used in post_save to move the file if needed
-    instance_id = str(instance.id) if instance.id else str(uuid.uuid4())
-    
-    # Check if the file is a CSV based on content type or extension
-    is_csv = False
-    if hasattr(instance, 'content_type') and instance.content_type == 'text/csv':
-        is_csv = True
-    elif filename.lower().endswith('.csv'):
-        is_csv = True
-        
-    if is_csv:
-        return os.path.join('uploads', 'csv', instance_id, filename)
     return os.path.join('uploads', filename)
 
 class UploadedFile(models.Model):
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     file = models.FileField(upload_to=determine_upload_path)
     filename = models.CharField(max_length=255)
     content_type = models.CharField(max_length=100)
+    # Legacy inline copy of the extracted text; new uploads use markdown_key
     markdown_content = models.TextField(null=True, blank=True)
+    # Extracted markdown lives compressed in the BlobStore under this key
+    markdown_key = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    markdown_size = models.BigIntegerField(null=True, blank=True)
     file_size = models.BigIntegerField()
     upload_date = models.DateTimeField(auto_now_add=True)
     vector_db_id = models.CharField(max_length=255, null=True, blank=True)
     url = models.URLField(max_length=500, blank=True)
+    # Background processing state. Rows created before the upload pipeline
+    # existed were processed inline, hence the COMPLETED default.
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='COMPLETED')
+    progress = models.PositiveSmallIntegerField(default=100)
+    status_message = models.CharField(max_length=255, blank=True)
+    processing_error = models.TextField(null=True, blank=True)
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    # Last status write or heartbeat of the owning process (worker_id);
+    # PENDING or IN_PROGRESS rows whose heartbeat lapsed are recovered by
+    # UploadPipeline.recover
+    status_updated_at = models.DateTimeField(default=timezone.now)
+    worker_id = models.CharField(max_length=100, blank=True)
+    # Encoding/dialect/header sniffed once for CSVs, see CsvSniffer
+    csv_profile = models.JSONField(null=True, blank=True)
+    # SHA-256 of the file; identical uploads share storage and extraction
+    content_hash = models.CharField(max_length=64, null=True, blank=True, db_index=True)
 
     class Meta:
         ordering = ['-upload_date']
@@ -43,33 +58,73 @@ class UploadedFile(models.Model):
     def __str__(self):
         return f"{self.filename} - {self.user.email}"
 
-    def save(self, *args, **kwargs):
-        # For new instances, save first to get an ID
-        if not self.id:
-            # Set a temporary ID
-            temp_id = str(uuid.uuid4())
-            self.id = temp_id
-            super().save(*args, **kwargs)
-            
-            # If this is a CSV file and was saved with the temporary ID path,
-            # we need to rename the directory to use the actual ID
-            if self.content_type == 'text/csv':
-                old_path = self.file.path
-                # Generate the new path
-                new_dir = os.path.join(settings.MEDIA_ROOT, 'uploads', 'csv', str(self.id))
-                os.makedirs(new_dir, exist_ok=True)
-                new_path = os.path.join(new_dir, self.filename)
-                
-                # If old file exists, move it
-                if os.path.exists(old_path):
-                    import shutil
-                    shutil.move(old_path, new_path)
-                    
-                    # Update the file field
-                    relative_path = os.path.join('uploads', 'csv', str(self.id), self.filename)
-                    self.file.name = relative_path
-                    
-                    # Save again to update the file path
-                    super().save(update_fields=['file'])
-        else:
-            super().save(*args, **kwargs)
\ No newline at end of file
+    def get_markdown(self):
+        """Load the extracted markdown on demand"""
+        if self.markdown_key:
+            from .services.blob_store import BlobStore
+            return BlobStore.get_text(self.markdown_key)
+        return self.markdown_content
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload; chunks are appended to a part file on disk"""
+    STATUS_CHOICES = [
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    total_size = models.BigIntegerField()
+    received_bytes = models.BigIntegerField(default=0)
+    # Optional client-supplied SHA-256, verified on finalize
+    expected_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='IN_PROGRESS')
+    uploaded_file = models.ForeignKey(UploadedFile, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received_bytes}/{self.total_size}) - {self.user.email}"
+
+
+class DeletionTombstone(models.Model):
+    """
+    Cleanup still owed for a deleted UploadedFile.
+
+    The row is deleted together with the creation of its tombstone; vector
+    store and filesystem cleanup then run (and are retried) from here.
+    """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('IN_PROGRESS', 'In Progress'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed')
+    ]
+
+    upload_id = models.UUIDField(db_index=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    storage_name = models.CharField(max_length=500, blank=True)
+    markdown_key = models.CharField(max_length=64, null=True, blank=True)
+    vectors_deleted = models.BooleanField(default=False)
+    files_deleted = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(null=True, blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'next_attempt_at'])]
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
@@ -1,8 +1,40 @@
 from rest_framework import serializers
-from .models import UploadedFile
+from .models import UploadedFile, UploadSession
 
 class FileUploadSerializer(serializers.ModelSerializer):
     class Meta:
         model = UploadedFile
-        fields = '__all__'
-        read_only_fields = ['markdown_content', 'vector_db_id']
\ No newline at end of file
+        # Extracted text is only loaded for a single file (FileDetailSerializer)
+        exclude = ['markdown_content', 'worker_id']
+        read_only_fields = [
+            'vector_db_id', 'status', 'progress', 'status_message',
+            'processing_error', 'batch_id', 'processed_at', 'csv_profile',
+            'content_hash', 'markdown_key', 'markdown_size', 'status_updated_at'
+        ]
+
+class FileDetailSerializer(FileUploadSerializer):
+    """A single file with its extracted text, loaded from the blob store"""
+    markdown_content = serializers.SerializerMethodField()
+
+    def get_markdown_content(self, obj):
+        return obj.get_markdown()
+
+    class Meta(FileUploadSerializer.Meta):
+        exclude = ['worker_id']
+
+class FileStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadedFile
+        fields = [
+            'id', 'filename', 'content_type', 'status', 'progress',
+            'status_message', 'processing_error', 'batch_id', 'processed_at'
+        ]
+        read_only_fields = fields
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = [
+            'id', 'filename', 'content_type', 'total_size', 'received_bytes',
+            'expected_hash', 'status', 'uploaded_file', 'created_at', 'updated_at'
+        ]
+        read_only_fields = ['received_bytes', 'status', 'uploaded_file', 'created_at', 'updated_at']
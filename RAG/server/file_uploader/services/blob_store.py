@@ -0,0 +1,113 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+
+# gzip level for stored blobs; 6 is a good speed/size trade-off for markdown
+BLOB_COMPRESS_LEVEL = int(os.getenv("BLOB_COMPRESS_LEVEL", 6))
+
+
+class BlobWriter:
+    """
+    Incrementally compresses text into a temporary file while hashing it.
+    After close() the blob is stored and key/size describe it.
+    """
+
+    def __init__(self, store):
+        self._store = store
+        self._digest = hashlib.sha256()
+        self._tmp = tempfile.NamedTemporaryFile(dir=store.temp_dir(), delete=False)
+        self._gzip = gzip.GzipFile(fileobj=self._tmp, mode='wb', compresslevel=BLOB_COMPRESS_LEVEL, mtime=0)
+        self.key = None
+        self.size = 0
+
+    def write(self, text):
+        data = text.encode('utf-8')
+        self._digest.update(data)
+        self._gzip.write(data)
+        self.size += len(data)
+
+    def close(self):
+        self._gzip.close()
+        self._tmp.close()
+        self.key = self._digest.hexdigest()
+        self._store.commit(self._tmp.name, self.key)
+
+    def discard(self):
+        self._gzip.close()
+        self._tmp.close()
+        os.remove(self._tmp.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+class BlobStore:
+    """
+    Compressed, content-addressed file store for large extracted text.
+
+    Blobs live under media/blobs/<key[:2]>/<key>.gz where key is the SHA-256
+    of the uncompressed UTF-8 text, so identical content is stored once.
+    Database rows only keep the key and size and load the text on demand.
+    """
+    ROOT = 'blobs'
+
+    @staticmethod
+    def root():
+        return os.path.join(settings.MEDIA_ROOT, BlobStore.ROOT)
+
+    @staticmethod
+    def temp_dir():
+        path = os.path.join(BlobStore.root(), 'tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def path(key):
+        return os.path.join(BlobStore.root(), key[:2], f"{key}.gz")
+
+    @staticmethod
+    def commit(tmp_path, key):
+        path = BlobStore.path(key)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def writer():
+        """Context manager for writing a blob piece by piece"""
+        return BlobWriter(BlobStore)
+
+    @staticmethod
+    def put_text(text):
+        """Store text and return (key, size in bytes)"""
+        with BlobStore.writer() as writer:
+            writer.write(text)
+        return writer.key, writer.size
+
+    @staticmethod
+    def open_text(key):
+        """Open a stored blob for streaming reads"""
+        return gzip.open(BlobStore.path(key), 'rt', encoding='utf-8')
+
+    @staticmethod
+    def get_text(key):
+        with BlobStore.open_text(key) as blob:
+            return blob.read()
+
+    @staticmethod
+    def delete(key):
+        try:
+            os.remove(BlobStore.path(key))
+            return True
+        except FileNotFoundError:
+            return False
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import threading
+from django.conf import settings
+from django.db import transaction
+from ..models import UploadSession
+from .file_handler import FileHandler
+from .upload_pipeline import UploadPipeline
+from .upload_storage import UploadStorage
+
+# Bytes copied from the request body to disk per read
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+
+class ChunkedUploadError(Exception):
+    """The chunked upload request cannot be applied to the session"""
+
+
+class ChunkOffsetMismatch(ChunkedUploadError):
+    """A chunk did not start where the previous one ended; the client should resume"""
+
+    def __init__(self, expected_offset):
+        super().__init__(f"Expected chunk at offset {expected_offset}")
+        self.expected_offset = expected_offset
+
+
+class ChunkedUploadService:
+    """
+    Resumable init / append chunk / finalize uploads.
+
+    Chunks are streamed from the request body straight into a part file in
+    fixed-size blocks, so memory per upload stays constant whatever the file
+    size. The SHA-256 is updated as chunks arrive; if a chunk lands on a
+    different worker process the hash is recomputed from disk on finalize.
+    """
+    # session id -> (sha256 object, bytes hashed so far)
+    _hashers = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def part_path(session):
+        return os.path.join(UploadStorage.temp_dir(), f"{session.id}.part")
+
+    @classmethod
+    def start(cls, user, filename, content_type, total_size, expected_hash=''):
+        if total_size < 0:
+            raise ChunkedUploadError("total_size must not be negative")
+        if total_size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise ChunkedUploadError(f"Files are limited to {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes")
+
+        session = UploadSession.objects.create(
+            user=user,
+            filename=os.path.basename(filename),
+            content_type=content_type,
+            total_size=total_size,
+            expected_hash=(expected_hash or '').lower()
+        )
+        open(cls.part_path(session), 'wb').close()
+        with cls._lock:
+            cls._hashers[session.id] = (hashlib.sha256(), 0)
+        return session
+
+    @classmethod
+    def append(cls, session, offset, stream, length):
+        """Append length bytes read from stream at offset; returns the new received_bytes"""
+        if length > settings.CHUNKED_UPLOAD_MAX_CHUNK:
+            raise ChunkedUploadError(f"Chunks are limited to {settings.CHUNKED_UPLOAD_MAX_CHUNK} bytes")
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status != 'IN_PROGRESS':
+                raise ChunkedUploadError(f"Upload session is {session.status.lower()}")
+            if offset != session.received_bytes:
+                raise ChunkOffsetMismatch(session.received_bytes)
+            if session.received_bytes + length > session.total_size:
+                raise ChunkedUploadError("Chunk extends past the declared total_size")
+
+            with cls._lock:
+                hasher, hashed_bytes = cls._hashers.get(session.id, (None, 0))
+            # Hash incrementally only while this process has seen every byte;
+            # work on a copy so a failed chunk leaves the stored state intact
+            hasher = hasher.copy() if hasher is not None and hashed_bytes == offset else None
+
+            written = 0
+            with open(cls.part_path(session), 'r+b') as part_file:
+                part_file.seek(offset)
+                # Drop bytes left behind by an interrupted earlier attempt
+                part_file.truncate()
+                while written < length:
+                    block = stream.read(min(STREAM_BLOCK_SIZE, length - written))
+                    if not block:
+                        break
+                    part_file.write(block)
+                    if hasher is not None:
+                        hasher.update(block)
+                    written += len(block)
+
+            if written != length:
+                raise ChunkedUploadError(f"Chunk ended after {written} of {length} bytes")
+
+            with cls._lock:
+                if hasher is not None:
+                    cls._hashers[session.id] = (hasher, offset + written)
+                else:
+                    cls._hashers.pop(session.id, None)
+
+            session.received_bytes = offset + written
+            session.save(update_fields=['received_bytes', 'updated_at'])
+        return session.received_bytes
+
+    @classmethod
+    def _content_hash(cls, session, path):
+        with cls._lock:
+            hasher, hashed_bytes = cls._hashers.pop(session.id, (None, 0))
+        if hasher is not None and hashed_bytes == session.total_size:
+            return hasher.hexdigest()
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as part_file:
+            for block in iter(lambda: part_file.read(STREAM_BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @classmethod
+    def finalize(cls, session, batch_id=None):
+        """Move the assembled file into UploadStorage and queue it for processing"""
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.status == 'COMPLETED':
+                return session.uploaded_file
+            if session.status != 'IN_PROGRESS':
+                raise ChunkedUploadError(f"Upload session is {session.status.lower()}")
+            if session.received_bytes != session.total_size:
+                raise ChunkOffsetMismatch(session.received_bytes)
+
+            path = cls.part_path(session)
+            content_hash = cls._content_hash(session, path)
+            checksum_ok = not session.expected_hash or session.expected_hash == content_hash
+            if checksum_ok:
+                uploaded_file = cls._store(session, path, content_hash, batch_id)
+
+        if not checksum_ok:
+            cls.abort(session)
+            raise ChunkedUploadError("Checksum mismatch, the upload has been discarded")
+
+        print(f"✅ Assembled chunked upload '{session.filename}' ({session.total_size} bytes)")
+        return uploaded_file
+
+    @staticmethod
+    def _store(session, path, content_hash, batch_id):
+        storage_name = UploadStorage.store_hashed(path, content_hash, session.filename)
+        uploaded_file = FileHandler.create_stored_upload(
+            storage_name, content_hash, session.total_size,
+            session.filename, session.content_type, session.user, batch_id
+        )
+        session.status = 'COMPLETED'
+        session.uploaded_file = uploaded_file
+        session.save(update_fields=['status', 'uploaded_file', 'updated_at'])
+        UploadPipeline.submit(uploaded_file.id)
+        return uploaded_file
+
+    @classmethod
+    def abort(cls, session):
+        """Discard a session and its part file"""
+        with cls._lock:
+            cls._hashers.pop(session.id, None)
+        try:
+            os.remove(cls.part_path(session))
+        except FileNotFoundError:
+            pass
+        UploadSession.objects.filter(pk=session.pk).update(status='FAILED')
+        session.status = 'FAILED'
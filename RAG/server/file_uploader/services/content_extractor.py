@@ -1,11 +1,62 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from .markdown_converter import (
     extract_markdown_from_pdf,
     extract_markdown_from_docx,
     extract_markdown_from_xlsx,
     extract_markdown_from_image,
-    extract_markdown_from_csv
+    extract_markdown_from_csv,
+    extract_text_from_plain,
+    iter_markdown_from_xlsx,
+    count_pdf_pages,
+    extract_pdf_page_range
 )
 
+# Pages converted per isolated worker task when streaming a PDF
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 8))
+
+
+def iter_markdown_from_pdf(file_path):
+    """
+    Convert a PDF range by range in parallel isolated workers.
+
+    Yields (markdown, {"page": n}) per page in document order as soon as the
+    range containing it is converted, so indexing can start before the last
+    page is done. A failed or timed-out range raises ExtractionError naming
+    its pages.
+    """
+    from .extraction_engine import ExtractionEngine, ExtractionError
+    engine = ExtractionEngine.get_instance()
+
+    page_count = engine.run(count_pdf_pages, file_path, kind='pdf')
+    page_ranges = [
+        list(range(start, min(start + PDF_PAGES_PER_TASK, page_count)))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    ]
+    print(f"Converting {page_count} PDF pages in {len(page_ranges)} parallel tasks")
+
+    with ThreadPoolExecutor(max_workers=engine.max_workers) as executor:
+        futures = [
+            executor.submit(engine.run, extract_pdf_page_range, file_path, page_numbers, kind='pdf')
+            for page_numbers in page_ranges
+        ]
+        try:
+            for page_numbers, future in zip(page_ranges, futures):
+                try:
+                    pages = future.result()
+                except ExtractionError as e:
+                    # Fail the whole document rather than index it with pages missing
+                    raise ExtractionError(
+                        f"PDF pages {page_numbers[0] + 1}-{page_numbers[-1] + 1} failed: {e}"
+                    ) from e
+                for page_number, text in pages:
+                    if text.strip():
+                        yield text.rstrip() + "\n\n", {"page": page_number}
+        finally:
+            # Stop queued ranges if the consumer gives up early
+            for future in futures:
+                future.cancel()
+
 class ContentExtractor:
     EXTRACTORS = {
         'application/pdf': extract_markdown_from_pdf,
@@ -14,13 +65,46 @@ class ContentExtractor:
         'text/csv': extract_markdown_from_csv,
         'image/png': extract_markdown_from_image,
         'image/jpeg': extract_markdown_from_image,
-        'application/octet-stream': lambda file_path: open(file_path).read()
+        'application/octet-stream': extract_text_from_plain
+    }
+
+    # Extractors that yield (markdown, chunk_metadata) pairs instead of one string
+    STREAMING_EXTRACTORS = {
+        'application/pdf': iter_markdown_from_pdf,
+        'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': iter_markdown_from_xlsx,
     }
 
     @classmethod
-    def extract_content(cls, file_path, content_type):
+    def extract_content(cls, file_path, content_type, **options):
         print(f"Extracting content from {content_type}")
         extractor = cls.EXTRACTORS.get(content_type)
         if extractor:
-            return extractor(file_path)
-        return None
\ No newline at end of file
+            return extractor(file_path, **options)
+        return None
+
+    # OCR already runs tesseract as a subprocess with its own timeout and a
+    # bounded pool (see OcrService), so images skip the process engine
+    IN_PROCESS_TYPES = {'image/png', 'image/jpeg'}
+
+    @classmethod
+    def extract_isolated(cls, file_path, content_type, timeout=None, **options):
+        """Extract in a separate worker process with a timeout"""
+        if content_type not in cls.EXTRACTORS:
+            return None
+        if content_type in cls.IN_PROCESS_TYPES:
+            return cls.extract_content(file_path, content_type, **options)
+        from .extraction_engine import ExtractionEngine
+        return ExtractionEngine.get_instance().extract(
+            file_path, content_type, timeout=timeout, **options
+        )
+
+    @classmethod
+    def extract_many(cls, items, timeout=None):
+        """Extract a batch of (file_path, content_type) pairs in parallel workers"""
+        from .extraction_engine import ExtractionEngine
+        return ExtractionEngine.get_instance().extract_many(items, timeout=timeout)
+
+
+def extract_in_worker(file_path, content_type, **options):
+    """Top-level entry point so extraction can be pickled into a worker process"""
+    return ContentExtractor.extract_content(file_path, content_type, **options)
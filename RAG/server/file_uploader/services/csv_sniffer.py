@@ -0,0 +1,138 @@
+import codecs
+import csv
+import io
+import itertools
+import os
+from dataclasses import dataclass, asdict, field
+from typing import List
+from charset_normalizer import from_bytes
+
+# Bytes read from the start of a CSV to detect its encoding, dialect and header
+CSV_SNIFF_SAMPLE_BYTES = int(os.getenv("CSV_SNIFF_SAMPLE_BYTES", 64 * 1024))
+
+
+@dataclass
+class CsvProfile:
+    """Encoding, dialect and header information for a CSV file"""
+    encoding: str = 'utf-8'
+    delimiter: str = ','
+    quotechar: str = '"'
+    has_header: bool = True
+    columns: List[str] = field(default_factory=list)
+
+    def to_dict(self):
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: value for key, value in data.items() if key in cls.__dataclass_fields__})
+
+    def reader_kwargs(self):
+        """Keyword arguments for csv.reader"""
+        return {'delimiter': self.delimiter, 'quotechar': self.quotechar}
+
+    def pandas_kwargs(self):
+        """Keyword arguments for pandas.read_csv"""
+        return {
+            'encoding': self.encoding,
+            'encoding_errors': 'replace',
+            'sep': self.delimiter,
+            'quotechar': self.quotechar,
+            'header': 0 if self.has_header else None,
+        }
+
+
+class CsvSniffer:
+    """
+    Detects CSV encoding, dialect and header from a bounded byte sample so
+    large files never need a full scan before they can be previewed or read.
+    """
+
+    @staticmethod
+    def sniff(file_path, sample_bytes=None):
+        sample_bytes = sample_bytes or CSV_SNIFF_SAMPLE_BYTES
+        with open(file_path, 'rb') as csv_file:
+            sample = csv_file.read(sample_bytes)
+            truncated = bool(csv_file.read(1))
+
+        # Drop the trailing partial line so we never split a multi-byte char
+        if truncated and b'\n' in sample:
+            sample = sample[:sample.rindex(b'\n') + 1]
+
+        if not sample:
+            return CsvProfile()
+
+        result = from_bytes(sample).best()
+        encoding = result.encoding if result else 'utf-8'
+        # An ASCII-only sample says nothing about the rest of the file
+        if encoding == 'ascii':
+            encoding = 'utf-8'
+        # Strip the BOM instead of leaking it into the first column name
+        if sample.startswith(codecs.BOM_UTF8):
+            encoding = 'utf-8-sig'
+
+        text = sample.decode(encoding, errors='replace')
+        sniffer = csv.Sniffer()
+        try:
+            dialect = sniffer.sniff(text, delimiters=',;\t|')
+            delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+        except csv.Error:
+            delimiter, quotechar = ',', '"'
+
+        rows = list(itertools.islice(csv.reader(io.StringIO(text), delimiter=delimiter, quotechar=quotechar), 50))
+        first_row = rows[0] if rows else []
+        has_header = CsvSniffer._has_header(rows)
+        columns = first_row if has_header else [str(i) for i in range(len(first_row))]
+
+        return CsvProfile(
+            encoding=encoding,
+            delimiter=delimiter,
+            quotechar=quotechar,
+            has_header=has_header,
+            columns=columns
+        )
+
+    @staticmethod
+    def _is_number(value):
+        try:
+            float(value)
+        except ValueError:
+            return False
+        return True
+
+    @classmethod
+    def _has_header(cls, rows):
+        """
+        Assume a header row unless the first row is numeric in every column
+        that is numeric in all of the following rows (and there is at least
+        one such column). csv.Sniffer.has_header rejects all-text headers.
+        """
+        first_row, data_rows = (rows[0], rows[1:]) if rows else ([], [])
+        numeric_columns = [
+            i for i in range(len(first_row))
+            if data_rows and all(i < len(row) and cls._is_number(row[i]) for row in data_rows)
+        ]
+        if not numeric_columns:
+            return True
+        return not all(cls._is_number(first_row[i]) for i in numeric_columns)
+
+    @classmethod
+    def for_uploaded_file(cls, uploaded_file):
+        """Return the cached profile of an UploadedFile, sniffing and storing it if needed"""
+        if uploaded_file.csv_profile:
+            return CsvProfile.from_dict(uploaded_file.csv_profile)
+
+        profile = cls.sniff(uploaded_file.file.path)
+        uploaded_file.csv_profile = profile.to_dict()
+        type(uploaded_file).objects.filter(pk=uploaded_file.pk).update(csv_profile=uploaded_file.csv_profile)
+        print(f"Detected CSV profile for {uploaded_file.filename}: {profile.encoding}, delimiter {profile.delimiter!r}")
+        return profile
+
+    @staticmethod
+    def iter_rows(file_path, profile, limit=None):
+        """Stream parsed rows (header included) without reading the whole file"""
+        with open(file_path, 'r', newline='', encoding=profile.encoding, errors='replace') as csv_file:
+            for i, row in enumerate(csv.reader(csv_file, **profile.reader_kwargs())):
+                if limit is not None and i >= limit:
+                    break
+                yield row
@@ -0,0 +1,170 @@
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+
+
+class ExtractionError(Exception):
+    """Raised when an isolated extraction does not produce a result"""
+
+
+class ExtractionTimeout(ExtractionError):
+    """The extraction exceeded its time budget and the worker was killed"""
+
+
+class ExtractionCrashed(ExtractionError):
+    """The worker process died without returning a result"""
+
+
+# Extractors sharing a library/resource share a concurrency limit
+KIND_BY_CONTENT_TYPE = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'text/csv': 'csv',
+    'application/octet-stream': 'text',
+}
+
+
+def _run_in_child(conn, func, args, kwargs):
+    """Entry point of a worker process: run func and send back (ok, payload)"""
+    try:
+        conn.send((True, func(*args, **kwargs)))
+    except BaseException as e:
+        conn.send((False, f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+@dataclass
+class ExtractionBatchResult:
+    """Outcome of ExtractionEngine.extract_many"""
+    results: Dict[str, Optional[str]] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def files_per_second(self):
+        total = len(self.results) + len(self.errors)
+        return total / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class ExtractionEngine:
+    """
+    Runs CPU-heavy extractors in separate worker processes.
+
+    Every task gets its own short-lived process (forked from a preloaded
+    forkserver where available), so a pathological document can be killed
+    on timeout and a crash in a native library cannot take down the web
+    worker. Concurrency is bounded globally and per extractor kind.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, max_workers, type_limits=None, timeout=None):
+        methods = multiprocessing.get_all_start_methods()
+        start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+        self._ctx = multiprocessing.get_context(start_method)
+        if start_method == 'forkserver':
+            self._ctx.set_forkserver_preload(['file_uploader.services.markdown_converter'])
+
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._kind_slots = {
+            kind: threading.BoundedSemaphore(limit)
+            for kind, limit in (type_limits or {}).items()
+        }
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(
+                        max_workers=settings.EXTRACTION_WORKERS,
+                        type_limits=settings.EXTRACTION_CONCURRENCY,
+                        timeout=settings.EXTRACTION_TIMEOUT
+                    )
+        return cls._instance
+
+    def run(self, func, *args, kind=None, timeout=None, **kwargs):
+        """Run a picklable top-level function in an isolated worker process"""
+        timeout = timeout or self.timeout
+        kind_slot = self._kind_slots.get(kind)
+
+        if kind_slot:
+            kind_slot.acquire()
+        self._slots.acquire()
+        try:
+            return self._run_process(func, args, kwargs, timeout)
+        finally:
+            self._slots.release()
+            if kind_slot:
+                kind_slot.release()
+
+    def _run_process(self, func, args, kwargs, timeout):
+        parent_conn, child_conn = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_run_in_child,
+            args=(child_conn, func, args, kwargs),
+            daemon=True
+        )
+        process.start()
+        # Close our copy so a dying child shows up as EOF on the pipe
+        child_conn.close()
+
+        try:
+            if not parent_conn.poll(timeout):
+                process.kill()
+                raise ExtractionTimeout(f"Extraction exceeded {timeout}s")
+            try:
+                ok, payload = parent_conn.recv()
+            except EOFError:
+                process.join(5)
+                raise ExtractionCrashed(f"Worker exited with code {process.exitcode}")
+        finally:
+            parent_conn.close()
+            process.join(5)
+            if process.is_alive():
+                process.kill()
+
+        if not ok:
+            raise ExtractionError(payload)
+        return payload
+
+    def extract(self, file_path, content_type, timeout=None, **options):
+        """Extract markdown from one file in an isolated worker"""
+        from .content_extractor import extract_in_worker
+        return self.run(
+            extract_in_worker, file_path, content_type,
+            kind=KIND_BY_CONTENT_TYPE.get(content_type), timeout=timeout, **options
+        )
+
+    def extract_many(self, items: List[Tuple[str, str]], timeout=None):
+        """
+        Extract a batch of (file_path, content_type) pairs in parallel.
+        Failures are collected per file instead of aborting the batch.
+        """
+        from .content_extractor import ContentExtractor
+        batch = ExtractionBatchResult()
+        start_time = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(ContentExtractor.extract_isolated, file_path, content_type, timeout): file_path
+                for file_path, content_type in items
+            }
+            for future, file_path in futures.items():
+                try:
+                    batch.results[file_path] = future.result()
+                except Exception as e:
+                    batch.errors[file_path] = str(e)
+
+        batch.elapsed = time.time() - start_time
+        print(f"📊 Extracted {len(items)} files in {batch.elapsed:.2f}s "
+              f"({batch.files_per_second:.2f} files/s, {len(batch.errors)} failed)")
+        return batch
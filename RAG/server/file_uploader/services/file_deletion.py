@@ -0,0 +1,242 @@
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import chromadb
+import chromadb.errors
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from eda_pipeline.services.csv_catalog import CsvCatalog
+from ..models import UploadedFile, DeletionTombstone
+from .blob_store import BlobStore
+from .upload_storage import UploadStorage
+
+# Raised by chromadb when a store has no collection yet (varies by version)
+_MISSING_COLLECTION_ERRORS = tuple({
+    ValueError,
+    getattr(chromadb.errors, 'InvalidCollectionException', ValueError),
+    getattr(chromadb.errors, 'NotFoundError', ValueError),
+})
+
+
+class VectorStorePurger:
+    """
+    Deletes chunks by scrape_id directly through chromadb.
+
+    Deleting by metadata never needs embeddings, so unlike the LangChain
+    handlers this does not load a sentence-transformers model.
+    """
+    COLLECTION_NAME = 'langchain'  # LangChain's default Chroma collection
+
+    def __init__(self, persist_directory):
+        self.persist_directory = persist_directory
+
+    def _collection(self):
+        if not os.path.isdir(self.persist_directory):
+            return None
+        client = chromadb.PersistentClient(path=self.persist_directory)
+        try:
+            return client.get_collection(self.COLLECTION_NAME, embedding_function=None)
+        except _MISSING_COLLECTION_ERRORS:
+            return None
+
+    def delete_scrape_ids(self, scrape_ids, batch_size=None):
+        """Remove every chunk of the given scrape_ids using batched $in filters"""
+        collection = self._collection()
+        if collection is None or not scrape_ids:
+            return
+        batch_size = batch_size or settings.FILE_DELETION_BATCH_SIZE
+        for start in range(0, len(scrape_ids), batch_size):
+            collection.delete(where={"scrape_id": {"$in": scrape_ids[start:start + batch_size]}})
+
+
+class FileDeletionService:
+    """
+    Deletes uploads in bulk.
+
+    Rows are replaced by DeletionTombstones in one transaction, so the API
+    is consistent immediately. Vector chunks of all files are then purged
+    with one batched pass per store, and files on disk are removed by a
+    background worker. Any step that fails stays on the tombstone and is
+    retried with backoff.
+    """
+    _executor = None
+    _retry_thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='file-deletion')
+        cls.start_retry_loop()
+        return cls._executor
+
+    @classmethod
+    def start_retry_loop(cls):
+        """
+        Start the background thread that retries due tombstones. Serving
+        processes call this at startup, so tombstones left by a crashed or
+        restarted process are retried without waiting for a new delete.
+        """
+        if cls._retry_thread is None:
+            with cls._lock:
+                if cls._retry_thread is None:
+                    cls._retry_thread = threading.Thread(
+                        target=cls._retry_loop, name='file-deletion-retry', daemon=True
+                    )
+                    cls._retry_thread.start()
+
+    @staticmethod
+    def vector_stores():
+        return [
+            VectorStorePurger(settings.VECTOR_DB_DIRECTORY),
+            VectorStorePurger(settings.EDA_VECTOR_DB_DIRECTORY),
+        ]
+
+    @classmethod
+    def delete_files(cls, user, file_ids):
+        """Delete the given uploads of user; returns the ids that were deleted"""
+        retry_at = timezone.now() + timedelta(seconds=settings.FILE_DELETION_RETRY_INTERVAL)
+        with transaction.atomic():
+            uploads = list(
+                UploadedFile.objects.select_for_update()
+                .filter(user=user, id__in=file_ids)
+                .only('id', 'user_id', 'filename', 'content_type', 'file', 'markdown_key')
+            )
+            tombstones = DeletionTombstone.objects.bulk_create([
+                DeletionTombstone(
+                    upload_id=upload.id,
+                    user_id=upload.user_id,
+                    filename=upload.filename,
+                    content_type=upload.content_type,
+                    storage_name=upload.file.name or '',
+                    markdown_key=upload.markdown_key,
+                    next_attempt_at=retry_at
+                )
+                for upload in uploads
+            ])
+            UploadedFile.objects.filter(id__in=[upload.id for upload in uploads]).delete()
+
+        if tombstones:
+            print(f"🗑️ Deleted {len(tombstones)} file records, cleaning up stores")
+            cls.purge_vectors(tombstones)
+            upload_ids = [tombstone.upload_id for tombstone in tombstones]
+            CsvCatalog.invalidate(user.id, scrape_ids=upload_ids)
+            cls.get_executor().submit(cls._cleanup_files, upload_ids)
+        return [upload.id for upload in uploads]
+
+    @classmethod
+    def purge_vectors(cls, tombstones):
+        """Delete the chunks of all tombstoned uploads in one pass over each store"""
+        pending = [tombstone for tombstone in tombstones if not tombstone.vectors_deleted]
+        if not pending:
+            return True
+
+        scrape_ids = [str(tombstone.upload_id) for tombstone in pending]
+        start_time = time.time()
+        try:
+            for store in cls.vector_stores():
+                store.delete_scrape_ids(scrape_ids)
+        except Exception as e:
+            print(f"⚠️ Vector cleanup for {len(pending)} deleted files failed: {str(e)}")
+            cls._record_failure(pending, e)
+            return False
+
+        DeletionTombstone.objects.filter(pk__in=[tombstone.pk for tombstone in pending]).update(vectors_deleted=True)
+        for tombstone in pending:
+            tombstone.vectors_deleted = True
+        print(f"✅ Removed vectors of {len(pending)} files in {time.time() - start_time:.2f}s")
+        return True
+
+    @staticmethod
+    def _remove_files(tombstone):
+        upload_id = str(tombstone.upload_id)
+        # Stored file and markdown blob may be shared with identical uploads
+        UploadStorage.release(tombstone.storage_name)
+        if tombstone.markdown_key and not UploadedFile.objects.filter(markdown_key=tombstone.markdown_key).exists():
+            BlobStore.delete(tombstone.markdown_key)
+
+        # Derived data, plus the per-file CSV folder used by older uploads
+        for folder in (
+            os.path.join(settings.MEDIA_ROOT, 'processed', upload_id),
+            os.path.join(settings.MEDIA_ROOT, 'uploads', 'csv', upload_id),
+        ):
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+
+    @classmethod
+    def _cleanup_files(cls, upload_ids):
+        close_old_connections()
+        try:
+            for tombstone in DeletionTombstone.objects.filter(upload_id__in=upload_ids).exclude(status='COMPLETED'):
+                cls._finish(tombstone)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def _finish(cls, tombstone):
+        """Remove the files of a tombstone and complete it once every step is done"""
+        if not tombstone.files_deleted:
+            try:
+                cls._remove_files(tombstone)
+            except Exception as e:
+                print(f"⚠️ File cleanup for '{tombstone.filename}' failed: {str(e)}")
+                cls._record_failure([tombstone], e)
+                return
+            tombstone.files_deleted = True
+            DeletionTombstone.objects.filter(pk=tombstone.pk).update(files_deleted=True)
+
+        if tombstone.vectors_deleted:
+            DeletionTombstone.objects.filter(pk=tombstone.pk).update(
+                status='COMPLETED', last_error=None, next_attempt_at=None
+            )
+
+    @staticmethod
+    def _record_failure(tombstones, error):
+        now = timezone.now()
+        for tombstone in tombstones:
+            tombstone.attempts += 1
+            backoff = settings.FILE_DELETION_RETRY_INTERVAL * 2 ** min(tombstone.attempts - 1, 6)
+            DeletionTombstone.objects.filter(pk=tombstone.pk).update(
+                status='FAILED',
+                attempts=tombstone.attempts,
+                last_error=str(error),
+                next_attempt_at=now + timedelta(seconds=backoff)
+            )
+
+    @classmethod
+    def retry_due(cls):
+        """Retry cleanup of tombstones whose next attempt is due"""
+        due = list(
+            DeletionTombstone.objects
+            .filter(
+                status__in=['PENDING', 'FAILED'],
+                attempts__lt=settings.FILE_DELETION_MAX_ATTEMPTS,
+                next_attempt_at__lte=timezone.now()
+            )
+            .order_by('next_attempt_at')[:settings.FILE_DELETION_BATCH_SIZE]
+        )
+        if not due:
+            return 0
+        print(f"🔁 Retrying cleanup of {len(due)} deleted files")
+        cls.purge_vectors(due)
+        for tombstone in due:
+            cls._finish(tombstone)
+        return len(due)
+
+    @classmethod
+    def _retry_loop(cls):
+        while True:
+            time.sleep(settings.FILE_DELETION_RETRY_INTERVAL)
+            close_old_connections()
+            try:
+                cls.retry_due()
+            except Exception as e:
+                print(f"❌ Deletion retry pass failed: {str(e)}")
+            finally:
+                close_old_connections()
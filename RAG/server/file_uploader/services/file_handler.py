@@ -1,74 +1,280 @@
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
 from ..models import UploadedFile
 from .content_extractor import ContentExtractor
+from .csv_sniffer import CsvSniffer
+from .upload_storage import UploadStorage
+from .blob_store import BlobStore
 from vectordb import vector_db
+from vectordb.chunking import source_type_for
 from eda_pipeline.services.eda_csv_service import EdaCsvService
+from eda_pipeline.services.dataframe_store import DataFrameStore
+from eda_pipeline.services.relationship_graph import RelationshipGraph
 
 class FileHandler:
     @staticmethod
     def handle_uploaded_file(file, content_type, user):
+        """Save an upload and process it inline (extraction + indexing)"""
+        uploaded_file = FileHandler.create_upload(file, content_type, user)
+        FileHandler.process_uploaded_file(uploaded_file.id)
+        uploaded_file.refresh_from_db()
+        return uploaded_file
+
+    @staticmethod
+    def create_upload(file, content_type, user, batch_id=None):
+        """
+        Persist the uploaded file and its database record without processing it.
+        The returned record is PENDING until process_uploaded_file runs.
+        """
+        try:
+            storage_name, content_hash, file_size = UploadStorage.store(file)
+            return FileHandler.create_stored_upload(
+                storage_name, content_hash, file_size, file.name, content_type, user, batch_id
+            )
+        except Exception as e:
+            print(f"Error saving uploaded file: {str(e)}")
+            raise
+
+    @staticmethod
+    def create_stored_upload(storage_name, content_hash, file_size, filename, content_type, user, batch_id=None):
+        """Create the PENDING record for a file already placed in UploadStorage"""
+        return UploadedFile.objects.create(
+            user=user,
+            file=storage_name,
+            filename=filename,
+            content_type=content_type,
+            file_size=file_size,
+            content_hash=content_hash,
+            status='PENDING',
+            progress=0,
+            status_message='Queued for processing',
+            batch_id=batch_id
+        )
+
+    @staticmethod
+    def _update_status(uploaded_file, **fields):
+        """Write status fields without touching the rest of the row"""
+        fields.setdefault('status_updated_at', timezone.now())
+        for name, value in fields.items():
+            setattr(uploaded_file, name, value)
+        UploadedFile.objects.filter(pk=uploaded_file.pk).update(**fields)
+
+    @staticmethod
+    def _store_markdown(uploaded_file, markdown_content, **fields):
+        """Put extracted markdown in the BlobStore and reference it from the row"""
+        markdown_key, markdown_size = BlobStore.put_text(markdown_content)
+        FileHandler._update_status(
+            uploaded_file, markdown_key=markdown_key, markdown_size=markdown_size, **fields
+        )
+
+    @staticmethod
+    def _stream_to_vectordb(uploaded_file, extractor):
+        """
+        Feed extractor chunks straight into the vector store as they are
+        produced, compressing a copy into the BlobStore on the way.
+        Returns True if any content was extracted. On failure the partial
+        chunks and blob are dropped and the error is raised.
+        """
+        FileHandler._update_status(
+            uploaded_file, progress=20, status_message='Extracting and indexing content'
+        )
+
+        with BlobStore.writer() as writer:
+            def sections():
+                for chunk, chunk_metadata in extractor(uploaded_file.file.path):
+                    writer.write(chunk)
+                    yield chunk, chunk_metadata
+
+            try:
+                vector_db.process_markdown_stream(
+                    sections(),
+                    url="",
+                    scrape_id=str(uploaded_file.id),
+                    user_id=uploaded_file.user_id,
+                    source_type=source_type_for(uploaded_file.content_type)
+                )
+            except Exception:
+                # Don't leave a partial index behind; the blob is discarded on exit
+                vector_db.delete_embeddings(str(uploaded_file.id))
+                raise
+
+        if not writer.size:
+            return False
+        FileHandler._update_status(
+            uploaded_file, markdown_key=writer.key, markdown_size=writer.size, progress=60
+        )
+        return True
+
+    @staticmethod
+    def _find_processed_duplicate(uploaded_file):
+        """An earlier, successfully processed upload with identical content"""
+        if not uploaded_file.content_hash:
+            return None
+        return (
+            UploadedFile.objects
+            .filter(
+                Q(markdown_key__isnull=False) | Q(markdown_content__isnull=False),
+                content_hash=uploaded_file.content_hash,
+                content_type=uploaded_file.content_type,
+                status='COMPLETED'
+            )
+            .exclude(pk=uploaded_file.pk)
+            .order_by('processed_at')
+            .first()
+        )
+
+    @staticmethod
+    def _reuse_duplicate(uploaded_file, source):
+        """
+        Take over the extraction of an identical upload: reference its
+        markdown blob, copy its CSV profile and clone its stored chunks
+        without re-embedding them.
+        """
+        if source.markdown_key:
+            FileHandler._update_status(
+                uploaded_file, markdown_key=source.markdown_key, markdown_size=source.markdown_size,
+                csv_profile=source.csv_profile, progress=40, status_message='Reusing existing extraction'
+            )
+        else:
+            FileHandler._store_markdown(
+                uploaded_file, source.markdown_content,
+                csv_profile=source.csv_profile, progress=40, status_message='Reusing existing extraction'
+            )
+
+        reused_chunks = vector_db.clone_embeddings(
+            str(source.id), str(uploaded_file.id), uploaded_file.user_id
+        )
+        if not reused_chunks:
+            vector_db.process_markdown(
+                markdown_content=source.get_markdown(),
+                url="",
+                scrape_id=str(uploaded_file.id),
+                user_id=uploaded_file.user_id,
+                source_type=source_type_for(uploaded_file.content_type)
+            )
+        print(f"♻️ '{uploaded_file.filename}' reuses extraction of upload {source.id}")
+        return True
+
+    @staticmethod
+    def _process_csv_eda(uploaded_file, source=None):
+        """Profile a CSV, describe it with the LLM and store it in the EDA vector database"""
+        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton
+        vectordb_handler = EdaVectorDBSingleton.get_instance()
+        user_id = uploaded_file.user_id
+        file_path = uploaded_file.file.path
+
+        # An identical CSV was already profiled and described; only relabel it
+        csv_desc = vectordb_handler.get_csv_metadata(source.id) if source else None
+        df = None
+        if csv_desc:
+            csv_desc.update(
+                filename=uploaded_file.filename, filepath=file_path,
+                user_id=user_id, scrape_id=str(uploaded_file.id)
+            )
+        else:
+            # Generate metadata for the CSV file
+            csv_metadata, df = EdaCsvService().generate_csv_metadata(
+                file_path,
+                user_id=user_id,
+                scrape_id=str(uploaded_file.id),
+                csv_profile=CsvSniffer.for_uploaded_file(uploaded_file),
+                filename=uploaded_file.filename
+            )
+            if not csv_metadata:
+                return
+
+            # Use the Groq service to generate a description
+            from eda_pipeline.services.eda_groq_service import EdaGroqService
+            csv_desc = EdaGroqService().generate_csv_description(csv_metadata)
+
+        # Store in the EDA vector database
+        vectordb_handler.store_csv_in_vectordb(
+            csv_desc,
+            force_reindex=True,  # Force reindex to ensure it's stored
+            user_id=user_id,
+            scrape_id=str(uploaded_file.id)
+        )
+        print(f"✅ CSV file '{uploaded_file.filename}' also processed with EDA pipeline")
+
+        # Columnar copy for CSVQueryView, reusing the frame parsed for profiling
+        try:
+            df = DataFrameStore.materialize(uploaded_file, df=df)
+        except Exception as e:
+            print(f"⚠️ Could not store '{uploaded_file.filename}' as Arrow: {str(e)}")
+
+        # Join keys against the user's other CSVs; only this file's pairs are computed
         try:
-            file_size = file.size
-            filename = file.name
-            
-            # Save file record to database with user
-            uploaded_file = UploadedFile.objects.create(
-                user=user,
-                file=file,
-                filename=filename,
-                content_type=content_type,
-                file_size=file_size
+            RelationshipGraph.add_file(uploaded_file, df=df, source=source)
+        except Exception as e:
+            print(f"⚠️ Could not link '{uploaded_file.filename}' to other CSVs: {str(e)}")
+
+    @staticmethod
+    def process_uploaded_file(uploaded_file_id):
+        """Extract, embed and (for CSVs) profile a previously saved upload"""
+        uploaded_file = UploadedFile.objects.select_related('user').get(pk=uploaded_file_id)
+        user = uploaded_file.user
+        content_type = uploaded_file.content_type
+        filename = uploaded_file.filename
+
+        try:
+            FileHandler._update_status(
+                uploaded_file, status='IN_PROGRESS', progress=10,
+                status_message='Extracting content', processing_error=None
             )
 
             # Extract markdown content
             file_path = uploaded_file.file.path
-            markdown_content = ContentExtractor.extract_content(file_path, content_type)
-            
-            if markdown_content:
-                uploaded_file.markdown_content = markdown_content
-                
-                # Process for general vector database
-                vector_db.process_markdown(
-                    markdown_content=markdown_content,
-                    url="",  # Empty URL for file uploads
-                    scrape_id=str(uploaded_file.id),   # Using upload ID as scrape_id
-                    user_id=user.id
-                )
-                
-                # Special handling for CSV files - also process with EDA pipeline
+            streaming_extractor = ContentExtractor.STREAMING_EXTRACTORS.get(content_type)
+            duplicate = FileHandler._find_processed_duplicate(uploaded_file)
+
+            if duplicate:
+                has_content = FileHandler._reuse_duplicate(uploaded_file, duplicate)
+            elif streaming_extractor and content_type in settings.STREAMING_EXTRACTION_TYPES:
+                has_content = FileHandler._stream_to_vectordb(uploaded_file, streaming_extractor)
+            else:
+                options = {}
                 if content_type == 'text/csv':
-                    try:
-                        # Initialize the CSV service
-                        eda_csv_service = EdaCsvService()
-                        
-                        # Generate metadata for the CSV file
-                        csv_metadata, _ = eda_csv_service.generate_csv_metadata(
-                            file_path, 
-                            user_id=user.id,
-                            scrape_id=str(uploaded_file.id), 
-                        )
-                        
-                        if csv_metadata:
-                            # Use the Groq service to generate a description
-                            from eda_pipeline.services.eda_groq_service import EdaGroqService
-                            groq_service = EdaGroqService()
-                            csv_desc = groq_service.generate_csv_description(csv_metadata)
-                            
-                            # Store in the EDA vector database
-                            from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
-                            vectordb_handler = EdaVectorDBHandler()
-                            vectordb_handler.store_csv_in_vectordb(
-                                csv_desc,
-                                force_reindex=True,  # Force reindex to ensure it's stored
-                                user_id=user.id,
-                                scrape_id=str(uploaded_file.id)
-                            )
-                            print(f"✅ CSV file '{filename}' also processed with EDA pipeline")
-                    except Exception as e:
-                        print(f"⚠️ Error processing CSV in EDA pipeline: {str(e)}")
-                
-                uploaded_file.save()
+                    csv_profile = CsvSniffer.for_uploaded_file(uploaded_file)
+                    options['csv_profile'] = csv_profile.to_dict()
+                markdown_content = ContentExtractor.extract_isolated(file_path, content_type, **options)
+                has_content = bool(markdown_content)
 
+                if has_content:
+                    FileHandler._store_markdown(
+                        uploaded_file, markdown_content,
+                        progress=40, status_message='Indexing content'
+                    )
+
+                    # Process for general vector database
+                    vector_db.process_markdown(
+                        markdown_content=markdown_content,
+                        url="",  # Empty URL for file uploads
+                        scrape_id=str(uploaded_file.id),   # Using upload ID as scrape_id
+                        user_id=user.id,
+                        source_type=source_type_for(content_type)
+                    )
+
+            # Special handling for CSV files - also process with EDA pipeline
+            if has_content and content_type == 'text/csv':
+                FileHandler._update_status(
+                    uploaded_file, progress=70, status_message='Profiling CSV data'
+                )
+                try:
+                    FileHandler._process_csv_eda(uploaded_file, source=duplicate)
+                except Exception as e:
+                    print(f"⚠️ Error processing CSV in EDA pipeline: {str(e)}")
+
+            FileHandler._update_status(
+                uploaded_file, status='COMPLETED', progress=100,
+                status_message='Processing complete' if has_content else 'No extractable content',
+                processed_at=timezone.now()
+            )
             return uploaded_file
         except Exception as e:
-            print(f"Error handling file upload: {str(e)}")
-            raise
\ No newline at end of file
+            print(f"Error processing uploaded file {filename}: {str(e)}")
+            FileHandler._update_status(
+                uploaded_file, status='FAILED', status_message='Processing failed',
+                processing_error=str(e), processed_at=timezone.now()
+            )
+            raise
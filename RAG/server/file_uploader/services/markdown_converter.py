@@ -1,12 +1,23 @@
+import io
 import os
 from markitdown import MarkItDown
 import mammoth
+from pdfminer.high_level import extract_pages
+from pdfminer.layout import LTTextContainer
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
 import openpyxl
-import pytesseract
-from PIL import Image
-import csv
-from charset_normalizer import from_path
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'  # Adjust path if needed
+from .csv_sniffer import CsvSniffer, CsvProfile
+from .ocr_service import OcrService
+
+# Spreadsheet conversion limits
+XLSX_MAX_ROWS_PER_SHEET = int(os.getenv("XLSX_MAX_ROWS_PER_SHEET", 200000))
+XLSX_MAX_CELLS_PER_ROW = int(os.getenv("XLSX_MAX_CELLS_PER_ROW", 200))
+XLSX_CHUNK_ROWS = int(os.getenv("XLSX_CHUNK_ROWS", 500))
+
+# Number of data rows rendered for a CSV preview
+CSV_PREVIEW_ROWS = int(os.getenv("CSV_PREVIEW_ROWS", 50))
 
 # extracters
 def extract_markdown_from_pdf(file_path):
@@ -19,6 +30,20 @@ def extract_markdown_from_pdf(file_path):
         print(f"Failed to convert PDF to Markdown for {file_path}: {e}")
     return None
 
+def count_pdf_pages(file_path):
+    with open(file_path, 'rb') as pdf_file:
+        document = PDFDocument(PDFParser(pdf_file))
+        return int(resolve1(document.catalog['Pages'])['Count'])
+
+def extract_pdf_page_range(file_path, page_numbers):
+    """Extract text for the given zero-based pages, returning [(page_number, text)] (1-based)"""
+    pages = []
+    layouts = extract_pages(file_path, page_numbers=page_numbers)
+    for page_number, layout in zip(sorted(page_numbers), layouts):
+        text = "".join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+        pages.append((page_number + 1, text))
+    return pages
+
 def extract_markdown_from_docx(file_path):
     try:
         with open(file_path, "rb") as docx_file:
@@ -29,17 +54,47 @@ def extract_markdown_from_docx(file_path):
         print(f"Failed to convert DOCX to Markdown for {file_path}: {e}")
     return None
 
+def iter_markdown_from_xlsx(file_path, max_rows_per_sheet=None, max_cells_per_row=None, chunk_rows=None):
+    """
+    Stream an XLSX workbook as markdown, yielding (markdown, {"sheet": name}) chunks.
+
+    The workbook is opened in read-only mode so rows are parsed lazily and
+    memory stays flat regardless of sheet size. Each sheet is capped at
+    max_rows_per_sheet rows and max_cells_per_row cells per row.
+    """
+    max_rows_per_sheet = max_rows_per_sheet or XLSX_MAX_ROWS_PER_SHEET
+    max_cells_per_row = max_cells_per_row or XLSX_MAX_CELLS_PER_ROW
+    chunk_rows = chunk_rows or XLSX_CHUNK_ROWS
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            buffer = io.StringIO()
+            buffer.write(f"## {worksheet.title}\n\n")
+            rows_in_buffer = 0
+            for row_index, row in enumerate(worksheet.iter_rows(values_only=True)):
+                if row_index >= max_rows_per_sheet:
+                    buffer.write(f"\n_Sheet truncated after {max_rows_per_sheet} rows_\n")
+                    break
+                buffer.write("| ")
+                buffer.write(" | ".join(str(cell) if cell is not None else "" for cell in row[:max_cells_per_row]))
+                buffer.write(" |\n")
+                rows_in_buffer += 1
+                if rows_in_buffer >= chunk_rows:
+                    yield buffer.getvalue(), {"sheet": worksheet.title}
+                    buffer = io.StringIO()
+                    rows_in_buffer = 0
+            buffer.write("\n")
+            yield buffer.getvalue(), {"sheet": worksheet.title}
+    finally:
+        workbook.close()
+
 def extract_markdown_from_xlsx(file_path):
     try:
-        workbook = openpyxl.load_workbook(file_path, data_only=True)
-        markdown = ""
-        for sheet in workbook.sheetnames:
-            worksheet = workbook[sheet]
-            markdown += f"## {sheet}\n\n"
-            for row in worksheet.iter_rows(values_only=True):
-                row_md = "| " + " | ".join([str(cell) if cell is not None else "" for cell in row]) + " |\n"
-                markdown += row_md
-            markdown += "\n"
+        buffer = io.StringIO()
+        for chunk, _ in iter_markdown_from_xlsx(file_path):
+            buffer.write(chunk)
+        markdown = buffer.getvalue()
         if markdown.strip():
             return markdown
     except Exception as e:
@@ -48,52 +103,47 @@ def extract_markdown_from_xlsx(file_path):
 
 def extract_markdown_from_image(file_path):
     try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
-        if text.strip():
-            return f"![Image]({file_path})\n\n" + text
+        result = OcrService.get_instance().image_to_text(file_path)
+        if result.text.strip():
+            return f"![Image]({file_path})\n\n" + result.text
     except Exception as e:
         print(f"Failed to extract text from image {file_path}: {e}")
     return None
 
-def extract_markdown_from_csv(file_path):
+def extract_text_from_plain(file_path):
+    with open(file_path) as text_file:
+        return text_file.read()
+
+def extract_markdown_from_csv(file_path, csv_profile=None):
     try:
-        # Detect file encoding using charset-normalizer
-        result = from_path(file_path).best()
-        if not result:
-            print(f"Failed to detect encoding for {file_path}")
+        # Encoding, dialect and header are detected from a bounded sample
+        # (or reused from the profile cached on the upload)
+        if csv_profile:
+            profile = CsvProfile.from_dict(csv_profile)
+        else:
+            profile = CsvSniffer.sniff(file_path)
+            print(f"Detected encoding for {file_path}: {profile.encoding}")
+
+        # Stream only the header plus the first CSV_PREVIEW_ROWS data rows
+        rows = list(CsvSniffer.iter_rows(file_path, profile, limit=CSV_PREVIEW_ROWS + 1))
+        if not rows:
             return None
-        
-        encoding = result.encoding
-        print(f"Detected encoding for {file_path}: {encoding}")
-        
-        # Read the CSV file with the detected encoding - limited to first 20 lines
-        with open(file_path, 'r', newline='', encoding=encoding) as csvfile:
-            csvreader = csv.reader(csvfile)
-            # Get only first 20 rows
-            rows = []
-            for i, row in enumerate(csvreader):
-                rows.append(row)
-                if i >= 50:  # Stop after reading 20 rows (0-19)
-                    break
-                    
-            if not rows:
-                return None
-            
-            markdown = []
-            # Add header row
-            headers = rows[0]
-            markdown.append("| " + " | ".join(headers) + " |")
-            
-            # Add separator row
-            markdown.append("| " + " | ".join(["---"] * len(headers)) + " |")
-            
-            # Add data rows (limited to what we've read)
-            for row in rows[1:]:
-                markdown.append("| " + " | ".join(str(cell) for cell in row) + " |")
-            
-            markdown_str = "\n".join(markdown)
-            return markdown_str if markdown_str.strip() else None
+
+        markdown = []
+        # Add header row
+        headers = rows[0] if profile.has_header else profile.columns
+        data_rows = rows[1:] if profile.has_header else rows
+        markdown.append("| " + " | ".join(headers) + " |")
+
+        # Add separator row
+        markdown.append("| " + " | ".join(["---"] * len(headers)) + " |")
+
+        # Add data rows (limited to what we've read)
+        for row in data_rows:
+            markdown.append("| " + " | ".join(str(cell) for cell in row) + " |")
+
+        markdown_str = "\n".join(markdown)
+        return markdown_str if markdown_str.strip() else None
     except Exception as e:
         print(f"Failed to convert CSV to Markdown {file_path}: {e}")
-    return None
\ No newline at end of file
+    return None
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import pytesseract
+from PIL import Image, ImageOps
+
+# OCR configuration; TESSERACT_CMD falls back to the binary on PATH
+TESSERACT_CMD = os.getenv("TESSERACT_CMD") or shutil.which("tesseract") or "tesseract"
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 2))
+OCR_TIMEOUT = int(os.getenv("OCR_TIMEOUT", 120))  # seconds per image
+OCR_MAX_DIMENSION = int(os.getenv("OCR_MAX_DIMENSION", 2500))  # pixels, longest side
+OCR_BINARIZE = os.getenv("OCR_BINARIZE", "true").lower() in ("1", "true", "yes")
+OCR_CACHE_DIR = os.getenv(
+    "OCR_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'media', 'ocr_cache')
+)
+
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+
+@dataclass
+class OcrResult:
+    text: str
+    latency: float
+    cached: bool
+
+
+def _otsu_threshold(histogram):
+    """Pick the grey level that best separates foreground from background"""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background_weight = background_sum = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        background_weight += count
+        if background_weight == 0:
+            continue
+        foreground_weight = total - background_weight
+        if foreground_weight == 0:
+            break
+        background_sum += level * count
+        background_mean = background_sum / background_weight
+        foreground_mean = (weighted_total - background_sum) / foreground_weight
+        variance = background_weight * foreground_weight * (background_mean - foreground_mean) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def preprocess_image(image):
+    """Greyscale, downscale oversized images and binarize for tesseract"""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        # Flatten transparency onto white so it doesn't turn black
+        image = image.convert('RGBA')
+        image = Image.alpha_composite(Image.new('RGBA', image.size, 'white'), image)
+    image = image.convert('L')
+    if max(image.size) > OCR_MAX_DIMENSION:
+        image.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+    if OCR_BINARIZE:
+        threshold = _otsu_threshold(image.histogram())
+        image = image.point(lambda value: 255 if value > threshold else 0, mode='1')
+    return image
+
+
+class OcrService:
+    """
+    Bounded OCR worker pool with an on-disk result cache.
+
+    Results are keyed by the SHA-256 of the image bytes plus the
+    preprocessing settings, so re-uploaded screenshots are never OCR'd twice
+    (also across processes).
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, max_workers=OCR_WORKERS, cache_dir=OCR_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ocr-worker')
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _cache_key(self, file_path):
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as image_file:
+            for block in iter(lambda: image_file.read(1024 * 1024), b''):
+                digest.update(block)
+        digest.update(f"|{OCR_MAX_DIMENSION}|{OCR_BINARIZE}".encode())
+        return digest.hexdigest()
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.txt")
+
+    def _read_cache(self, key):
+        try:
+            with open(self._cache_path(key), encoding='utf-8') as cache_file:
+                return cache_file.read()
+        except FileNotFoundError:
+            return None
+
+    def _write_cache(self, key, text):
+        """Store text under key; a failed write only costs a later cache miss"""
+        path = self._cache_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Unique temp name: identical images may be OCR'd by several threads at once
+            with tempfile.NamedTemporaryFile(
+                'w', encoding='utf-8', dir=os.path.dirname(path), suffix='.tmp', delete=False
+            ) as cache_file:
+                tmp_path = cache_file.name
+                cache_file.write(text)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not cache OCR result {key[:12]}: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _ocr(self, file_path):
+        start_time = time.perf_counter()
+        key = self._cache_key(file_path)
+        text = self._read_cache(key)
+        cached = text is not None
+
+        if not cached:
+            with Image.open(file_path) as image:
+                text = pytesseract.image_to_string(preprocess_image(image), timeout=OCR_TIMEOUT)
+            self._write_cache(key, text)
+
+        latency = time.perf_counter() - start_time
+        print(f"🔍 OCR {os.path.basename(file_path)}: {latency:.2f}s{' (cached)' if cached else ''}")
+        return OcrResult(text=text, latency=latency, cached=cached)
+
+    def image_to_text(self, file_path):
+        """OCR one image through the bounded pool"""
+        return self._executor.submit(self._ocr, file_path).result()
+
+    def images_to_text(self, file_paths):
+        """OCR several images concurrently, returning results in input order"""
+        futures = [self._executor.submit(self._ocr, file_path) for file_path in file_paths]
+        return [future.result() for future in futures]
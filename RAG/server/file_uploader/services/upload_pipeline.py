@@ -0,0 +1,92 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from ..models import UploadedFile
+from .file_handler import FileHandler
+from .worker_heartbeat import WorkerHeartbeat, process_id
+
+
+class UploadPipeline:
+    """
+    Bounded background worker pool for upload processing.
+
+    Uploads are saved by the request thread and handed to this pool, so the
+    HTTP request returns as soon as the files are on disk. Progress is
+    tracked on the UploadedFile row and can be polled through the API.
+    Uploads lost with a restarted process are picked up again by recover().
+    """
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_executor(cls):
+        if cls._executor is None:
+            with cls._lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.FILE_PROCESSING_WORKERS,
+                        thread_name_prefix='upload-worker'
+                    )
+        return cls._executor
+
+    @classmethod
+    def submit(cls, uploaded_file_id):
+        """Queue an upload for processing once the current transaction commits"""
+        transaction.on_commit(lambda: cls._enqueue(uploaded_file_id))
+
+    @classmethod
+    def _enqueue(cls, uploaded_file_id, resume=False):
+        # Owned by this process from now on; the heartbeat keeps it fresh
+        UploadedFile.objects.filter(pk=uploaded_file_id).update(
+            worker_id=process_id(), status_updated_at=timezone.now()
+        )
+        WorkerHeartbeat.track(UploadedFile, 'status_updated_at')
+        cls.get_executor().submit(cls._run, uploaded_file_id, resume)
+
+    @classmethod
+    def recover(cls):
+        """
+        Re-queue PENDING and IN_PROGRESS uploads whose heartbeat
+        (status_updated_at, see WorkerHeartbeat) has lapsed for
+        FILE_PROCESSING_STALE_AFTER seconds, i.e. whose owning process has
+        stopped. Uploads queued or running in a live process keep a fresh
+        heartbeat and are left alone. Each row is claimed with a conditional
+        update, so processes starting together share the work.
+        """
+        stale_before = timezone.now() - timedelta(seconds=settings.FILE_PROCESSING_STALE_AFTER)
+        stale = UploadedFile.objects.filter(
+            status__in=['PENDING', 'IN_PROGRESS'], status_updated_at__lt=stale_before
+        ).values_list('pk', 'status_updated_at')
+
+        requeued = 0
+        for uploaded_file_id, status_updated_at in stale:
+            claimed = UploadedFile.objects.filter(
+                pk=uploaded_file_id, status_updated_at=status_updated_at
+            ).update(
+                status='PENDING', progress=0, status_message='Queued again after an interrupted run',
+                worker_id=process_id(), status_updated_at=timezone.now()
+            )
+            if claimed:
+                cls._enqueue(uploaded_file_id, resume=True)
+                requeued += 1
+        if requeued:
+            print(f"🔁 Re-queued {requeued} interrupted uploads")
+        return requeued
+
+    @staticmethod
+    def _run(uploaded_file_id, resume=False):
+        close_old_connections()
+        try:
+            if resume:
+                # Drop chunks indexed by the interrupted run before starting over
+                from vectordb import vector_db
+                vector_db.delete_embeddings(str(uploaded_file_id))
+            FileHandler.process_uploaded_file(uploaded_file_id)
+        except Exception as e:
+            # The failure is already recorded on the row by FileHandler
+            print(f"❌ Background processing failed for upload {uploaded_file_id}: {str(e)}")
+        finally:
+            close_old_connections()
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import tempfile
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.text import get_valid_filename
+
+
+class UploadStorage:
+    """
+    Content-addressed storage for uploaded files.
+
+    The SHA-256 of an upload is computed while it is streamed to disk, and the
+    file is kept once under uploads/<hash[:2]>/<hash>/<filename>. Identical
+    uploads share that blob; it is only removed when the last UploadedFile
+    referencing it is deleted.
+    """
+    ROOT = 'uploads'
+
+    @staticmethod
+    def blob_name(content_hash, filename):
+        return os.path.join(
+            UploadStorage.ROOT, content_hash[:2], content_hash, get_valid_filename(os.path.basename(filename))
+        )
+
+    @staticmethod
+    def store(file):
+        """
+        Stream an uploaded file to disk, hashing it on the way.
+        Returns (storage_name, content_hash, size).
+        """
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=UploadStorage.temp_dir(), delete=False) as tmp_file:
+            try:
+                for chunk in file.chunks():
+                    digest.update(chunk)
+                    tmp_file.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                tmp_file.close()
+                os.remove(tmp_file.name)
+                raise
+
+        content_hash = digest.hexdigest()
+        return UploadStorage.store_hashed(tmp_file.name, content_hash, file.name), content_hash, size
+
+    @staticmethod
+    def temp_dir():
+        """Scratch directory on the same filesystem as the blobs, so moves are atomic"""
+        path = os.path.join(settings.MEDIA_ROOT, UploadStorage.ROOT, 'tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    @staticmethod
+    def store_hashed(tmp_path, content_hash, filename):
+        """
+        Move an already hashed file from temp_dir() into the blob store and
+        return its storage name. Duplicates are dropped in favour of the
+        existing blob.
+        """
+        existing = UploadStorage.find_blob(content_hash)
+        if existing:
+            os.remove(tmp_path)
+            print(f"♻️ Duplicate upload {filename} matches stored blob {content_hash[:12]}")
+            return existing
+
+        name = UploadStorage.blob_name(content_hash, filename)
+        path = default_storage.path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        return name
+
+    @staticmethod
+    def find_blob(content_hash):
+        """Storage name of the blob already holding content_hash, if any"""
+        blob_dir = default_storage.path(os.path.join(UploadStorage.ROOT, content_hash[:2], content_hash))
+        try:
+            entries = [entry for entry in os.listdir(blob_dir) if not entry.startswith('.')]
+        except FileNotFoundError:
+            return None
+        if not entries:
+            return None
+        return os.path.join(UploadStorage.ROOT, content_hash[:2], content_hash, entries[0])
+
+    @staticmethod
+    def release(name):
+        """Delete a stored file once no UploadedFile references it any more"""
+        from ..models import UploadedFile
+        if not name or UploadedFile.objects.filter(file=name).exists():
+            return False
+
+        path = default_storage.path(name)
+        if os.path.isfile(path):
+            os.remove(path)
+            print(f"✅ File '{path}' has been removed")
+        # Drop the now-empty hash directory of content-addressed blobs
+        if len(os.path.normpath(name).split(os.sep)) == 4:
+            try:
+                os.rmdir(os.path.dirname(path))
+            except OSError:
+                pass
+        return True
@@ -0,0 +1,66 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+_process_id = None
+
+
+def process_id():
+    """hostname:pid:boot id of this process, stored as worker_id on the rows it owns"""
+    global _process_id
+    # Recomputed after a fork, so preloaded workers don't share the parent's id
+    if _process_id is None or _process_id.split(':')[-2] != str(os.getpid()):
+        _process_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    return _process_id
+
+
+class WorkerHeartbeat:
+    """
+    Keeps background work of this process visibly alive.
+
+    Every BACKGROUND_HEARTBEAT_INTERVAL seconds the timestamp of each
+    PENDING or IN_PROGRESS row owned by this process (worker_id) is
+    refreshed, for every tracked model. Rows whose timestamp stops moving
+    belong to a process that is gone and can safely be recovered by another
+    one, however long they wait in a queue or a single step takes.
+    """
+    _tracked = []  # (model, timestamp field)
+    _thread = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def track(cls, model, timestamp_field):
+        """Refresh timestamp_field of model's rows owned by this process from now on"""
+        with cls._lock:
+            if (model, timestamp_field) not in cls._tracked:
+                cls._tracked.append((model, timestamp_field))
+            if cls._thread is None or not cls._thread.is_alive():
+                cls._thread = threading.Thread(target=cls._loop, name='worker-heartbeat', daemon=True)
+                cls._thread.start()
+
+    @classmethod
+    def beat(cls):
+        now = timezone.now()
+        with cls._lock:
+            tracked = list(cls._tracked)
+        for model, timestamp_field in tracked:
+            model.objects.filter(
+                worker_id=process_id(), status__in=['PENDING', 'IN_PROGRESS']
+            ).update(**{timestamp_field: now})
+
+    @classmethod
+    def _loop(cls):
+        while True:
+            time.sleep(settings.BACKGROUND_HEARTBEAT_INTERVAL)
+            close_old_connections()
+            try:
+                cls.beat()
+            except Exception as e:
+                print(f"⚠️ Background heartbeat failed: {str(e)}")
+            finally:
+                close_old_connections()
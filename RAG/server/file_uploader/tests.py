@@ -1,3 +1,52 @@
-from django.test import TestCase
+import hashlib
+import io
+import tempfile
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from .models import UploadSession
+from .services.chunked_upload import ChunkedUploadService, ChunkedUploadError
 
-# Create your tests here.
+
+class _BrokenStream:
+    """Yields some bytes, then fails like a dropped connection"""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        block = self._stream.read(size)
+        if not block:
+            raise IOError("connection reset")
+        return block
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ChunkedUploadServiceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='chunks@example.com', password='secret')
+        self.data = b'a' * 1000 + b'b' * 1000
+
+    def _content_hash(self, session):
+        session = UploadSession.objects.get(pk=session.pk)
+        return ChunkedUploadService._content_hash(session, ChunkedUploadService.part_path(session))
+
+    def test_retried_chunk_after_short_read_keeps_hash(self):
+        session = ChunkedUploadService.start(self.user, 'data.bin', 'application/octet-stream', len(self.data))
+        ChunkedUploadService.append(session, 0, io.BytesIO(self.data[:1000]), 1000)
+
+        # The chunk ends early: half of it reaches the server
+        with self.assertRaises(ChunkedUploadError):
+            ChunkedUploadService.append(session, 1000, io.BytesIO(self.data[1000:1500]), 1000)
+
+        ChunkedUploadService.append(session, 1000, io.BytesIO(self.data[1000:]), 1000)
+        self.assertEqual(self._content_hash(session), hashlib.sha256(self.data).hexdigest())
+
+    def test_retried_chunk_after_read_error_keeps_hash(self):
+        session = ChunkedUploadService.start(self.user, 'data.bin', 'application/octet-stream', len(self.data))
+        ChunkedUploadService.append(session, 0, io.BytesIO(self.data[:1000]), 1000)
+
+        with self.assertRaises(IOError):
+            ChunkedUploadService.append(session, 1000, _BrokenStream(self.data[1000:1500]), 1000)
+
+        ChunkedUploadService.append(session, 1000, io.BytesIO(self.data[1000:]), 1000)
+        self.assertEqual(self._content_hash(session), hashlib.sha256(self.data).hexdigest())
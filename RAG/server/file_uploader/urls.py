@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import FileUploadViewSet
+from .views import FileUploadViewSet, UploadSessionViewSet
 
 router = DefaultRouter()
 router.register(r'files', FileUploadViewSet, basename='file')
+router.register(r'upload-sessions', UploadSessionViewSet, basename='upload-session')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,14 +1,19 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, status, mixins
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticated
-from .models import UploadedFile
-from .serializers import FileUploadSerializer
+from rest_framework.decorators import action
+from django.core.exceptions import ValidationError
+from .models import UploadedFile, UploadSession
+from .serializers import FileUploadSerializer, FileDetailSerializer, FileStatusSerializer, UploadSessionSerializer
 from .services.file_handler import FileHandler
-from vectordb import vector_db
-import os
-import shutil
-from django.db import transaction
+from .services.file_deletion import FileDeletionService
+from .services.upload_pipeline import UploadPipeline
+from .services.blob_store import BlobStore
+from .services.chunked_upload import ChunkedUploadService, ChunkedUploadError, ChunkOffsetMismatch
+import uuid
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db.models import Min, Max
 
 class FileUploadViewSet(viewsets.ModelViewSet):
     serializer_class = FileUploadSerializer
@@ -16,7 +21,13 @@ class FileUploadViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        return UploadedFile.objects.filter(user=self.request.user)
+        # Legacy rows may still carry the full text inline; never load it for listings
+        return UploadedFile.objects.filter(user=self.request.user).defer('markdown_content')
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return FileDetailSerializer
+        return super().get_serializer_class()
 
     def create(self, request, *args, **kwargs):
         files = request.FILES.getlist('file')
@@ -26,93 +37,223 @@ class FileUploadViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        batch_id = uuid.uuid4()
         uploaded_files = []
         errors = []
 
+        # Only persist the files here; extraction and indexing run in the
+        # background worker pool and report progress on the record.
         for file in files:
             try:
                 content_type = file.content_type
-                uploaded_file = FileHandler.handle_uploaded_file(
-                    file=file, 
+                uploaded_file = FileHandler.create_upload(
+                    file=file,
                     content_type=content_type,
-                    user=request.user
+                    user=request.user,
+                    batch_id=batch_id
                 )
                 uploaded_files.append(uploaded_file)
+                UploadPipeline.submit(uploaded_file.id)
             except Exception as e:
                 errors.append({"filename": file.name, "error": str(e)})
         
         if uploaded_files:
             serializer = self.get_serializer(uploaded_files, many=True)
             response_data = {
+                "batch_id": str(batch_id),
+                "job_ids": [str(uploaded_file.id) for uploaded_file in uploaded_files],
                 "files": serializer.data
             }
             if errors:
                 response_data["errors"] = errors
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            return Response(response_data, status=status.HTTP_202_ACCEPTED)
         else:
             return Response(
                 {'error': 'All files failed to upload', 'details': errors},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+    @action(detail=True, methods=['get'], url_path='status')
+    def job_status(self, request, pk=None):
+        instance = self.get_object()
+        return Response(FileStatusSerializer(instance).data)
+
+    @action(detail=True, methods=['get'], url_path='content')
+    def content(self, request, pk=None):
+        """Stream the extracted markdown of one file"""
+        instance = self.get_object()
+        if instance.markdown_key:
+            def read_blob():
+                with BlobStore.open_text(instance.markdown_key) as blob:
+                    yield from iter(lambda: blob.read(64 * 1024), '')
+
+            return StreamingHttpResponse(read_blob(), content_type='text/markdown; charset=utf-8')
+        markdown_content = instance.get_markdown()
+        if markdown_content is None:
+            return Response({'error': 'No extracted content'}, status=status.HTTP_404_NOT_FOUND)
+        return HttpResponse(markdown_content, content_type='text/markdown; charset=utf-8')
+
+    @action(detail=False, methods=['get'], url_path='jobs')
+    def jobs(self, request):
+        """Poll processing status for a batch (?batch_id=) or a list of ids (?ids=a,b)"""
+        queryset = self.get_queryset()
+        batch_id = request.query_params.get('batch_id')
+        ids = request.query_params.get('ids')
+
+        if not batch_id and not ids:
+            return Response(
+                {'error': 'Provide batch_id or ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            if batch_id:
+                queryset = queryset.filter(batch_id=batch_id)
+            else:
+                queryset = queryset.filter(id__in=[i for i in ids.split(',') if i])
+            jobs = FileStatusSerializer(queryset, many=True).data
+        except ValidationError:
+            return Response({'error': 'Invalid id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        response_data = {
+            "jobs": jobs,
+            "done": all(job['status'] in ('COMPLETED', 'FAILED') for job in jobs)
+        }
+
+        # End-to-end throughput of a finished batch upload
+        if batch_id and jobs and response_data["done"]:
+            timings = queryset.aggregate(started=Min('upload_date'), finished=Max('processed_at'))
+            if timings['started'] and timings['finished']:
+                elapsed = (timings['finished'] - timings['started']).total_seconds()
+                response_data["elapsed_seconds"] = elapsed
+                response_data["files_per_second"] = len(jobs) / elapsed if elapsed > 0 else None
+
+        return Response(response_data)
     
     def destroy(self, request, *args, **kwargs):
+        instance = self.get_object()
         try:
-            instance = self.get_object()
-            file_id = str(instance.id)
-            print(f"🔍 Attempting to delete file with ID: {file_id}")
-
-            with transaction.atomic():
-                # Delete from general vector database first
-                if not vector_db.delete_by_id('scrape_id', file_id):
-                    raise Exception("Failed to delete from general vector database")
-
-                print(f"✅ File '{instance.filename}' deleted from general vector DB, content type: {instance.content_type}")
-                
-                # For CSV files, also delete from EDA vector database
-                if instance.content_type == 'text/csv':
-                    try:
-                        from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBHandler
-                        vectordb_handler = EdaVectorDBHandler()
-                        vectordb_handler.delete_scrape_data(file_id)
-                        print(f"✅ CSV file '{instance.filename}' removed from EDA vector database")
-                        
-                        # Check both potential locations for CSV folders
-                        # First check media/processed path
-                        processed_folder_path = os.path.join('media', 'processed', file_id)
-                        if os.path.exists(processed_folder_path):
-                            shutil.rmtree(processed_folder_path)
-                            print(f"✅ Processed folder for ID '{file_id}' removed: {processed_folder_path}")
-                        
-                        # Also check media/uploads/csv path based on folder structure
-                        csv_folder_path = os.path.join('media', 'uploads', 'csv', file_id)
-                        if os.path.exists(csv_folder_path):
-                            shutil.rmtree(csv_folder_path)
-                            print(f"✅ CSV folder for ID '{file_id}' removed: {csv_folder_path}")
-                            
-                    except Exception as e:
-                        print(f"⚠️ Error cleaning up CSV data: {str(e)}")
-
-                # Delete the actual file
-                if instance.file:
-                    file_path = instance.file.path
-                    print(f"🔍 Checking file path: {file_path}")
-                    if os.path.isfile(file_path):
-                        try:
-                            os.remove(file_path)
-                            print(f"✅ File '{file_path}' has been removed")
-                        except OSError as e:
-                            print(f"❌ Error removing file: {str(e)}")
-                            raise Exception(f"Failed to delete file: {str(e)}")
-
-                # Delete database record
-                instance.delete()
-                print(f"✅ Database record for '{instance.filename}' deleted")
-
-            return Response(status=status.HTTP_204_NO_CONTENT)
-
+            FileDeletionService.delete_files(request.user, [instance.id])
         except Exception as e:
             print(f"❌ Error in destroy method: {str(e)}")
             return Response(
                 {'error': f'Error deleting file: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete', parser_classes=[JSONParser])
+    def bulk_delete(self, request):
+        """Delete many files at once: {"ids": [...]}"""
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not ids:
+            return Response({'error': 'Provide a non-empty list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            ids = [uuid.UUID(str(file_id)) for file_id in ids]
+        except ValueError:
+            return Response({'error': 'Invalid id'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            deleted = FileDeletionService.delete_files(request.user, ids)
+        except Exception as e:
+            print(f"❌ Error in bulk delete: {str(e)}")
+            return Response(
+                {'error': f'Error deleting files: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+        deleted_ids = {str(file_id) for file_id in deleted}
+        return Response({
+            "deleted": sorted(deleted_ids),
+            "not_found": sorted({str(file_id) for file_id in ids} - deleted_ids)
+        })
+
+
+class UploadSessionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads for files too large for a single request.
+
+    POST   /upload-sessions/                  {filename, content_type, total_size, sha256?}
+    PUT    /upload-sessions/{id}/chunk/?offset=N   raw bytes of the next chunk
+    POST   /upload-sessions/{id}/finalize/    queue the assembled file for processing
+    GET    /upload-sessions/{id}/             received_bytes tells a client where to resume
+    DELETE /upload-sessions/{id}/             abort and discard the partial upload
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(user=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        filename = request.data.get('filename')
+        if not filename:
+            return Response({'error': 'filename is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            total_size = int(request.data.get('total_size'))
+        except (TypeError, ValueError):
+            return Response({'error': 'total_size must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            session = ChunkedUploadService.start(
+                user=request.user,
+                filename=filename,
+                content_type=request.data.get('content_type') or 'application/octet-stream',
+                total_size=total_size,
+                expected_hash=request.data.get('sha256', '')
+            )
+        except ChunkedUploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_serializer(session).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put'], url_path='chunk')
+    def chunk(self, request, pk=None):
+        session = self.get_object()
+        try:
+            offset = int(request.query_params.get('offset', session.received_bytes))
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            return Response({'error': 'offset must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        if length <= 0:
+            return Response({'error': 'Empty chunk'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            received_bytes = ChunkedUploadService.append(session, offset, request.stream, length)
+        except ChunkOffsetMismatch as e:
+            return Response(
+                {'error': str(e), 'received_bytes': e.expected_offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ChunkedUploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'id': str(session.id), 'received_bytes': received_bytes})
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        try:
+            uploaded_file = ChunkedUploadService.finalize(session, batch_id=uuid.uuid4())
+        except ChunkOffsetMismatch as e:
+            return Response(
+                {'error': 'Upload is incomplete', 'received_bytes': e.expected_offset},
+                status=status.HTTP_409_CONFLICT
+            )
+        except ChunkedUploadError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            "batch_id": str(uploaded_file.batch_id),
+            "job_ids": [str(uploaded_file.id)],
+            "files": FileUploadSerializer(uploaded_file).data
+        }, status=status.HTTP_202_ACCEPTED)
+
+    def destroy(self, request, *args, **kwargs):
+        session = self.get_object()
+        if session.status == 'COMPLETED':
+            return Response(
+                {'error': 'Upload already finalized, delete the file instead'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ChunkedUploadService.abort(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
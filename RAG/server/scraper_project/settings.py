@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 from datetime import timedelta
 
 
@@ -193,3 +193,90 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 CSV_UPLOAD_DIR = 'uploads/csv/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Background upload processing
+FILE_PROCESSING_WORKERS = config('FILE_PROCESSING_WORKERS', default=2, cast=int)
+# Processes refresh the rows of uploads and CSV jobs they own every
+# BACKGROUND_HEARTBEAT_INTERVAL seconds; a PENDING/IN_PROGRESS upload whose
+# heartbeat lapsed for FILE_PROCESSING_STALE_AFTER seconds belongs to a
+# process that is gone and is re-queued at startup
+BACKGROUND_HEARTBEAT_INTERVAL = config('BACKGROUND_HEARTBEAT_INTERVAL', default=60, cast=int)
+FILE_PROCESSING_STALE_AFTER = config('FILE_PROCESSING_STALE_AFTER', default=300, cast=int)
+
+# Content extraction runs in isolated worker processes
+EXTRACTION_WORKERS = config('EXTRACTION_WORKERS', default=os.cpu_count() or 2, cast=int)
+EXTRACTION_TIMEOUT = config('EXTRACTION_TIMEOUT', default=300, cast=int)  # seconds per file
+EXTRACTION_CONCURRENCY = {
+    'pdf': config('EXTRACTION_PDF_CONCURRENCY', default=4, cast=int),
+    'docx': config('EXTRACTION_DOCX_CONCURRENCY', default=2, cast=int),
+    'xlsx': config('EXTRACTION_XLSX_CONCURRENCY', default=2, cast=int),
+}
+
+# Content types whose extractors feed chunks directly into the vector store as
+# they are produced (PDFs page by page in parallel workers; XLSX sheet chunks
+# in the upload worker itself) instead of returning one string first
+STREAMING_EXTRACTION_TYPES = config('STREAMING_EXTRACTION_TYPES', default='application/pdf', cast=Csv())
+
+# Resumable chunked uploads (file_uploader.services.chunked_upload)
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=20 * 1024 ** 3, cast=int)
+CHUNKED_UPLOAD_MAX_CHUNK = config('CHUNKED_UPLOAD_MAX_CHUNK', default=64 * 1024 ** 2, cast=int)
+
+# Chroma persist directories, shared by the handlers and the deletion service
+VECTOR_DB_DIRECTORY = config('VECTOR_DB_DIRECTORY', default='vectordb')
+EDA_VECTOR_DB_DIRECTORY = config(
+    'EDA_VECTOR_DB_DIRECTORY', default=os.path.join(BASE_DIR, 'eda_pipeline', 'eda_db', 'chroma_db')
+)
+# Load the embedding model when a WSGI/ASGI worker starts instead of on first use
+VECTORDB_WARMUP = config('VECTORDB_WARMUP', default=True, cast=bool)
+
+# Deleted files are cleaned up from the vector stores and disk in the
+# background; failed steps are retried from their tombstone
+FILE_DELETION_BATCH_SIZE = config('FILE_DELETION_BATCH_SIZE', default=500, cast=int)
+FILE_DELETION_RETRY_INTERVAL = config('FILE_DELETION_RETRY_INTERVAL', default=60, cast=int)  # seconds
+FILE_DELETION_MAX_ATTEMPTS = config('FILE_DELETION_MAX_ATTEMPTS', default=10, cast=int)
+
+# Chunker used before embedding: 'structure' (token-sized, markdown-aware,
+# see vectordb.chunking) or 'recursive' (the original 1200/300 char splitter)
+VECTOR_CHUNKER = config('VECTOR_CHUNKER', default='structure')
+
+# Parsed CSV frames kept in memory by eda_pipeline's DataFrameStore (their
+# Arrow copies under media/processed/ are memory-mapped when not cached)
+EDA_DATAFRAME_CACHE_MB = config('EDA_DATAFRAME_CACHE_MB', default=512, cast=int)
+# Generated pandas code runs in pre-forked sandbox processes
+# (eda_pipeline.services.code_executor), each limited in memory and in CPU
+# time per execution; workers are killed after EDA_CODE_TIMEOUT seconds and
+# replaced after EDA_CODE_MAX_TASKS_PER_WORKER executions
+EDA_CODE_WORKERS = config('EDA_CODE_WORKERS', default=2, cast=int)
+EDA_CODE_TIMEOUT = config('EDA_CODE_TIMEOUT', default=60, cast=int)  # wall-clock seconds
+EDA_CODE_CPU_SECONDS = config('EDA_CODE_CPU_SECONDS', default=30, cast=int)
+EDA_CODE_MEMORY_MB = config('EDA_CODE_MEMORY_MB', default=2048, cast=int)
+EDA_CODE_MAX_TASKS_PER_WORKER = config('EDA_CODE_MAX_TASKS_PER_WORKER', default=50, cast=int)
+# Seconds an execution waits for a free sandbox worker before failing
+EDA_CODE_QUEUE_TIMEOUT = config('EDA_CODE_QUEUE_TIMEOUT', default=300, cast=int)
+# Query results (eda_pipeline.services.result_serializer): responses hold at
+# most EDA_RESULT_PAGE_ROWS rows and EDA_RESULT_MAX_COLUMNS columns; larger
+# results are kept under media/results/ for EDA_RESULT_TTL seconds and paged
+# through query/results/<execution_id>/
+EDA_RESULT_PAGE_ROWS = config('EDA_RESULT_PAGE_ROWS', default=100, cast=int)
+EDA_RESULT_MAX_PAGE_ROWS = config('EDA_RESULT_MAX_PAGE_ROWS', default=1000, cast=int)
+EDA_RESULT_MAX_COLUMNS = config('EDA_RESULT_MAX_COLUMNS', default=50, cast=int)
+EDA_RESULT_TTL = config('EDA_RESULT_TTL', default=3600, cast=int)
+# Users whose parsed CSV metadata and relationships eda_pipeline's CsvCatalog
+# keeps in memory for the query path (least recently queried are dropped)
+EDA_CATALOG_MAX_USERS = config('EDA_CATALOG_MAX_USERS', default=256, cast=int)
+
+# Multi-file CSV indexing jobs (eda_pipeline.services.csv_batch_processor):
+# profiles run in ExtractionEngine workers, LLM descriptions run concurrently
+# under a per-process rate limit and vector store writes are batched
+CSV_JOB_WORKERS = config('CSV_JOB_WORKERS', default=2, cast=int)
+CSV_JOB_FILE_CONCURRENCY = config('CSV_JOB_FILE_CONCURRENCY', default=4, cast=int)
+CSV_DESCRIPTION_CONCURRENCY = config('CSV_DESCRIPTION_CONCURRENCY', default=4, cast=int)
+CSV_DESCRIPTION_RATE_PER_MINUTE = config('CSV_DESCRIPTION_RATE_PER_MINUTE', default=30, cast=int)
+CSV_STORE_BATCH_SIZE = config('CSV_STORE_BATCH_SIZE', default=16, cast=int)
+# Seconds without a heartbeat (see BACKGROUND_HEARTBEAT_INTERVAL) after which
+# a PENDING/IN_PROGRESS job counts as lost and is run again at startup
+CSV_JOB_STALE_AFTER = config('CSV_JOB_STALE_AFTER', default=300, cast=int)
+
+# LLM descriptions of CSVs are reused for CSVs of the same user with the same
+# schema fingerprint (eda_pipeline.services.csv_description_cache); 0 disables
+CSV_DESCRIPTION_CACHE_TTL_HOURS = config('CSV_DESCRIPTION_CACHE_TTL_HOURS', default=720, cast=int)
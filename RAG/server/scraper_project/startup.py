@@ -0,0 +1,18 @@
+"""Work done once when a serving process (wsgi/asgi) starts, not for management commands"""
+
+
+def resume_background_work():
+    """
+    Re-queue uploads and CSV jobs that were lost with a previous process and
+    start retrying deletion tombstones it left unfinished.
+    """
+    from file_uploader.services.upload_pipeline import UploadPipeline
+    from file_uploader.services.file_deletion import FileDeletionService
+    from eda_pipeline.services.csv_batch_processor import CsvBatchProcessor
+
+    for recover in (UploadPipeline.recover, CsvBatchProcessor.recover, FileDeletionService.start_retry_loop):
+        try:
+            recover()
+        except Exception as e:
+            # e.g. the database is not reachable or not migrated yet
+            print(f"⚠️ Could not resume background work: {str(e)}")
@@ -14,3 +14,17 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'scraper_project.settings')
 
 application = get_wsgi_application()
+
+# Load models while the worker boots rather than during its first request
+from django.conf import settings  # noqa: E402
+
+if settings.VECTORDB_WARMUP:
+    from vectordb import warm_up  # noqa: E402
+    from eda_pipeline.eda_db.eda_vectordb_handeller import EdaVectorDBSingleton  # noqa: E402
+    warm_up()
+    EdaVectorDBSingleton.warm_up()
+
+# Pick up uploads, CSV jobs and file cleanups interrupted by a restart
+from scraper_project.startup import resume_background_work  # noqa: E402
+
+resume_background_work()
@@ -1,6 +1,6 @@
-from .vectorDbHandeller import VectorDBSingleton
+from .vectorDbHandeller import LazyVectorDB, warm_up
 
-# This will be imported when Django starts
-vector_db = VectorDBSingleton.get_instance()
+# Created on first use (or by warm_up()), not when Django imports the app
+vector_db = LazyVectorDB()
 
-__all__ = ["vector_db"]
\ No newline at end of file
+__all__ = ["vector_db", "warm_up"]
@@ -3,10 +3,5 @@ from django.apps import AppConfig
 class VectordbConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'vectordb'
-    
-    def ready(self):
-        # Import and initialize the singleton when Django starts
-        print("Pre-initializing VectorDB for faster responses...")
-        from .vectorDbHandeller import VectorDBSingleton
-        VectorDBSingleton.get_instance()
-        print("VectorDB initialization complete and ready for use")
\ No newline at end of file
+    # The store is loaded lazily; serving processes warm it up from
+    # wsgi.py/asgi.py (VECTORDB_WARMUP) so management commands stay fast.
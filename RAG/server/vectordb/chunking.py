@@ -0,0 +1,323 @@
+import re
+import threading
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+@dataclass(frozen=True)
+class ChunkingProfile:
+    max_tokens: int = 256
+    overlap_tokens: int = 0
+
+
+# all-MiniLM-L6-v2 truncates its input after 256 word pieces, so anything
+# beyond that in a chunk is never embedded. Table rows and sheet rows stand
+# on their own; overlapping them would only duplicate rows.
+CHUNKING_PROFILES = {
+    'default': ChunkingProfile(max_tokens=256, overlap_tokens=32),
+    'web': ChunkingProfile(max_tokens=256, overlap_tokens=32),
+    'pdf': ChunkingProfile(max_tokens=256, overlap_tokens=32),
+    'docx': ChunkingProfile(max_tokens=256, overlap_tokens=32),
+    'text': ChunkingProfile(max_tokens=256, overlap_tokens=32),
+    'image': ChunkingProfile(max_tokens=256, overlap_tokens=16),
+    'csv': ChunkingProfile(max_tokens=256, overlap_tokens=0),
+    'xlsx': ChunkingProfile(max_tokens=256, overlap_tokens=0),
+}
+
+SOURCE_TYPE_BY_CONTENT_TYPE = {
+    'application/pdf': 'pdf',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',
+    'text/csv': 'csv',
+    'image/png': 'image',
+    'image/jpeg': 'image',
+    'application/octet-stream': 'text',
+}
+
+
+def source_type_for(content_type):
+    """Chunking profile name for an uploaded file's content type"""
+    return SOURCE_TYPE_BY_CONTENT_TYPE.get(content_type, 'default')
+
+
+@lru_cache(maxsize=None)
+def _load_tokenizer(model_name):
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(model_name)
+
+
+def token_counter(model_name=EMBEDDING_MODEL_NAME):
+    """Count tokens the way the embedding model sees them (tokenizer loaded lazily)"""
+    def count_tokens(text):
+        return len(_load_tokenizer(model_name).encode(text, add_special_tokens=False))
+    return count_tokens
+
+
+@dataclass
+class Block:
+    kind: str  # heading, paragraph, table or code
+    text: str
+    headings: Tuple[str, ...] = ()
+
+
+@dataclass
+class Chunk:
+    text: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+
+
+class Chunker(ABC):
+    """Splits markdown into chunks for embedding"""
+
+    @abstractmethod
+    def split(self, text) -> List[Chunk]:
+        """Chunks of text, in document order"""
+
+    def split_text(self, text) -> List[str]:
+        return [chunk.text for chunk in self.split(text)]
+
+
+class RecursiveChunker(Chunker):
+    """The original fixed-size character splitter, kept for comparison and rollback"""
+
+    def __init__(self, chunk_size=1200, chunk_overlap=300):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            add_start_index=True,
+        )
+
+    def split(self, text):
+        return [Chunk(text=chunk) for chunk in self.text_splitter.split_text(text)]
+
+
+FENCE_RE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+HEADING_RE = re.compile(r'^\s{0,3}(#{1,6})\s+(.+?)\s*#*\s*$')
+TABLE_SEPARATOR_RE = re.compile(r'^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$')
+SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+
+def parse_blocks(text):
+    """Split markdown into headings, paragraphs, tables and fenced code blocks"""
+    lines = text.splitlines()
+    blocks = []
+    headings = []  # (level, title) of the enclosing sections
+    paragraph = []
+
+    def path():
+        return tuple(title for _, title in headings)
+
+    def flush_paragraph():
+        if paragraph:
+            blocks.append(Block('paragraph', '\n'.join(paragraph).strip(), path()))
+            paragraph.clear()
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+
+        fence = FENCE_RE.match(line)
+        if fence:
+            flush_paragraph()
+            marker = fence.group(1)
+            end = i + 1
+            while end < len(lines) and not lines[end].strip().startswith(marker):
+                end += 1
+            blocks.append(Block('code', '\n'.join(lines[i:end + 1]), path()))
+            i = end + 1
+            continue
+
+        heading = HEADING_RE.match(line)
+        if heading:
+            flush_paragraph()
+            level = len(heading.group(1))
+            headings = [h for h in headings if h[0] < level] + [(level, heading.group(2))]
+            blocks.append(Block('heading', line.strip(), path()))
+            i += 1
+            continue
+
+        if line.lstrip().startswith('|'):
+            flush_paragraph()
+            end = i
+            while end < len(lines) and lines[end].lstrip().startswith('|'):
+                end += 1
+            blocks.append(Block('table', '\n'.join(lines[i:end]), path()))
+            i = end
+            continue
+
+        if not line.strip():
+            flush_paragraph()
+        else:
+            paragraph.append(line)
+        i += 1
+
+    flush_paragraph()
+    return blocks
+
+
+class MarkdownStructureChunker(Chunker):
+    """
+    Token-sized chunks that follow the document structure.
+
+    Every heading starts a new chunk and chunks carry their section path.
+    Tables and fenced code blocks are never cut mid-row or mid-line: if one
+    is too large it is split into smaller valid tables (repeating the header)
+    or fenced blocks. Prose is split on sentence boundaries, and only prose
+    overlaps between consecutive chunks of the same section.
+    """
+
+    def __init__(self, max_tokens=256, overlap_tokens=0, count_tokens: Optional[Callable[[str], int]] = None):
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens or token_counter()
+
+    def _group(self, units, budget, prefix=(), suffix=(), first_budget=None):
+        """Greedily pack lines into pieces below budget tokens, each wrapped in prefix/suffix"""
+        fixed_tokens = sum(self.count_tokens(unit) for unit in list(prefix) + list(suffix))
+        piece_budget = first_budget or budget
+        pieces, current, current_tokens = [], [], fixed_tokens
+        for unit in units:
+            tokens = self.count_tokens(unit)
+            if current and current_tokens + tokens > piece_budget:
+                pieces.append((current, current_tokens))
+                current, current_tokens = [], fixed_tokens
+                piece_budget = budget
+            current.append(unit)
+            current_tokens += tokens
+        if current:
+            pieces.append((current, current_tokens))
+        return [('\n'.join(list(prefix) + units + list(suffix)), tokens) for units, tokens in pieces]
+
+    def _sentences(self, text):
+        """Sentences of a paragraph, with over-long ones cut on word boundaries"""
+        for sentence in SENTENCE_END_RE.split(text):
+            if self.count_tokens(sentence) <= self.max_tokens:
+                yield sentence
+                continue
+            words, words_tokens = [], 0
+            for word in sentence.split():
+                tokens = self.count_tokens(word)
+                if words and words_tokens + tokens > self.max_tokens:
+                    yield ' '.join(words)
+                    words, words_tokens = [], 0
+                words.append(word)
+                words_tokens += tokens
+            if words:
+                yield ' '.join(words)
+
+    def _fit(self, block, budget, first_budget):
+        """
+        Break one block into (text, tokens, continues_previous) pieces that
+        each fit in budget tokens, the first one in first_budget. Blocks
+        that fit in a chunk are kept whole.
+        """
+        tokens = self.count_tokens(block.text)
+        if tokens <= self.max_tokens:
+            return [(block.text, tokens, False)]
+
+        lines = block.text.split('\n')
+        if block.kind == 'table':
+            has_header = len(lines) > 1 and TABLE_SEPARATOR_RE.match(lines[1])
+            header, rows = (lines[:2], lines[2:]) if has_header else ([], lines)
+            pieces = self._group(rows, budget, prefix=header, first_budget=first_budget)
+        elif block.kind == 'code':
+            closed = len(lines) > 1 and FENCE_RE.match(lines[-1])
+            body = lines[1:-1] if closed else lines[1:]
+            closing = lines[-1] if closed else FENCE_RE.match(lines[0]).group(1)
+            pieces = self._group(body, budget, prefix=[lines[0]], suffix=[closing], first_budget=first_budget)
+        else:
+            # Sentences are packed individually so chunks fill up and can overlap
+            return [
+                (sentence, self.count_tokens(sentence), i > 0)
+                for i, sentence in enumerate(self._sentences(block.text))
+            ]
+        return [(text, tokens, False) for text, tokens in pieces]
+
+    def _overlap(self, pieces):
+        """Trailing sentences of a chunk (up to overlap_tokens) to repeat in the next one"""
+        carried, carried_tokens = [], 0
+        for text, tokens, kind, continues in reversed(pieces):
+            if kind != 'paragraph' or carried_tokens + tokens > self.overlap_tokens:
+                break
+            carried.insert(0, (text, tokens, kind, continues))
+            carried_tokens += tokens
+        if carried:
+            text, tokens, kind, _ = carried[0]
+            carried[0] = (text, tokens, kind, False)
+        return carried
+
+    def split(self, text):
+        chunks = []
+        pieces = []  # (text, tokens, kind, continues_previous) of the chunk being built
+        section, title, context_tokens = (), "", 0
+
+        def emit():
+            if any(kind != 'context' for _, _, kind, _ in pieces):
+                parts = []
+                for text, _, _, continues in pieces:
+                    parts.append(' ' + text if continues and parts else ('\n\n' + text if parts else text))
+                chunks.append(Chunk(
+                    text=''.join(parts),
+                    metadata={
+                        "section": " > ".join(section),
+                        "block_types": ",".join(sorted({kind for _, _, kind, _ in pieces} - {'context'}))
+                    }
+                ))
+
+        def total(chunk_pieces):
+            return sum(tokens for _, tokens, _, _ in chunk_pieces)
+
+        for block in parse_blocks(text):
+            if block.kind == 'heading' or block.headings != section:
+                # Sections never share a chunk
+                emit()
+                pieces = []
+                section = block.headings
+                title = " > ".join(section)
+                context_tokens = self.count_tokens(title) if section else 0
+
+            # A split table or code block tops up the current chunk unless
+            # that would leave only a sliver of it there
+            remaining = self.max_tokens - total(pieces)
+            first_budget = remaining if remaining >= self.max_tokens // 4 else self.max_tokens - context_tokens
+            for piece, tokens, continues in self._fit(block, self.max_tokens - context_tokens, first_budget):
+                if pieces and total(pieces) + tokens > self.max_tokens:
+                    emit()
+                    # Continuation chunks name their section and repeat some prose
+                    context = [(title, context_tokens, 'context', False)] if section else []
+                    pieces = context + (self._overlap(pieces) if self.overlap_tokens else [])
+                    if total(pieces) + tokens > self.max_tokens:
+                        pieces = context
+                    continues = continues and len(pieces) > len(context)
+                pieces.append((piece, tokens, block.kind, continues))
+
+        emit()
+        return chunks
+
+
+_chunkers = {}
+_chunkers_lock = threading.Lock()
+
+
+def get_chunker(source_type=None):
+    """Shared chunker for a source type, as configured by VECTOR_CHUNKER"""
+    source_type = source_type if source_type in CHUNKING_PROFILES else 'default'
+    if source_type not in _chunkers:
+        with _chunkers_lock:
+            if source_type not in _chunkers:
+                if settings.VECTOR_CHUNKER == 'recursive':
+                    _chunkers[source_type] = RecursiveChunker()
+                else:
+                    profile = CHUNKING_PROFILES[source_type]
+                    _chunkers[source_type] = MarkdownStructureChunker(
+                        max_tokens=profile.max_tokens,
+                        overlap_tokens=profile.overlap_tokens
+                    )
+    return _chunkers[source_type]
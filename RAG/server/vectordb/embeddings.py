@@ -0,0 +1,39 @@
+import threading
+import time
+from .chunking import EMBEDDING_MODEL_NAME
+
+
+class EmbeddingModelSingleton:
+    """
+    The process-wide sentence-transformers model.
+
+    Both the main vector store and the EDA store embed with the same model,
+    so they share one instance instead of loading the weights per handler.
+    """
+    _instance = None
+    _lock = threading.Lock()
+    load_seconds = None
+
+    @classmethod
+    def get_instance(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    from langchain_huggingface import HuggingFaceEmbeddings
+                    start_time = time.time()
+                    cls._instance = HuggingFaceEmbeddings(
+                        model_name=EMBEDDING_MODEL_NAME,
+                        model_kwargs={'device': 'cpu'},
+                        encode_kwargs={'normalize_embeddings': False}
+                    )
+                    cls.load_seconds = time.time() - start_time
+                    print(f"🧠 Loaded embedding model {EMBEDDING_MODEL_NAME} in {cls.load_seconds:.2f}s")
+        return cls._instance
+
+    @classmethod
+    def is_loaded(cls):
+        return cls._instance is not None
+
+
+def get_embeddings():
+    return EmbeddingModelSingleton.get_instance()
@@ -1,42 +1,46 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_chroma import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 import threading
+import time
+import uuid
+from django.conf import settings
+from .chunking import get_chunker
+from .embeddings import get_embeddings
 
 class VectorDBHandler:
-    def __init__(self, persist_directory):
+    def __init__(self, persist_directory, embeddings=None):
+        # Imported here so importing vectordb does not pull in torch/chromadb
+        from langchain_chroma import Chroma
         print("Initializing VectorDBHandler...")
-        model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        model_kwargs = {'device': 'cpu'}
-        encode_kwargs = {'normalize_embeddings': False}
-        self.embeddings = HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs=model_kwargs,
-            encode_kwargs=encode_kwargs
-        )
+        start_time = time.time()
+        self.persist_directory = persist_directory
+        self.embeddings = embeddings or get_embeddings()
         self.db = Chroma(
             persist_directory=persist_directory,
             embedding_function=self.embeddings
         )
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1200,
-            chunk_overlap=300,
-            length_function=len,
-            add_start_index=True,
-        )
+        self.load_seconds = time.time() - start_time
+
+    def stats(self):
+        """Load time and size of the store, as reported after warm-up"""
+        return {
+            "persist_directory": self.persist_directory,
+            "load_seconds": round(self.load_seconds, 3),
+            "documents": self.db._collection.count(),
+        }
 
-    def process_markdown(self, markdown_content, url, scrape_id, user_id):
+    def process_markdown(self, markdown_content, url, scrape_id, user_id, source_type=None):
+        """Chunk markdown with the chunker of source_type (see vectordb.chunking) and embed it"""
         try:
-            chunks = self.text_splitter.split_text(markdown_content)
+            chunks = get_chunker(source_type).split(markdown_content)
             texts = []
             metadatas = []
             for i, chunk in enumerate(chunks):
-                texts.append(chunk)
+                texts.append(chunk.text)
                 metadatas.append({
                     "url": url,
                     "chunk_index": i,
                     "scrape_id": scrape_id,
-                    "user_id": user_id
+                    "user_id": user_id,
+                    **chunk.metadata
                 })
     
             self.db.add_texts(texts=texts, metadatas=metadatas)
@@ -45,6 +49,72 @@ class VectorDBHandler:
         except Exception as e:
             print(f"Error processing markdown for {url}: {str(e)}")
 
+    def process_markdown_stream(self, sections, url, scrape_id, user_id, batch_size=64, source_type=None):
+        """
+        Chunk and embed markdown that arrives incrementally.
+
+        sections yields either markdown strings or (markdown, extra_metadata)
+        tuples; chunks are written to the store every batch_size chunks so the
+        full document never has to be held in memory. Returns the chunk count.
+        Errors are raised after logging; chunks already written stay in the
+        store for the caller to remove.
+        """
+        chunker = get_chunker(source_type)
+        texts = []
+        metadatas = []
+        chunk_index = 0
+        try:
+            for section in sections:
+                section_text, extra_metadata = section if isinstance(section, tuple) else (section, {})
+                for chunk in chunker.split(section_text):
+                    texts.append(chunk.text)
+                    metadatas.append({
+                        "url": url,
+                        "chunk_index": chunk_index,
+                        "scrape_id": scrape_id,
+                        "user_id": user_id,
+                        **chunk.metadata,
+                        **extra_metadata
+                    })
+                    chunk_index += 1
+                if len(texts) >= batch_size:
+                    self.db.add_texts(texts=texts, metadatas=metadatas)
+                    texts, metadatas = [], []
+
+            if texts:
+                self.db.add_texts(texts=texts, metadatas=metadatas)
+            print(f"Successfully streamed embeddings for {url or scrape_id} with {chunk_index} chunks")
+        except Exception as e:
+            print(f"Error processing markdown stream for {url or scrape_id}: {str(e)}")
+            raise
+        return chunk_index
+
+    def clone_embeddings(self, source_scrape_id, target_scrape_id, user_id, batch_size=512):
+        """
+        Copy the stored chunks of source_scrape_id to target_scrape_id,
+        reusing their embeddings instead of re-encoding the text.
+        Returns the number of chunks copied.
+        """
+        collection = self.db._collection
+        source = collection.get(
+            where={"scrape_id": source_scrape_id},
+            include=["embeddings", "documents", "metadatas"]
+        )
+        total = len(source["ids"])
+        for start in range(0, total, batch_size):
+            end = start + batch_size
+            collection.add(
+                ids=[str(uuid.uuid4()) for _ in range(start, min(end, total))],
+                embeddings=source["embeddings"][start:end],
+                documents=source["documents"][start:end],
+                metadatas=[
+                    {**metadata, "scrape_id": target_scrape_id, "user_id": user_id}
+                    for metadata in source["metadatas"][start:end]
+                ]
+            )
+        print(f"Reused {total} chunks from {source_scrape_id} for {target_scrape_id}")
+        return total
+
     def process_scraped_content(self, scraped_content):
         threads = []
         for content in scraped_content:
@@ -88,10 +158,43 @@ class VectorDBSingleton:
     _lock = threading.Lock()
 
     @classmethod
-    def get_instance(cls, persist_directory="vectordb"):
+    def get_instance(cls, persist_directory=None):
         if cls._instance is None:
             with cls._lock:
-                print("Initializing VectorDBHandler (singleton)...")
                 if cls._instance is None:
-                    cls._instance = VectorDBHandler(persist_directory)
+                    print("Initializing VectorDBHandler (singleton)...")
+                    cls._instance = VectorDBHandler(persist_directory or settings.VECTOR_DB_DIRECTORY)
         return cls._instance
+
+    @classmethod
+    def is_loaded(cls):
+        return cls._instance is not None
+
+
+class LazyVectorDB:
+    """
+    Module-level handle for the VectorDBHandler singleton.
+
+    Importing it costs nothing; the embedding model and Chroma client are
+    created on the first attribute access, or earlier by warm_up().
+    """
+
+    def __getattr__(self, name):
+        return getattr(VectorDBSingleton.get_instance(), name)
+
+    def __setattr__(self, name, value):
+        setattr(VectorDBSingleton.get_instance(), name, value)
+
+    def __repr__(self):
+        state = "loaded" if VectorDBSingleton.is_loaded() else "not loaded"
+        return f"<LazyVectorDB ({state})>"
+
+
+def warm_up():
+    """Load the embedding model and open the store now instead of on the first request"""
+    start_time = time.time()
+    handler = VectorDBSingleton.get_instance()
+    # The first encode call still initializes the tokenizer and weights
+    handler.embeddings.embed_query("warm up")
+    print(f"🔥 VectorDB warmed up in {time.time() - start_time:.2f}s: {handler.stats()}")
+    return handler
@@ -6,8 +6,6 @@ from typing import Set, List, Optional
 from dataclasses import dataclass
 from web_scraper.models import WebsiteScrape, ScrapedContent
 from vectordb import vector_db
-import django
-django.setup()
 
 @dataclass
 class ScrapedData:
@@ -116,7 +114,7 @@ class WebScraper:
         )
         
         # Process markdown for vector database
-        self.vector_db_handler.process_markdown(data.markdown, url,  str(self.scrape.id), self.scrape.user_id)
+        self.vector_db_handler.process_markdown(data.markdown, url,  str(self.scrape.id), self.scrape.user_id, source_type='web')
         
         # Save links
         # if data.links: